@@ -0,0 +1,94 @@
+# benchmarks/bench_backends.py
+"""
+Storage backend benchmark: the same workload against every registered
+backend that can be created here (lmdb needs the lmdb package).
+Each backend is populated with N users of the "10k" datagen profile
+through its bulk-import path, then timed on random reads (account
+details and a 10-transaction history), writes (address updates and new
+transactions), the same writes with each pair in one batch(), triage
+(report, take and close the next issue) and reopening the stored data.
+json stores use DB_PERSISTENCE (default snapshot, which rewrites the
+file on every write).
+
+Usage: python benchmarks/bench_backends.py [N]
+"""
+
+import random
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from mcp_server.datagen import get_profile, populate
+from mcp_server.storage import available_backends, create_database
+
+# Operations timed per phase
+OPERATIONS = 2_000
+
+
+def timed(fn):
+    start = time.perf_counter()
+    result = fn()
+    return result, time.perf_counter() - start
+
+
+def main():
+    n = int(sys.argv[1]) if len(sys.argv) > 1 else 10_000
+    profile = get_profile("10k", users=n)
+    rng = random.Random(0)
+    user_ids = [f"user_{rng.randrange(n):08d}" for _ in range(OPERATIONS)]
+    print(f"Populating {n:,} users (about {n * profile['mean_transactions']:,} transactions) per backend")
+
+    def reads(db):
+        for user_id in user_ids:
+            db.get_account_details(user_id)
+            db.get_recent_transactions(user_id, 10)
+
+    def writes(db):
+        for i, user_id in enumerate(user_ids):
+            db.update_address(user_id, f"{i} Benchmark Blvd")
+            db.add_transaction(user_id, "Benchmark", -1.0)
+
+    def batched(db):
+        for i, user_id in enumerate(user_ids):
+            with db.batch():
+                db.update_address(user_id, f"{i} Batched Blvd")
+                db.add_transaction(user_id, "Benchmark", 1.0)
+
+    def triage(db):
+        for user_id in user_ids:
+            db.report_issue(user_id, "Benchmark issue", "high")
+        for _ in user_ids:
+            db.close_issue(db.next_open_issue()["issue_id"])
+
+    print(f"\n{'backend':<9}{'populate s':>12}{'reads/s':>10}{'writes/s':>10}{'batched/s':>11}{'triage/s':>10}{'reopen s':>10}")
+    for name in available_backends():
+        with tempfile.TemporaryDirectory() as tmp:
+            path = Path(tmp) / ("database.sqlite3" if name == "sqlite" else "database.json")
+            try:
+                db = create_database(name, path)
+            except RuntimeError as e:
+                print(f"{name:<9}skipped: {e}")
+                continue
+            stats = populate(db, profile)
+            _, read_s = timed(lambda: reads(db))
+            _, write_s = timed(lambda: writes(db))
+            _, batched_s = timed(lambda: batched(db))
+            _, triage_s = timed(lambda: triage(db))
+            db.close()
+            if name == "memory":
+                reopen = "-"
+            else:
+                db, reopen_s = timed(lambda: create_database(name, path))
+                db.close()
+                reopen = f"{reopen_s:.2f}"
+            print(f"{name:<9}{stats['seconds']:>12.2f}{OPERATIONS / read_s:>10,.0f}{OPERATIONS / write_s:>10,.0f}"
+                  f"{OPERATIONS / batched_s:>11,.0f}{OPERATIONS / triage_s:>10,.0f}{reopen:>10}")
+    print("\nreads = account details + 10 transactions; writes = address update + new transaction;"
+          "\nbatched = the same pair in one batch(); triage = report an issue, later take and close the next one")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,68 @@
+# benchmarks/bench_codecs.py
+"""
+Codec benchmark: snapshot save/load and tool-payload encoding per codec.
+Generates a synthetic database of about N transactions (the "1m" datagen
+profile, scaled) as MockDatabase holds it, then times every installed
+codec (json, orjson, msgspec, msgpack).
+"resave" is a second save after changing one user, which JSON snapshots
+assemble from cached fragments of the unchanged records.
+
+Usage: python benchmarks/bench_codecs.py [N]
+"""
+
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from mcp_server.codec import available_codecs, get_codec
+from mcp_server.datagen import build_database, get_profile
+from mcp_server.fragments import FragmentCache
+from mcp_server.records import as_dict, data_from_dicts
+
+# Tool responses encoded per codec (a 10-transaction history each)
+PAYLOADS = 20_000
+
+
+def timed(fn):
+    start = time.perf_counter()
+    result = fn()
+    return result, time.perf_counter() - start
+
+
+def main():
+    n = int(sys.argv[1]) if len(sys.argv) > 1 else 1_000_000
+    profile = get_profile("1m")
+    profile["users"] = max(1, n // profile["mean_transactions"])
+    print(f"Generating {profile['users']:,} users with about {n:,} transactions")
+    database = build_database(profile)
+    payload = {"success": True, "transactions": as_dict(max(database["transactions"].values(), key=len).recent(10))}
+
+    first_user = next(iter(database["users"]))
+    print(f"\n{'codec':<9}{'size MB':>9}{'save s':>9}{'save MB/s':>11}{'resave s':>10}{'parse s':>9}"
+          f"{'load s':>9}{'pretty/s':>11}{'compact/s':>11}")
+    for name in available_codecs():
+        codec = get_codec(name)
+        # Encoded as SnapshotPersistence writes them
+        fragments = FragmentCache(codec)
+        save = (lambda: codec.dumps(database)) if codec.binary else (lambda: fragments.encode(database))
+        data, save_s = timed(save)
+        user = database["users"][first_user]
+        database["users"][first_user] = user.replace(address="1 Resave Road")
+        _, resave_s = timed(save)
+        database["users"][first_user] = user
+        raw, parse_s = timed(lambda: codec.loads(data))
+        _, convert_s = timed(lambda: data_from_dicts(raw))
+        del raw
+        _, pretty_s = timed(lambda: [codec.dumps(payload, pretty=True) for _ in range(PAYLOADS)])
+        _, compact_s = timed(lambda: [codec.dumps(payload) for _ in range(PAYLOADS)])
+        size_mb = len(data) / (1024 * 1024)
+        print(f"{name:<9}{size_mb:>9.1f}{save_s:>9.2f}{size_mb / save_s:>11.1f}{resave_s:>10.3f}{parse_s:>9.2f}"
+              f"{parse_s + convert_s:>9.2f}{PAYLOADS / pretty_s:>11,.0f}{PAYLOADS / compact_s:>11,.0f}")
+        del data, fragments
+    print("\nload = parse + conversion to records and transaction columns")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,90 @@
+# benchmarks/bench_records.py
+"""
+Memory benchmark: plain dicts vs slotted records vs columnar transactions.
+Builds N transactions and users each way and reports the memory used
+per million records (measured with tracemalloc).
+
+Usage: python benchmarks/bench_records.py [N]
+"""
+
+import sys
+import tracemalloc
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from mcp_server.records import TransactionRecord, UserRecord
+from mcp_server.txn_store import TransactionColumns
+
+# Transactions per user when building columnar stores
+TXNS_PER_USER = 100
+
+
+def make_transaction(i: int) -> dict:
+    return {
+        "id": f"txn_{i:09d}",
+        "date": f"2024-01-01T00:00:{i % 60:02d}",
+        "description": "Grocery Store",
+        "amount": -12.5,
+        "balance": 1000.0
+    }
+
+
+def make_user(i: int) -> dict:
+    return {
+        "user_id": f"user_{i:09d}",
+        "name": "Test User",
+        "email": "user@example.com",
+        "password": "hashed_password",
+        "address": "1 Main St",
+        "account_balance": 1000.0,
+        "card_status": "active",
+        "card_number": "**** **** **** 0000",
+        "phone": "+1-555-0000"
+    }
+
+
+def measure(build) -> int:
+    """Return the bytes still allocated by the objects `build` returns."""
+    tracemalloc.start()
+    objects = build()
+    current, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    del objects
+    return current
+
+
+def build_columns(n: int):
+    return [
+        TransactionColumns.from_dicts(make_transaction(i) for i in range(start, min(n, start + TXNS_PER_USER)))
+        for start in range(0, n, TXNS_PER_USER)
+    ]
+
+
+def report(label: str, n: int, dict_bytes: int, compact_bytes: int):
+    per_million = 1_000_000 / n / (1024 * 1024)
+    print(f"{label:<22} dict: {dict_bytes * per_million:8.1f} MB/M   "
+          f"compact: {compact_bytes * per_million:8.1f} MB/M   "
+          f"saved: {100 * (1 - compact_bytes / dict_bytes):5.1f}%")
+
+
+def main():
+    n = int(sys.argv[1]) if len(sys.argv) > 1 else 1_000_000
+    print(f"Building {n:,} records of each kind\n")
+    
+    # Field values are created inside each build so both sides pay for them
+    txn_dicts = measure(lambda: [make_transaction(i) for i in range(n)])
+    report(
+        "transactions (record)", n, txn_dicts,
+        measure(lambda: [TransactionRecord.from_dict(make_transaction(i)) for i in range(n)])
+    )
+    report("transactions (column)", n, txn_dicts, measure(lambda: build_columns(n)))
+    report(
+        "users (record)", n,
+        measure(lambda: [make_user(i) for i in range(n)]),
+        measure(lambda: [UserRecord.from_dict(make_user(i)) for i in range(n)])
+    )
+
+
+if __name__ == "__main__":
+    main()
@@ -2,8 +2,14 @@
 """
 MCP Server over HTTP (works reliably on Windows).
 This avoids stdio transport issues.
+
+Run several worker processes with --workers N; they share the SQLite
+storage backend, since each process would otherwise hold its own copy
+of database.json and overwrite the others' changes.
 """
 
+import argparse
+import os
 import sys
 import logging
 from pathlib import Path
@@ -15,8 +21,6 @@ import asyncio
 
 sys.path.insert(0, str(Path(__file__).parent))
 
-from mcp_server.tools import get_tool_definitions, execute_tool
-
 logging.basicConfig(
     level=logging.INFO,
     format='%(asctime)s - %(name)s - %(levelname)s - %(message)s'
@@ -26,6 +30,21 @@ logger = logging.getLogger(__name__)
 app = FastAPI(title="Customer Support MCP Server")
 
 
+# mcp_server creates the database when it is first imported, so it is
+# imported when a server process starts rather than with this module:
+# with --workers, main() still has to choose the backend, and the master
+# process never serves requests.
+def _db():
+    from mcp_server.storage import db
+    return db
+
+
+@app.on_event("startup")
+async def open_database():
+    """Load the database before the first request."""
+    _db()
+
+
 # Request/Response Models
 class ToolCallRequest(BaseModel):
     name: str
@@ -47,6 +66,7 @@ async def health_check():
 @app.get("/tools")
 async def list_tools():
     """List all available tools in Anthropic format."""
+    from mcp_server.tools import get_tool_definitions
     tools = get_tool_definitions()
     return {
         "tools": [
@@ -63,6 +83,7 @@ async def list_tools():
 @app.post("/tools/execute", response_model=ToolCallResponse)
 async def execute_tool_endpoint(request: ToolCallRequest):
     """Execute a tool."""
+    from mcp_server.tools import execute_tool
     try:
         logger.info(f"Executing tool: {request.name}")
         result = await execute_tool(request.name, request.arguments)
@@ -79,10 +100,80 @@ async def execute_tool_endpoint(request: ToolCallRequest):
         raise HTTPException(status_code=500, detail=str(e))
 
 
+# Admin Endpoints
+@app.post("/admin/bgsave")
+async def bgsave():
+    """Snapshot the database from a forked child while this process keeps serving."""
+    db = _db()
+    if not hasattr(db, "bgsave"):
+        from mcp_server.mock_data import BACKGROUND_SAVE_MODES
+        raise HTTPException(
+            status_code=400,
+            detail=f"Background save needs STORAGE_BACKEND=json with DB_PERSISTENCE={' or '.join(BACKGROUND_SAVE_MODES)}"
+        )
+    result = db.bgsave()
+    if not result["success"]:
+        raise HTTPException(status_code=409, detail=result["message"])
+    return result
+
+
+@app.get("/admin/save-stats")
+async def save_stats():
+    """Last-save timestamp, duration and outcome."""
+    db = _db()
+    if not hasattr(db, "save_stats"):
+        raise HTTPException(status_code=400, detail="Save metrics need STORAGE_BACKEND=json, memory or lmdb")
+    return db.save_stats()
+
+
+@app.get("/admin/cache-stats")
+async def cache_stats():
+    """Read cache size, hit rate, evictions and invalidations."""
+    db = _db()
+    if not hasattr(db, "cache_stats"):
+        raise HTTPException(status_code=400, detail="The read cache needs STORAGE_BACKEND=json, memory or lmdb")
+    return db.cache_stats()
+
+
+@app.get("/admin/snapshot-stats")
+async def snapshot_stats():
+    """Last commit number, open snapshots and versions retained for them."""
+    db = _db()
+    if not hasattr(db, "snapshot_stats"):
+        raise HTTPException(status_code=400, detail="Snapshot metrics need STORAGE_BACKEND=json, memory or lmdb")
+    return db.snapshot_stats()
+
+
+# Backends whose data can be shared safely by several worker processes
+SHARED_STORAGE_BACKENDS = ("sqlite",)
+
+
 def main():
     """Start the HTTP MCP server."""
+    parser = argparse.ArgumentParser(description="Customer Support MCP HTTP Server")
+    parser.add_argument("--workers", type=int, default=1,
+                        help="Number of worker processes (default: 1)")
+    args = parser.parse_args()
+    
+    if args.workers < 1:
+        parser.error("--workers must be at least 1")
+    
     logger.info("Starting MCP HTTP Server on http://localhost:8765")
-    uvicorn.run(app, host="0.0.0.0", port=8765, log_level="info")
+    if args.workers == 1:
+        uvicorn.run(app, host="0.0.0.0", port=8765, log_level="info")
+        return
+    
+    # Workers are fresh processes that import this module and read
+    # STORAGE_BACKEND from the environment inherited from here.
+    backend = os.environ.setdefault("STORAGE_BACKEND", "sqlite")
+    if backend not in SHARED_STORAGE_BACKENDS:
+        parser.error(
+            f"--workers {args.workers} needs a shared storage backend "
+            f"(STORAGE_BACKEND={' or '.join(SHARED_STORAGE_BACKENDS)}), not '{backend}'"
+        )
+    logger.info(f"Running {args.workers} workers on the {backend} backend")
+    uvicorn.run("mcp_http_server:app", host="0.0.0.0", port=8765,
+                workers=args.workers, log_level="info")
 
 
 if __name__ == "__main__":
@@ -5,12 +5,19 @@ MCP Server package for customer support operations.
 
 from .server import CustomerSupportMCPServer
 from .tools import get_tool_definitions, execute_tool
-from .mock_data import db, MockDatabase
+from .storage import db, StorageBackend, create_database, register_backend, available_backends
+from .mock_data import MockDatabase
+from .sqlite_db import SQLiteDatabase
 
 __all__ = [
     'CustomerSupportMCPServer',
     'get_tool_definitions',
     'execute_tool',
     'db',
-    'MockDatabase'
+    'MockDatabase',
+    'SQLiteDatabase',
+    'StorageBackend',
+    'create_database',
+    'register_backend',
+    'available_backends'
 ]
\ No newline at end of file
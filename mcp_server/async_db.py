@@ -0,0 +1,152 @@
+# mcp_server/async_db.py
+"""
+Async storage interface shared by MockDatabase and SQLiteDatabase.
+Each a<method> coroutine awaits the matching blocking method without
+running it on the event loop: writes go to a dedicated writer thread and
+reads that may touch disk to a reader pool, so reads never queue behind
+a slow save. In-memory reads run inline, and move to the reader pool only
+if they would have to wait.
+"""
+
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Dict, List, Optional
+import asyncio
+import functools
+import os
+import threading
+
+
+class WouldBlock(Exception):
+    """Raised by a read running inline on the event loop that would have to wait for a lock."""
+
+
+class AsyncDatabaseMixin:
+    """Coroutine versions of the database operations (`await db.aupdate_address(...)`)."""
+
+    # Whether reads can block on I/O; purely in-memory reads run inline
+    blocking_reads = True
+
+    _executors_lock = threading.Lock()
+    _write_executor: Optional[ThreadPoolExecutor] = None
+    _read_executor: Optional[ThreadPoolExecutor] = None
+    # Set on the event loop thread while it runs a read inline
+    _inline = threading.local()
+
+    def _executors(self):
+        """Create the writer thread and reader pool on first use."""
+        if self._write_executor is None:
+            with self._executors_lock:
+                if self._write_executor is None:
+                    self._read_executor = ThreadPoolExecutor(
+                        max_workers=int(os.getenv("DB_ASYNC_READERS", "8")),
+                        thread_name_prefix="db-reader"
+                    )
+                    # One writer keeps writes in arrival order and off the readers' threads
+                    self._write_executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="db-writer")
+        return self._read_executor, self._write_executor
+
+    def _reading_inline(self) -> bool:
+        """Whether this read runs on the event loop, so must raise WouldBlock rather than wait."""
+        return getattr(self._inline, "active", False)
+
+    async def _read(self, fn: Callable, *args: Any) -> Any:
+        if not self.blocking_reads:
+            self._inline.active = True
+            try:
+                return fn(*args)
+            except WouldBlock:
+                pass
+            finally:
+                self._inline.active = False
+        return await asyncio.get_running_loop().run_in_executor(self._executors()[0], functools.partial(fn, *args))
+
+    async def _write(self, fn: Callable, *args: Any) -> Any:
+        return await asyncio.get_running_loop().run_in_executor(self._executors()[1], functools.partial(fn, *args))
+
+    def _close_executors(self):
+        """Wait for queued async operations, then stop the executor threads."""
+        with self._executors_lock:
+            for executor in (self._write_executor, self._read_executor):
+                if executor is not None:
+                    executor.shutdown(wait=True)
+            self._write_executor = self._read_executor = None
+
+    async def aget_user(self, user_id: str) -> Any:
+        return await self._read(self.get_user, user_id)
+
+    async def achange_password(self, user_id: str, new_password: str, expected_version: Optional[int] = None) -> bool:
+        return await self._write(self.change_password, user_id, new_password, expected_version)
+
+    async def aget_account_balance(self, user_id: str) -> Optional[float]:
+        return await self._read(self.get_account_balance, user_id)
+
+    async def aupdate_address(self, user_id: str, new_address: str, expected_version: Optional[int] = None) -> bool:
+        return await self._write(self.update_address, user_id, new_address, expected_version)
+
+    async def aget_recent_transactions(self, user_id: str, limit: int = 10, since: Optional[str] = None,
+                                       until: Optional[str] = None, cursor: Optional[str] = None) -> List[Any]:
+        return await self._read(self.get_recent_transactions, user_id, limit, since, until, cursor)
+
+    async def aget_transactions_page(self, user_id: str, limit: int = 10, since: Optional[str] = None,
+                                     until: Optional[str] = None, cursor: Optional[str] = None) -> Dict[str, Any]:
+        return await self._read(self.get_transactions_page, user_id, limit, since, until, cursor)
+
+    async def aadd_transaction(self, user_id: str, description: str, amount: float) -> Any:
+        return await self._write(self.add_transaction, user_id, description, amount)
+
+    async def areconcile_balances(self, fix: bool = False) -> Dict[str, Any]:
+        return await self._write(self.reconcile_balances, fix)
+
+    async def adeactivate_card(self, user_id: str, expected_version: Optional[int] = None) -> bool:
+        return await self._write(self.deactivate_card, user_id, expected_version)
+
+    async def areport_issue(self, user_id: str, issue_description: str, priority: Optional[str] = None) -> str:
+        return await self._write(self.report_issue, user_id, issue_description, priority)
+
+    async def aupdate_issue(self, issue_id: str, status: Optional[str] = None, priority: Optional[str] = None) -> Any:
+        return await self._write(self.update_issue, issue_id, status, priority)
+
+    async def aclose_issue(self, issue_id: str) -> Any:
+        return await self._write(self.close_issue, issue_id)
+
+    async def anext_open_issue(self, priority: Optional[str] = None) -> Any:
+        return await self._read(self.next_open_issue, priority)
+
+    async def aopen_issue_count(self, user_id: Optional[str] = None) -> int:
+        return await self._read(self.open_issue_count, user_id)
+
+    async def alist_issues(self, user_id: str, status: Optional[str] = None, limit: int = 20,
+                           cursor: Optional[str] = None) -> Dict[str, Any]:
+        return await self._read(self.list_issues, user_id, status, limit, cursor)
+
+    async def afind_user_by_email(self, email: str) -> Any:
+        return await self._read(self.find_user_by_email, email)
+
+    async def afind_user_by_phone(self, phone: str) -> Any:
+        return await self._read(self.find_user_by_phone, phone)
+
+    async def aget_issue(self, issue_id: str) -> Any:
+        return await self._read(self.get_issue, issue_id)
+
+    async def aget_user_issues(self, user_id: str) -> List[Any]:
+        return await self._read(self.get_user_issues, user_id)
+
+    async def aget_issues_by_status(self, status: str) -> List[Any]:
+        return await self._read(self.get_issues_by_status, status)
+
+    async def aget_account_details(self, user_id: str) -> Optional[Dict]:
+        return await self._read(self.get_account_details, user_id)
+
+    async def aswitch_user(self, new_user_id: str) -> Dict:
+        return await self._read(self.switch_user, new_user_id)
+
+    async def abatch(self, fn: Callable, *args: Any) -> Any:
+        """Run fn(*args), which calls the blocking methods, as one batch() on the writer thread.
+
+        A batch belongs to the thread that opened it, so its writes can't be
+        awaited one by one from the event loop.
+        """
+        def run():
+            with self.batch():
+                return fn(*args)
+        return await self._write(run)
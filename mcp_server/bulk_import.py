@@ -0,0 +1,156 @@
+# mcp_server/bulk_import.py
+"""
+Streaming bulk import of users, transactions and issues.
+Rows are read one at a time from JSONL or CSV and handed to the database
+in batches, so only one batch of rows is held as dicts at any moment.
+
+Usage: python -m mcp_server.bulk_import {users,transactions,issues} FILE [--batch-size N]
+"""
+
+from typing import Any, Callable, Dict, Iterable, Iterator, List, Optional
+import argparse
+import csv
+import itertools
+import sys
+import time
+from pathlib import Path
+
+from .codec import get_codec
+
+IMPORT_KINDS = ("users", "transactions", "issues")
+DEFAULT_BATCH_SIZE = 10000
+
+# CSV values arrive as strings; these columns are converted to numbers
+NUMERIC_COLUMNS = {
+    "users": ("account_balance",),
+    "transactions": ("amount", "balance"),
+    "issues": (),
+}
+
+# Columns every row must have
+REQUIRED_COLUMNS = {
+    "users": ("user_id", "name"),
+    "transactions": ("user_id", "id", "date", "amount"),
+    "issues": ("issue_id", "user_id", "status", "created_at"),
+}
+
+
+def _log(message: str):
+    """Log to stderr to avoid interfering with stdio MCP protocol."""
+    print(message, file=sys.stderr)
+
+
+def read_jsonl(path: Path) -> Iterator[Dict[str, Any]]:
+    """One JSON object per line; blank lines are skipped."""
+    codec = get_codec()
+    with open(path, 'rb') as f:
+        for line in f:
+            if line.strip():
+                yield codec.loads(line)
+
+
+def read_csv(path: Path, kind: str) -> Iterator[Dict[str, Any]]:
+    """Rows of a CSV file with a header line; empty cells become None."""
+    numeric = NUMERIC_COLUMNS[kind]
+    with open(path, 'r', newline='', encoding='utf-8') as f:
+        for row in csv.DictReader(f):
+            row = {key: value if value != "" else None for key, value in row.items()}
+            for column in numeric:
+                if row.get(column) is not None:
+                    row[column] = float(row[column])
+            yield row
+
+
+def read_rows(path: Path, kind: str) -> Iterator[Dict[str, Any]]:
+    """Stream rows from a .jsonl/.ndjson or .csv file, checking required columns."""
+    path = Path(path)
+    if kind not in IMPORT_KINDS:
+        raise ValueError(f"Unknown import kind '{kind}'. Use one of: {', '.join(IMPORT_KINDS)}")
+    suffix = path.suffix.lower()
+    if suffix in (".jsonl", ".ndjson"):
+        rows = read_jsonl(path)
+    elif suffix == ".csv":
+        rows = read_csv(path, kind)
+    else:
+        raise ValueError(f"Unsupported import file '{path.name}'. Use .jsonl, .ndjson or .csv")
+    required = REQUIRED_COLUMNS[kind]
+    for line, row in enumerate(rows, 1):
+        missing = [column for column in required if row.get(column) is None]
+        if missing:
+            raise ValueError(f"{path.name} row {line}: missing {', '.join(missing)}")
+        yield row
+
+
+def batched(rows: Iterable[Dict[str, Any]], size: int) -> Iterator[List[Dict[str, Any]]]:
+    iterator = iter(rows)
+    while True:
+        batch = list(itertools.islice(iterator, size))
+        if not batch:
+            return
+        yield batch
+
+
+def import_rows(
+    db,
+    kind: str,
+    rows: Iterable[Dict[str, Any]],
+    batch_size: int = DEFAULT_BATCH_SIZE,
+    progress: Optional[Callable[[int, float], None]] = None
+) -> Dict[str, Any]:
+    """Import rows into db in batches; returns the row count, elapsed seconds and rows/s.
+
+    `progress(rows_so_far, elapsed_seconds)` is called after every batch.
+    """
+    started = time.perf_counter()
+    count = 0
+    for batch in batched(rows, batch_size):
+        count += db.import_batch(kind, batch)
+        if progress:
+            progress(count, time.perf_counter() - started)
+    db.import_finished()
+    seconds = time.perf_counter() - started
+    return {
+        "kind": kind,
+        "rows": count,
+        "seconds": seconds,
+        "rows_per_second": count / seconds if seconds > 0 else 0.0
+    }
+
+
+def import_file(db, kind: str, path: Path, batch_size: int = DEFAULT_BATCH_SIZE,
+                progress: Optional[Callable[[int, float], None]] = None) -> Dict[str, Any]:
+    """Stream a JSONL or CSV file into db (see import_rows)."""
+    return import_rows(db, kind, read_rows(path, kind), batch_size, progress)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Bulk import users, transactions or issues")
+    parser.add_argument("kind", choices=IMPORT_KINDS)
+    parser.add_argument("file", type=Path, help=".jsonl/.ndjson or .csv file")
+    parser.add_argument("--batch-size", type=int, default=DEFAULT_BATCH_SIZE,
+                        help=f"Rows per write (default: {DEFAULT_BATCH_SIZE})")
+    args = parser.parse_args()
+    if args.batch_size < 1:
+        parser.error("--batch-size must be at least 1")
+
+    # Imported here so --help works without opening the database
+    from .storage import db
+
+    last_report = [0.0]
+
+    def progress(rows: int, seconds: float):
+        # At most one line per second
+        if seconds - last_report[0] >= 1.0:
+            last_report[0] = seconds
+            _log(f"[Import] {rows:,} {args.kind} ({rows / seconds:,.0f} rows/s)")
+
+    try:
+        stats = import_file(db, args.kind, args.file, args.batch_size, progress)
+    finally:
+        db.close()
+    print(f"Imported {stats['rows']:,} {args.kind} in {stats['seconds']:.1f}s "
+          f"({stats['rows_per_second']:,.0f} rows/s)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,147 @@
+# mcp_server/codec.py
+"""
+Pluggable serialization codecs for persistence and tool payloads.
+The JSON codec is chosen with DB_CODEC (orjson or msgspec when installed,
+otherwise the standard library); snapshots can instead be written as
+binary msgpack with DB_SNAPSHOT_FORMAT=msgpack. DB_CODEC itself only takes
+JSON codecs, since WAL, lazy-store and shard files are line-oriented text.
+"""
+
+from typing import Any, Dict, Optional, Tuple
+import json
+import os
+
+from .records import encode_record
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+try:
+    import msgspec
+except ImportError:
+    msgspec = None
+
+try:
+    import msgpack
+except ImportError:
+    msgpack = None
+
+# Preference order for DB_CODEC=auto
+AUTO_CODECS = ("orjson", "msgspec", "json")
+SNAPSHOT_FORMATS = ("json", "msgpack")
+
+
+class JSONCodec:
+    """Standard library json; always available."""
+
+    name = "json"
+    binary = False
+    suffix = ".json"
+
+    def dumps(self, obj: Any, pretty: bool = False) -> bytes:
+        if pretty:
+            return json.dumps(obj, indent=2, default=encode_record).encode('utf-8')
+        return json.dumps(obj, separators=(',', ':'), default=encode_record).encode('utf-8')
+
+    def loads(self, data: bytes) -> Any:
+        return json.loads(data)
+
+
+class OrjsonCodec(JSONCodec):
+    """orjson: Rust JSON encoder/decoder, output identical in meaning to stdlib json."""
+
+    name = "orjson"
+
+    def dumps(self, obj: Any, pretty: bool = False) -> bytes:
+        return orjson.dumps(obj, default=encode_record, option=orjson.OPT_INDENT_2 if pretty else 0)
+
+    def loads(self, data: bytes) -> Any:
+        return orjson.loads(data)
+
+
+class MsgspecCodec(JSONCodec):
+    """msgspec's JSON encoder/decoder."""
+
+    name = "msgspec"
+
+    def dumps(self, obj: Any, pretty: bool = False) -> bytes:
+        data = msgspec.json.encode(obj, enc_hook=encode_record)
+        return msgspec.json.format(data, indent=2) if pretty else data
+
+    def loads(self, data: bytes) -> Any:
+        try:
+            return msgspec.json.decode(data)
+        except msgspec.DecodeError as e:
+            # Callers treat ValueError as "corrupt record", as with json
+            raise ValueError(str(e)) from e
+
+
+class MsgpackCodec:
+    """Binary msgpack, via the msgpack package or msgspec."""
+
+    name = "msgpack"
+    binary = True
+    suffix = ".msgpack"
+
+    def dumps(self, obj: Any, pretty: bool = False) -> bytes:
+        if msgpack is not None:
+            return msgpack.packb(obj, default=encode_record, use_bin_type=True)
+        return msgspec.msgpack.encode(obj, enc_hook=encode_record)
+
+    def loads(self, data: bytes) -> Any:
+        if msgpack is not None:
+            return msgpack.unpackb(data, raw=False)
+        try:
+            return msgspec.msgpack.decode(data)
+        except msgspec.DecodeError as e:
+            raise ValueError(str(e)) from e
+
+
+# name -> (codec class, whether its dependency is installed)
+CODECS: Dict[str, Tuple[type, bool]] = {
+    "json": (JSONCodec, True),
+    "orjson": (OrjsonCodec, orjson is not None),
+    "msgspec": (MsgspecCodec, msgspec is not None),
+    "msgpack": (MsgpackCodec, msgpack is not None or msgspec is not None),
+}
+
+_instances: Dict[str, Any] = {}
+
+
+def available_codecs() -> Tuple[str, ...]:
+    return tuple(name for name, (_, installed) in CODECS.items() if installed)
+
+
+def get_codec(name: Optional[str] = None):
+    """Return a codec by name, or the DB_CODEC one ("auto" picks the fastest installed JSON codec)."""
+    from_env = name is None
+    name = (name or os.getenv("DB_CODEC", "auto")).lower()
+    if name == "auto":
+        name = next(n for n in AUTO_CODECS if CODECS[n][1])
+    if name not in CODECS:
+        raise ValueError(f"Unknown codec '{name}'. Use one of: auto, {', '.join(CODECS)}")
+    if from_env and CODECS[name][0].binary:
+        raise ValueError(
+            f"DB_CODEC must be a JSON codec (auto, {', '.join(AUTO_CODECS)}); "
+            f"use DB_SNAPSHOT_FORMAT={name} for binary snapshots"
+        )
+    codec_class, installed = CODECS[name]
+    if not installed:
+        raise ValueError(f"Codec '{name}' is not installed (pip install {name})")
+    if name not in _instances:
+        _instances[name] = codec_class()
+    return _instances[name]
+
+
+def get_snapshot_codec(snapshot_format: Optional[str] = None):
+    """Codec for on-disk snapshots: the JSON codec, or msgpack with DB_SNAPSHOT_FORMAT=msgpack."""
+    snapshot_format = (snapshot_format or os.getenv("DB_SNAPSHOT_FORMAT", "json")).lower()
+    if snapshot_format == "json":
+        return get_codec()
+    if snapshot_format == "msgpack":
+        return get_codec("msgpack")
+    raise ValueError(
+        f"Unknown DB_SNAPSHOT_FORMAT '{snapshot_format}'. Use one of: {', '.join(SNAPSHOT_FORMATS)}"
+    )
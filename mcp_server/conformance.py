@@ -0,0 +1,265 @@
+# mcp_server/conformance.py
+"""
+Conformance checks every storage backend must pass.
+Each check gets a freshly created backend seeded with the default data
+(user_001 and user_002) and asserts the behaviour the tools rely on, so a
+new backend registered in storage.py is held to the same contract as the
+built-in ones.
+
+Usage: run_conformance(lambda d: create_database("sqlite", d / "database.sqlite3"), tmp_dir)
+"""
+
+from pathlib import Path
+from typing import Callable, List, Tuple
+import asyncio
+import threading
+
+from .issue_store import issue_number
+from .records import VersionConflict, as_dict
+from .storage import StorageBackend
+
+
+def check_protocol(db: StorageBackend):
+    assert isinstance(db, StorageBackend), f"{type(db).__name__} does not implement StorageBackend"
+
+
+def check_users(db: StorageBackend):
+    assert db.get_user("user_001")["name"] == "John Doe"
+    assert db.get_account_balance("user_001") == 5420.50
+    assert db.get_account_details("user_002")["email"] == "jane.smith@example.com"
+    assert db.get_user("user_missing") is None and db.get_account_balance("user_missing") is None
+    assert db.get_account_details("user_missing") is None
+    assert db.switch_user("user_002")["success"] and not db.switch_user("user_missing")["success"]
+    assert db.find_user_by_email(" Jane.Smith@Example.com ")["user_id"] == "user_002"
+    assert db.find_user_by_phone("1 (555) 0123")["user_id"] == "user_001"
+    assert db.find_user_by_email("nobody@example.com") is None
+
+
+def check_user_updates(db: StorageBackend):
+    assert db.update_address("user_001", "1 Conformance Way")
+    assert db.change_password("user_001", "new-secret")
+    assert db.deactivate_card("user_001")
+    details = db.get_account_details("user_001")
+    assert details["address"] == "1 Conformance Way" and details["card_status"] == "deactivated"
+    assert db.get_user("user_001")["password"] == "hashed_new-secret"
+    assert not db.update_address("user_missing", "Nowhere")
+    assert not db.change_password("user_missing", "x") and not db.deactivate_card("user_missing")
+
+    version = db.get_account_details("user_002")["version"]
+    assert db.update_address("user_002", "5 Versioned Row", expected_version=version)
+    assert db.get_account_details("user_002")["version"] == version + 1, "Every update should bump the version"
+    try:
+        db.change_password("user_002", "stale", expected_version=version)
+        raise AssertionError("A stale expected_version should be rejected")
+    except VersionConflict as e:
+        assert e.current_version == version + 1
+    assert db.get_user("user_002")["password"] != "hashed_stale", "A rejected update should write nothing"
+    assert not db.deactivate_card("user_missing", expected_version=0)
+
+
+def check_transactions(db: StorageBackend):
+    history = as_dict(db.get_recent_transactions("user_001", 100))
+    assert len(history) == 3 and [t["date"] for t in history] == sorted((t["date"] for t in history), reverse=True)
+    txn = as_dict(db.add_transaction("user_001", "Conformance", -20.5))
+    assert txn["balance"] == 5400.0 and db.get_account_balance("user_001") == 5400.0
+    assert as_dict(db.get_recent_transactions("user_001", 1)) == [txn]
+    assert db.add_transaction("user_missing", "Nothing", 1.0) is None
+    assert db.reconcile_balances()["users_with_drift"] == 0
+    pages, cursor = [], None
+    while True:
+        page = db.get_transactions_page("user_001", 3, cursor=cursor)
+        pages.extend(as_dict(page["transactions"]))
+        cursor = page["next_cursor"]
+        if cursor is None:
+            break
+    assert pages == as_dict(db.get_recent_transactions("user_001", 100)), "Pages should cover the history once"
+    assert db.get_recent_transactions("user_001", 10, until="2000-01-01") == []
+    try:
+        db.get_transactions_page("user_001", 3, cursor="not-a-cursor")
+        raise AssertionError("A malformed cursor should be rejected")
+    except ValueError:
+        pass
+
+
+def check_issues(db: StorageBackend):
+    low = db.report_issue("user_001", "Fee question", "low")
+    high = db.report_issue("user_002", "Card stolen", "high")
+    assert db.get_issue(high)["user_id"] == "user_002"
+    assert [i["issue_id"] for i in db.get_user_issues("user_001")] == [low]
+    assert high in [i["issue_id"] for i in db.get_issues_by_status("open")]
+    assert db.next_open_issue()["issue_id"] == high
+    assert db.open_issue_count() == 2 and db.open_issue_count("user_001") == 1
+    assert db.update_issue(high, status="in_progress")["status"] == "in_progress"
+    assert db.next_open_issue()["issue_id"] == low
+    assert db.close_issue(low)["status"] == "closed" and db.next_open_issue() is None
+    assert db.update_issue("issue_missing", status="closed") is None
+    try:
+        db.update_issue(low, status="in_progress")
+        raise AssertionError("closed -> in_progress should be rejected")
+    except ValueError:
+        pass
+    page = db.list_issues("user_001", limit=1)
+    assert as_dict(page["issues"])[0]["issue_id"] == low and page["next_cursor"] is None
+
+
+def check_snapshot(db: StorageBackend):
+    with db.snapshot() as snapshot:
+        balance = snapshot.get_account_balance("user_001")
+        history = as_dict(snapshot.get_recent_transactions("user_001", 100))
+        # Written from another thread, as a concurrent request would be
+        writer = threading.Thread(target=lambda: (
+            db.add_transaction("user_001", "During snapshot", 10.0),
+            db.update_address("user_001", "4 Snapshot Street")
+        ))
+        writer.start()
+        writer.join()
+        assert snapshot.get_account_balance("user_001") == balance, "A snapshot should not see later writes"
+        assert as_dict(snapshot.get_recent_transactions("user_001", 100)) == history
+        assert snapshot.get_account_details("user_001")["address"] != "4 Snapshot Street"
+    assert db.get_account_balance("user_001") == round(balance + 10.0, 2), "Writes should show after the snapshot"
+    assert db.get_account_details("user_001")["address"] == "4 Snapshot Street"
+
+
+def check_batch(db: StorageBackend):
+    with db.batch():
+        assert db.update_address("user_001", "6 Batch Boulevard")
+        txn = as_dict(db.add_transaction("user_001", "Batched", -0.5))
+        assert db.get_account_balance("user_001") == txn["balance"], "A batch should read its own writes"
+        issue_id = db.report_issue("user_001", "Filed in a batch", "low")
+    assert db.get_account_details("user_001")["address"] == "6 Batch Boulevard"
+    assert db.get_issue(issue_id)["status"] == "open"
+    before = (db.get_account_details("user_002"), as_dict(db.get_recent_transactions("user_002", 100)),
+              db.open_issue_count())
+    seen = []
+    users_read = threading.Event()
+
+    def read():
+        seen.extend([db.get_account_details("user_002"), as_dict(db.get_recent_transactions("user_002", 100))])
+        users_read.set()
+        # Issue reads may wait for the batch to end
+        seen.append(db.open_issue_count())
+
+    reader = threading.Thread(target=read)
+    try:
+        with db.batch():
+            db.update_address("user_002", "Never Lane")
+            db.add_transaction("user_002", "Rolled back", 99.0)
+            db.report_issue("user_002", "Rolled back", "high")
+            db.close_issue(issue_id)
+            reader.start()
+            assert users_read.wait(10), "Reads on other threads should not wait for a batch"
+            raise KeyError("abort")
+    except KeyError:
+        pass
+    reader.join()
+    assert tuple(seen) == before, "Other threads should see none of an open batch"
+    after = (db.get_account_details("user_002"), as_dict(db.get_recent_transactions("user_002", 100)),
+             db.open_issue_count())
+    assert after == before, "A batch that raises should leave no trace"
+    assert db.get_issue(issue_id)["status"] == "open" and db.next_open_issue()["issue_id"] == issue_id
+    assert db.find_user_by_email("jane.smith@example.com")["address"] == before[0]["address"]
+
+
+def check_import(db: StorageBackend):
+    db.import_batch("users", [{"user_id": "user_900", "name": "Imported", "email": "imported@example.com",
+                               "account_balance": 10.0, "phone": "+1-555-0900"}])
+    db.import_batch("transactions", [
+        {"user_id": "user_900", "id": f"txn_900_{n}", "date": f"2024-01-0{n + 1}T00:00:00",
+         "description": "Imported", "amount": 1.0, "balance": 8.0 + n}
+        for n in range(3)
+    ])
+    db.import_batch("issues", [{"issue_id": "issue_900", "user_id": "user_900", "description": "Imported",
+                                "status": "open", "created_at": "2024-01-01T00:00:00", "priority": "medium"}])
+    db.import_finished()
+    assert db.get_user("user_900")["name"] == "Imported"
+    assert db.find_user_by_email("imported@example.com")["user_id"] == "user_900"
+    assert [t["id"] for t in as_dict(db.get_recent_transactions("user_900"))] == ["txn_900_2", "txn_900_1", "txn_900_0"]
+    assert db.get_issue("issue_900")["priority"] == "medium"
+    new_issue = db.report_issue("user_900", "Reported after the import", "low")
+    assert new_issue != "issue_900" and db.get_issue("issue_900")["description"] == "Imported"
+    assert db.last_issue_number() == issue_number(new_issue) > 900
+    for duplicate in ("issue_900", new_issue):
+        try:
+            db.import_batch("issues", [
+                {"issue_id": "issue_950", "user_id": "user_900", "description": "Duplicate batch",
+                 "status": "open", "created_at": "2024-01-02T00:00:00", "priority": "low"},
+                {"issue_id": duplicate, "user_id": "user_001", "description": "Overwritten",
+                 "status": "closed", "created_at": "2024-01-02T00:00:00", "priority": "low"}
+            ])
+            raise AssertionError("Importing an existing issue ID should fail")
+        except ValueError:
+            pass
+    assert db.get_issue("issue_900")["description"] == "Imported" and db.get_issue("issue_950") is None
+    assert db.get_issue(new_issue)["description"] == "Reported after the import"
+
+
+def check_async(db: StorageBackend):
+    async def run():
+        assert await db.aupdate_address("user_002", "2 Async Avenue")
+        assert (await db.aget_account_details("user_002"))["address"] == "2 Async Avenue"
+        issue_id = await db.areport_issue("user_002", "Async issue", "medium")
+        assert (await db.anext_open_issue())["issue_id"] == issue_id
+    asyncio.run(run())
+
+
+CHECKS: List[Tuple[str, Callable[[StorageBackend], None]]] = [
+    ("protocol", check_protocol),
+    ("users", check_users),
+    ("user updates", check_user_updates),
+    ("transactions", check_transactions),
+    ("issues", check_issues),
+    ("snapshot", check_snapshot),
+    ("batch", check_batch),
+    ("import", check_import),
+    ("async", check_async),
+]
+
+
+def check_durability(open_backend: Callable[[Path], StorageBackend], directory: Path):
+    """Writes made before close() must be visible after reopening the same directory."""
+    db = open_backend(directory)
+    db.update_address("user_002", "3 Durable Drive")
+    issue_id = db.report_issue("user_002", "Survives restart", "high")
+    db.update_issue(issue_id, status="in_progress")
+    txn = as_dict(db.add_transaction("user_002", "Durable", 5.0))
+    db.close()
+    db = open_backend(directory)
+    try:
+        assert db.get_account_details("user_002")["address"] == "3 Durable Drive", "Address should persist"
+        assert db.get_issue(issue_id)["status"] == "in_progress", "Issue update should persist"
+        assert as_dict(db.get_recent_transactions("user_002", 1)) == [txn], "Transaction should persist"
+        assert db.get_account_balance("user_002") == txn["balance"], "Balance should persist"
+    finally:
+        db.close()
+
+
+def run_conformance(
+    open_backend: Callable[[Path], StorageBackend],
+    directory: Path,
+    durable: bool = True
+) -> List[str]:
+    """Run every check against a backend; returns the names of the checks passed.
+
+    open_backend(dir) must open the backend stored in `dir`, seeding the
+    default data when it is empty. Each check gets its own empty
+    subdirectory of `directory`. durable=False skips the reopen check, for
+    backends that keep nothing (memory).
+    """
+    checks = CHECKS + ([("durability", None)] if durable else [])
+    passed = []
+    for n, (name, check) in enumerate(checks):
+        path = Path(directory) / f"check_{n:02d}"
+        path.mkdir(parents=True)
+        try:
+            if check is None:
+                check_durability(open_backend, path)
+            else:
+                db = open_backend(path)
+                try:
+                    check(db)
+                finally:
+                    db.close()
+        except AssertionError as e:
+            raise AssertionError(f"'{name}' check failed: {e}") from e
+        passed.append(name)
+    return passed
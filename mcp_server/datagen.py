@@ -0,0 +1,215 @@
+# mcp_server/datagen.py
+"""
+Deterministic synthetic data for benchmarks and load tests.
+A profile sets the number of users, the mean of their power-law
+distributed transaction counts and the share of users with open issues.
+The same profile and seed always produce the same rows (issue IDs are
+numbered after any already stored), and the rows go through the
+bulk-import path (import_batch) into any storage backend.
+
+Usage: python -m mcp_server.datagen {demo,10k,1m,10m} [--seed N] [--users N]
+"""
+
+from datetime import datetime, timezone
+from typing import Any, Callable, Dict, Iterator, List, Optional, Tuple
+import argparse
+import random
+import sys
+import time
+
+from .records import UserRecord, IssueRecord
+from .txn_store import TransactionColumns
+
+# users: user count; mean_transactions: mean per user (Pareto distributed,
+# capped at max_transactions); issue_rate: share of users with issues
+PROFILES: Dict[str, Dict[str, Any]] = {
+    "demo": {"users": 100, "mean_transactions": 20, "max_transactions": 500, "issue_rate": 0.1},
+    "10k": {"users": 10_000, "mean_transactions": 50, "max_transactions": 5_000, "issue_rate": 0.05},
+    "1m": {"users": 1_000_000, "mean_transactions": 20, "max_transactions": 10_000, "issue_rate": 0.02},
+    "10m": {"users": 10_000_000, "mean_transactions": 10, "max_transactions": 10_000, "issue_rate": 0.01},
+}
+# Shape of the transaction count distribution; smaller is heavier-tailed
+PARETO_ALPHA = 1.5
+# Every history ends here (not at "now"), so output never depends on the clock
+HISTORY_END = datetime(2025, 1, 1, tzinfo=timezone.utc).timestamp()
+HISTORY_DAYS = 730
+
+FIRST_NAMES = ("James", "Mary", "Wei", "Priya", "Carlos", "Fatima", "Olga", "Kenji", "Amara", "Lucas",
+               "Sofia", "Noah", "Aisha", "Mateo", "Hana", "Ethan", "Zoe", "Omar", "Ines", "Liam")
+LAST_NAMES = ("Smith", "Garcia", "Chen", "Patel", "Kim", "Okafor", "Novak", "Silva", "Müller", "Brown",
+              "Nguyen", "Rossi", "Haddad", "Cohen", "Kowalski", "Jones", "Sato", "Dubois", "Lopez", "Ali")
+STREETS = ("Main St", "Oak Ave", "Pine Rd", "Maple Dr", "Cedar Ln", "Elm St", "Lake View", "Hill Rd")
+CITIES = ("Springfield, IL 62701", "Portland, OR 97201", "Austin, TX 73301", "Denver, CO 80201",
+          "Boston, MA 02101", "Seattle, WA 98101", "Miami, FL 33101", "Madison, WI 53701")
+# (description, smallest amount, largest amount); deposits are positive
+SPENDING = (
+    ("Grocery Store", -250.0, -15.0), ("Amazon Purchase", -400.0, -5.0), ("Coffee Shop", -12.0, -3.0),
+    ("Gas Station", -90.0, -20.0), ("Restaurant", -150.0, -10.0), ("Electric Bill", -220.0, -40.0),
+    ("Phone Bill", -120.0, -30.0), ("Pharmacy", -80.0, -5.0), ("Streaming Service", -20.0, -8.0),
+)
+DEPOSITS = (("Salary Deposit", 1500.0, 6000.0), ("Transfer In", 20.0, 1000.0), ("Refund", 5.0, 200.0))
+ISSUE_DESCRIPTIONS = (
+    "Card declined at checkout", "Unrecognized transaction", "Need to update mailing address",
+    "Cannot log in to online banking", "Duplicate charge", "Request for a replacement card",
+    "Question about a fee", "Deposit not showing", "Dispute a merchant charge",
+)
+PRIORITY_CHOICES = ("low", "medium", "high")
+
+
+def get_profile(name: str, **overrides: Any) -> Dict[str, Any]:
+    """A copy of a named profile with `overrides` (e.g. users=5000) applied."""
+    if name not in PROFILES:
+        raise ValueError(f"Unknown profile '{name}'. Use one of: {', '.join(PROFILES)}")
+    return {**PROFILES[name], **{k: v for k, v in overrides.items() if v is not None}}
+
+
+def _iso(timestamp: float) -> str:
+    return datetime.fromtimestamp(timestamp, timezone.utc).replace(tzinfo=None).isoformat()
+
+
+def generate(
+    profile: Dict[str, Any],
+    seed: int = 0,
+    issue_offset: int = 0
+) -> Iterator[Tuple[Dict, List[Dict], List[Dict]]]:
+    """Yield (user, transactions, issues) rows for each user of the profile.
+
+    Each user's transactions are in date order with a running balance that
+    ends at the user's account_balance. Issue IDs are numbered from
+    issue_offset + 1.
+    """
+    rng = random.Random(seed)
+    mean = profile["mean_transactions"]
+    # A Pareto variate has mean alpha / (alpha - 1) times its minimum
+    scale = mean * (PARETO_ALPHA - 1) / PARETO_ALPHA
+    cap = profile["max_transactions"]
+    start = HISTORY_END - HISTORY_DAYS * 86400
+    txn_number = 0
+    issue_number = issue_offset
+    for i in range(1, profile["users"] + 1):
+        user_id = f"user_{i:08d}"
+        first, last = rng.choice(FIRST_NAMES), rng.choice(LAST_NAMES)
+        count = min(cap, int(scale * rng.paretovariate(PARETO_ALPHA)))
+        balance = round(rng.uniform(0, 5000), 2)
+        times = sorted(rng.uniform(start, HISTORY_END) for _ in range(count))
+        transactions = []
+        for timestamp in times:
+            description, low, high = rng.choice(DEPOSITS if rng.random() < 0.1 else SPENDING)
+            amount = round(rng.uniform(low, high), 2)
+            balance = round(balance + amount, 2)
+            txn_number += 1
+            transactions.append({
+                "user_id": user_id,
+                "id": f"txn_{txn_number:010d}",
+                "date": _iso(timestamp),
+                "description": description,
+                "amount": amount,
+                "balance": balance
+            })
+        issues = []
+        if rng.random() < profile["issue_rate"]:
+            for _ in range(min(10, int(rng.paretovariate(2.0)))):
+                issue_number += 1
+                issues.append({
+                    "issue_id": f"issue_{issue_number:03d}",
+                    "user_id": user_id,
+                    "description": rng.choice(ISSUE_DESCRIPTIONS),
+                    # Most of the backlog is still open
+                    "status": "open" if rng.random() < 0.7 else "closed",
+                    "created_at": _iso(rng.uniform(start, HISTORY_END)),
+                    "priority": rng.choice(PRIORITY_CHOICES)
+                })
+        user = {
+            "user_id": user_id,
+            "name": f"{first} {last}",
+            "email": f"{first.lower()}.{last.lower()}{i}@example.com",
+            "password": f"hashed_password_{rng.getrandbits(32):08x}",
+            "address": f"{rng.randint(1, 9999)} {rng.choice(STREETS)}, {rng.choice(CITIES)}",
+            "account_balance": balance,
+            "card_status": "active" if rng.random() < 0.95 else "deactivated",
+            "card_number": f"**** **** **** {rng.randint(0, 9999):04d}",
+            "phone": f"+1-{200 + i // 10_000_000:03d}-{i // 10_000 % 1000:03d}-{i % 10_000:04d}"
+        }
+        yield user, transactions, issues
+
+
+def populate(
+    db,
+    profile: Dict[str, Any],
+    seed: int = 0,
+    batch_users: int = 1000,
+    progress: Optional[Callable[[int, float], None]] = None
+) -> Dict[str, Any]:
+    """Generate a profile into db through its bulk-import path.
+
+    Issue IDs continue after the highest one already in db, so existing
+    tickets are never replaced.
+    `progress(rows_so_far, elapsed_seconds)` is called after every batch.
+    """
+    started = time.perf_counter()
+    counts = {"users": 0, "transactions": 0, "issues": 0}
+    batch: Dict[str, List[Dict[str, Any]]] = {kind: [] for kind in counts}
+
+    def write():
+        for kind, rows in batch.items():
+            if rows:
+                counts[kind] += db.import_batch(kind, rows)
+                rows.clear()
+        if progress:
+            progress(sum(counts.values()), time.perf_counter() - started)
+
+    for n, (user, transactions, issues) in enumerate(generate(profile, seed, db.last_issue_number()), 1):
+        batch["users"].append(user)
+        batch["transactions"].extend(transactions)
+        batch["issues"].extend(issues)
+        if n % batch_users == 0:
+            write()
+    write()
+    db.import_finished()
+    seconds = time.perf_counter() - started
+    rows = sum(counts.values())
+    return {**counts, "rows": rows, "seconds": seconds, "rows_per_second": rows / seconds if seconds > 0 else 0.0}
+
+
+def build_database(profile: Dict[str, Any], seed: int = 0) -> Dict[str, Any]:
+    """Generate a profile in memory as MockDatabase holds it (records and transaction columns)."""
+    users, transactions, issues = {}, {}, []
+    for user, txns, user_issues in generate(profile, seed):
+        users[user["user_id"]] = UserRecord.from_dict(user)
+        transactions[user["user_id"]] = TransactionColumns.from_dicts(txns)
+        issues.extend(IssueRecord.from_dict(issue) for issue in user_issues)
+    return {"users": users, "transactions": transactions, "issues": issues}
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Generate synthetic users, transactions and issues")
+    parser.add_argument("profile", choices=PROFILES)
+    parser.add_argument("--seed", type=int, default=0, help="Random seed (default: 0)")
+    parser.add_argument("--users", type=int, help="Override the profile's user count")
+    parser.add_argument("--batch-users", type=int, default=1000,
+                        help="Users generated per import batch (default: 1000)")
+    args = parser.parse_args()
+    if args.batch_users < 1:
+        parser.error("--batch-users must be at least 1")
+    profile = get_profile(args.profile, users=args.users)
+
+    # Imported here so --help works without opening the database
+    from .storage import db
+
+    last_report = [0.0]
+
+    def progress(rows: int, seconds: float):
+        if seconds - last_report[0] >= 1.0:
+            last_report[0] = seconds
+            print(f"[Datagen] {rows:,} rows ({rows / seconds:,.0f} rows/s)", file=sys.stderr)
+
+    try:
+        stats = populate(db, profile, args.seed, args.batch_users, progress)
+    finally:
+        db.close()
+    print(f"Generated {stats['users']:,} users, {stats['transactions']:,} transactions and "
+          f"{stats['issues']:,} issues in {stats['seconds']:.1f}s ({stats['rows_per_second']:,.0f} rows/s)")
+
+
+if __name__ == "__main__":
+    main()
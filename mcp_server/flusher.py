@@ -0,0 +1,102 @@
+# mcp_server/flusher.py
+"""
+Group-commit flusher for database persistence.
+Mutations only mark the store dirty; a background thread coalesces them
+into one write per interval or batch, depending on the durability policy.
+"""
+
+from typing import Callable
+import sys
+import threading
+
+# Durability policies:
+#   always   - write synchronously on every mutation (no flusher thread)
+#   interval - background write every interval_ms, or sooner once batch_size changes queue up
+#   shutdown - write only on flush()/close() (e.g. at process exit)
+FLUSH_POLICIES = ("always", "interval", "shutdown")
+
+
+class GroupCommitFlusher:
+    """Coalesces dirty marks into batched calls to a write function."""
+
+    def __init__(
+        self,
+        write_fn: Callable[[], None],
+        policy: str = "interval",
+        interval_ms: int = 100,
+        batch_size: int = 100
+    ):
+        if policy not in FLUSH_POLICIES:
+            raise ValueError(f"Unknown flush policy '{policy}'. Use one of: {', '.join(FLUSH_POLICIES)}")
+        self.write_fn = write_fn
+        self.policy = policy
+        self.interval = interval_ms / 1000.0
+        self.batch_size = max(1, batch_size)
+        self._pending = 0
+        self._closed = False
+        self._cond = threading.Condition()
+        # Serializes writes so flush() can act as a barrier for the thread
+        self._write_lock = threading.Lock()
+        self._thread = None
+        if policy == "interval":
+            self._thread = threading.Thread(target=self._run, name="db-flusher", daemon=True)
+            self._thread.start()
+
+    def _log(self, message: str):
+        """Log to stderr to avoid interfering with stdio MCP protocol."""
+        print(message, file=sys.stderr)
+
+    @property
+    def pending(self) -> int:
+        """Number of mutations not yet written."""
+        return self._pending
+
+    def mark_dirty(self, count: int = 1):
+        """Record that `count` mutations need to be written."""
+        with self._cond:
+            self._pending += count
+            if self._pending >= self.batch_size:
+                self._cond.notify()
+        if self.policy == "always":
+            self.flush()
+
+    def _run(self):
+        """Background loop: wait for an interval or a full batch, then write."""
+        while True:
+            with self._cond:
+                if not self._closed and self._pending < self.batch_size:
+                    self._cond.wait(self.interval)
+                if self._closed:
+                    return
+                if self._pending == 0:
+                    continue
+            try:
+                self.flush()
+            except Exception as e:
+                self._log(f"[DB] Background flush failed, will retry: {e}")
+
+    def flush(self):
+        """Barrier: write all pending mutations in one batch and return once written."""
+        with self._write_lock:
+            with self._cond:
+                count = self._pending
+                self._pending = 0
+            if count == 0:
+                return
+            try:
+                self.write_fn()
+            except Exception:
+                with self._cond:
+                    self._pending += count
+                raise
+
+    def close(self):
+        """Stop the background thread and write anything still pending."""
+        with self._cond:
+            if self._closed:
+                return
+            self._closed = True
+            self._cond.notify()
+        if self._thread is not None:
+            self._thread.join()
+        self.flush()
@@ -0,0 +1,79 @@
+# mcp_server/fragments.py
+"""
+Incremental encoding of JSON documents.
+A document is written one entry per line, and each entry's encoded bytes
+are cached until the value changes, so saving after a single mutation
+re-encodes only the records that mutation touched.
+"""
+
+from typing import Any, Dict, List, Mapping, Tuple
+
+from .txn_store import TransactionColumns
+
+
+def change_token(value: Any) -> Any:
+    """What identifies this state of `value`.
+
+    Published records are replaced rather than modified, so the record
+    object itself is the token. Transaction columns grow in place and
+    carry a version instead, which their copies share.
+    """
+    if isinstance(value, TransactionColumns):
+        return value.version
+    return value
+
+
+class FragmentCache:
+    """Encoded entries of a document's sections, re-encoded only when they change."""
+
+    def __init__(self, codec):
+        self.codec = codec
+        # (section, key) -> (change token, encoded line)
+        self._entries: Dict[Tuple[str, Any], Tuple[Any, bytes]] = {}
+        # Entries encoded vs. reused by the last encode() call
+        self.encoded = 0
+        self.reused = 0
+
+    def _line(self, section: str, key: Any, prefix: bytes, value: Any) -> bytes:
+        token = change_token(value)
+        entry = self._entries.get((section, key))
+        if entry is not None and (entry[0] is token or (type(token) is int and entry[0] == token)):
+            self.reused += 1
+            return entry[1]
+        line = prefix + self.codec.dumps(value)
+        self._entries[(section, key)] = (token, line)
+        self.encoded += 1
+        return line
+
+    def _encode_section(self, section: str, value: Any) -> bytes:
+        if isinstance(value, Mapping):
+            lines = [
+                self._line(section, key, b"    " + self.codec.dumps(key) + b": ", item)
+                for key, item in value.items()
+            ]
+            return b"{\n" + b",\n".join(lines) + b"\n  }" if lines else b"{}"
+        if isinstance(value, list):
+            # Issues are appended and updated in place, so positions are stable keys
+            lines = [self._line(section, i, b"    ", item) for i, item in enumerate(value)]
+            return b"[\n" + b",\n".join(lines) + b"\n  ]" if lines else b"[]"
+        return self.codec.dumps(value)
+
+    def encode(self, document: Dict[str, Any]) -> bytes:
+        """Encode `document`, reusing the cached bytes of every unchanged entry."""
+        self.encoded = self.reused = 0
+        parts: List[bytes] = [
+            b"  " + self.codec.dumps(section) + b": " + self._encode_section(section, value)
+            for section, value in document.items()
+        ]
+        if len(self._entries) > self.encoded + self.reused:
+            # Drop entries of keys that left the document
+            live = {
+                (section, key) for section, value in document.items()
+                if isinstance(value, (Mapping, list))
+                for key in (value if isinstance(value, Mapping) else range(len(value)))
+            }
+            self._entries = {k: v for k, v in self._entries.items() if k in live}
+        return b"{\n" + b",\n".join(parts) + b"\n}\n"
+
+    def clear(self):
+        self._entries.clear()
@@ -0,0 +1,124 @@
+# mcp_server/indexes.py
+"""
+Secondary indexes for MockDatabase.
+Maps email/phone to user_id and issue_id/user_id/status to issues, so
+lookups are O(1) instead of scanning every user or issue.
+"""
+
+from typing import Any, Callable, Dict, Iterable, List, Optional, Set, Tuple
+import re
+import threading
+
+_NON_DIGITS = re.compile(r"\D")
+
+
+def normalize_email(email: Optional[str]) -> Optional[str]:
+    return email.strip().lower() if email else None
+
+
+def normalize_phone(phone: Optional[str]) -> Optional[str]:
+    """Keep digits only, so "+1-555-0123" and "1 555 0123" match."""
+    digits = _NON_DIGITS.sub("", phone) if phone else ""
+    return digits or None
+
+
+class SecondaryIndexes:
+    """Incrementally maintained lookup tables over users and issues.
+
+    The user indexes are built on first use from `users_source`, so modes
+    that load users on demand don't have to read every record at startup.
+    Updates take an internal lock; point lookups read the dicts without it.
+    """
+
+    def __init__(self, users_source: Callable[[], Iterable[Any]]):
+        self._users_source = users_source
+        self._users_built = False
+        self._lock = threading.RLock()
+        self.by_email: Dict[str, str] = {}
+        self.by_phone: Dict[str, str] = {}
+        # user_id -> (email key, phone key) currently indexed for that user
+        self._user_keys: Dict[str, Tuple[Optional[str], Optional[str]]] = {}
+        self.issue_by_id: Dict[str, Any] = {}
+        self.issues_by_user: Dict[str, List[Any]] = {}
+        self.issues_by_status: Dict[str, Set[str]] = {}
+
+    def rebuild(self, issues: Iterable[Any]):
+        """Re-index every issue now and every user on next lookup."""
+        with self._lock:
+            self._users_built = False
+            self.by_email.clear()
+            self.by_phone.clear()
+            self._user_keys.clear()
+            self.issue_by_id.clear()
+            self.issues_by_user.clear()
+            self.issues_by_status.clear()
+            for issue in issues:
+                self.put_issue(issue)
+
+    def _ensure_users(self):
+        if not self._users_built:
+            with self._lock:
+                if not self._users_built:
+                    for user in self._users_source():
+                        self._index_user(user)
+                    self._users_built = True
+
+    def put_user(self, user: Any):
+        """Index a new or changed user, dropping its stale keys."""
+        with self._lock:
+            if self._users_built:
+                # Otherwise it is picked up by the full build on first lookup
+                self._index_user(user)
+
+    def _index_user(self, user: Any):
+        user_id = user["user_id"]
+        old_email, old_phone = self._user_keys.get(user_id, (None, None))
+        email, phone = normalize_email(user["email"]), normalize_phone(user["phone"])
+        if old_email != email:
+            if old_email and self.by_email.get(old_email) == user_id:
+                del self.by_email[old_email]
+            if email:
+                self.by_email[email] = user_id
+        if old_phone != phone:
+            if old_phone and self.by_phone.get(old_phone) == user_id:
+                del self.by_phone[old_phone]
+            if phone:
+                self.by_phone[phone] = user_id
+        self._user_keys[user_id] = (email, phone)
+
+    def put_issue(self, issue: Any, old_status: Optional[str] = None):
+        """Index a new issue, or move an existing one to its new status."""
+        with self._lock:
+            issue_id = issue["issue_id"]
+            existing = self.issue_by_id.get(issue_id)
+            if existing is None:
+                self.issues_by_user.setdefault(issue["user_id"], []).append(issue)
+            elif existing is not issue:
+                user_issues = self.issues_by_user.get(issue["user_id"], [])
+                user_issues[:] = [issue if i["issue_id"] == issue_id else i for i in user_issues]
+            if existing is not None:
+                old_status = old_status or existing["status"]
+            if old_status and old_status != issue["status"]:
+                self.issues_by_status.get(old_status, set()).discard(issue_id)
+            self.issue_by_id[issue_id] = issue
+            self.issues_by_status.setdefault(issue["status"], set()).add(issue_id)
+
+    def user_id_by_email(self, email: str) -> Optional[str]:
+        self._ensure_users()
+        return self.by_email.get(normalize_email(email))
+
+    def user_id_by_phone(self, phone: str) -> Optional[str]:
+        self._ensure_users()
+        return self.by_phone.get(normalize_phone(phone))
+
+    def issue(self, issue_id: str) -> Optional[Any]:
+        return self.issue_by_id.get(issue_id)
+
+    def issues_for_user(self, user_id: str) -> List[Any]:
+        return list(self.issues_by_user.get(user_id, []))
+
+    def issues_with_status(self, status: str) -> List[Any]:
+        with self._lock:
+            # Sets can't be iterated while another thread resizes them
+            issue_ids = sorted(self.issues_by_status.get(status, ()))
+        return [self.issue_by_id[i] for i in issue_ids]
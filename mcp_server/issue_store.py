@@ -0,0 +1,167 @@
+# mcp_server/issue_store.py
+"""
+Issue storage and triage queues for MockDatabase.
+Issues stay in one list in creation order (the order they are saved in);
+an issue_id -> position map lets an update replace a record in place, and
+one heap per priority keeps the open backlog ready for triage, so the next
+ticket to work is found in O(log n) instead of by scanning every issue.
+"""
+
+from typing import Callable, Dict, Iterable, List, Optional, Tuple
+import heapq
+import re
+import threading
+
+from .records import IssueRecord, ISSUE_OPEN, ISSUE_STATUSES, ISSUE_TRANSITIONS, PRIORITIES
+
+# Generated issue IDs: "issue_" and a number, zero-padded to three digits
+ISSUE_ID_PATTERN = re.compile(r"issue_(\d+)")
+
+# Heaps in triage order: high, medium, then low (and unknown) priority
+TRIAGE_ORDER = tuple(reversed(PRIORITIES))
+
+
+def triage_rank(priority: Optional[str]) -> int:
+    """Index of a priority in TRIAGE_ORDER; unknown priorities rank last."""
+    try:
+        return TRIAGE_ORDER.index(priority)
+    except ValueError:
+        return len(TRIAGE_ORDER) - 1
+
+
+def issue_number(issue_id: str) -> int:
+    """The number in a generated-style issue ID, 0 for any other ID."""
+    match = ISSUE_ID_PATTERN.fullmatch(issue_id)
+    return int(match.group(1)) if match else 0
+
+
+def format_issue_id(number: int) -> str:
+    return f"issue_{number:03d}"
+
+
+def _open_rank(issue: Optional[IssueRecord]) -> Optional[int]:
+    """The heap an issue belongs in, or None unless it is open."""
+    if issue is None or issue.status != ISSUE_OPEN:
+        return None
+    return triage_rank(issue.priority)
+
+
+def check_issue_change(current_status: str, status: Optional[str] = None, priority: Optional[str] = None):
+    """Raise ValueError for an unknown status or priority, or a status change that isn't allowed."""
+    if priority is not None and priority not in PRIORITIES:
+        raise ValueError(f"Unknown priority '{priority}'. Use one of: {', '.join(PRIORITIES)}")
+    if status is None or status == current_status:
+        return
+    if status not in ISSUE_STATUSES:
+        raise ValueError(f"Unknown status '{status}'. Use one of: {', '.join(ISSUE_STATUSES)}")
+    if status not in ISSUE_TRANSITIONS.get(current_status, ISSUE_STATUSES):
+        raise ValueError(f"Cannot change an issue from '{current_status}' to '{status}'")
+
+
+def check_new_issue_ids(issue_ids: Iterable[str], exists: Callable[[str], bool]):
+    """Raise ValueError for an imported issue ID that is already stored or repeats in the batch."""
+    seen = set()
+    for issue_id in issue_ids:
+        if issue_id in seen or exists(issue_id):
+            raise ValueError(f"Issue {issue_id} already exists")
+        seen.add(issue_id)
+
+
+class IssueStore:
+    """Issues in creation order, with per-priority heaps of open issues and open counts per user.
+
+    Records are replaced rather than modified, so an update puts the new
+    record at the old one's position. Heap entries are dropped lazily: an
+    entry counts only while its issue is still open at that priority.
+    """
+
+    def __init__(self, issues: Iterable[IssueRecord] = ()):
+        self._lock = threading.RLock()
+        self.rebuild(issues)
+
+    def rebuild(self, issues: Iterable[IssueRecord]):
+        """Take over `issues` (kept as the stored list) and re-index them."""
+        with self._lock:
+            self.issues: List[IssueRecord] = issues if isinstance(issues, list) else list(issues)
+            self._positions: Dict[str, int] = {}
+            # (created_at, position, issue_id) per priority, oldest first
+            self._heaps: List[List[Tuple[str, int, str]]] = [[] for _ in TRIAGE_ORDER]
+            self._open = [0] * len(TRIAGE_ORDER)
+            self._open_by_user: Dict[str, int] = {}
+            # Highest issue number stored, so new IDs never collide with imported ones
+            self.last_number = 0
+            for position, issue in enumerate(self.issues):
+                self._positions[issue.issue_id] = position
+                self.last_number = max(self.last_number, issue_number(issue.issue_id))
+                self._track(None, issue, position)
+            for heap in self._heaps:
+                heapq.heapify(heap)
+
+    def __len__(self) -> int:
+        return len(self.issues)
+
+    def get(self, issue_id: str) -> Optional[IssueRecord]:
+        position = self._positions.get(issue_id)
+        return self.issues[position] if position is not None else None
+
+    def put(self, issue: IssueRecord) -> Optional[IssueRecord]:
+        """Add a new issue or replace an existing one; returns the previous version."""
+        with self._lock:
+            position = self._positions.get(issue.issue_id)
+            old = None
+            if position is None:
+                position = self._positions[issue.issue_id] = len(self.issues)
+                self.issues.append(issue)
+                self.last_number = max(self.last_number, issue_number(issue.issue_id))
+            else:
+                old = self.issues[position]
+                self.issues[position] = issue
+            self._track(old, issue, position)
+            return old
+
+    def next_id(self) -> str:
+        """The ID for a new issue: one past the highest number stored (the caller serializes allocation)."""
+        return format_issue_id(self.last_number + 1)
+
+    def _track(self, old: Optional[IssueRecord], new: IssueRecord, position: int):
+        was, now = _open_rank(old), _open_rank(new)
+        if was is not None:
+            self._open[was] -= 1
+            remaining = self._open_by_user[old.user_id] - 1
+            if remaining:
+                self._open_by_user[old.user_id] = remaining
+            else:
+                del self._open_by_user[old.user_id]
+        if now is not None:
+            self._open[now] += 1
+            self._open_by_user[new.user_id] = self._open_by_user.get(new.user_id, 0) + 1
+            if now != was:
+                heap = self._heaps[now]
+                heapq.heappush(heap, (new.created_at or "", position, new.issue_id))
+                if len(heap) > 2 * self._open[now] + 64:
+                    self._compact(now)
+
+    def _compact(self, rank: int):
+        """Drop dead and duplicate entries once they outnumber the live ones."""
+        live = {entry for entry in self._heaps[rank] if _open_rank(self.issues[entry[1]]) == rank}
+        self._heaps[rank] = list(live)
+        heapq.heapify(self._heaps[rank])
+
+    def next_open(self, priority: Optional[str] = None) -> Optional[IssueRecord]:
+        """The oldest open issue of the highest priority (or of `priority`), without claiming it."""
+        ranks = [triage_rank(priority)] if priority else range(len(TRIAGE_ORDER))
+        with self._lock:
+            for rank in ranks:
+                heap = self._heaps[rank]
+                while heap:
+                    issue = self.issues[heap[0][1]]
+                    if _open_rank(issue) == rank:
+                        return issue
+                    heapq.heappop(heap)
+        return None
+
+    def open_count(self, user_id: Optional[str] = None) -> int:
+        """Open issues of one user, or of everyone."""
+        if user_id is None:
+            return sum(self._open)
+        return self._open_by_user.get(user_id, 0)
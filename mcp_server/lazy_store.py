@@ -0,0 +1,293 @@
+# mcp_server/lazy_store.py
+"""
+Lazily loaded, log-structured record store for the mock database.
+Each user's record and transaction list is one JSON line in records.jsonl;
+an index of user_id -> (offset, length) lets startup skip parsing records,
+which are deserialized on first access and kept in a bounded LRU cache.
+"""
+
+from typing import Any, Dict, Iterator, Optional, Set, Tuple
+from collections import OrderedDict
+from collections.abc import MutableMapping
+import json
+import os
+import sys
+import threading
+from pathlib import Path
+
+from .codec import get_codec
+from .records import UserRecord, transactions_from_dicts
+from .txn_store import TransactionColumns
+
+SECTIONS = ("users", "transactions")
+# Records are written with user_id first so the index can be rebuilt
+# without parsing whole records
+USER_ID_PREFIX = b'{"user_id":'
+# What follows the user_id of a record that only has transactions
+NO_USER = ',"users":null'
+
+
+class LazyRecordStore:
+    """Append-only per-user records with an offset index and an LRU of resident records."""
+
+    def __init__(self, directory: Path, cache_size: int = 10000, codec=None):
+        self.directory = Path(directory)
+        self.codec = codec or get_codec()
+        self.records_file = self.directory / "records.jsonl"
+        self.index_file = self.directory / "records.idx"
+        self.cache_size = max(1, cache_size)
+        self._offsets: Dict[str, Tuple[int, int]] = {}
+        self._cache: "OrderedDict[str, Dict[str, Any]]" = OrderedDict()
+        self._dirty: Set[str] = set()
+        # Indexed records whose users section is empty (transactions only)
+        self._userless: Set[str] = set()
+        self._lock = threading.RLock()
+        self._reader = None
+        self._writer = None
+        self.loads = 0
+
+    def _log(self, message: str):
+        """Log to stderr to avoid interfering with stdio MCP protocol."""
+        print(message, file=sys.stderr)
+
+    def exists(self) -> bool:
+        return self.records_file.exists()
+
+    def mapping(self, section: str) -> "LazyMapping":
+        return LazyMapping(self, section)
+
+    def describe(self) -> str:
+        return f"Indexed {len(self._offsets)} users (records load on demand, LRU {self.cache_size})"
+
+    def open(self):
+        """Load the saved index, then index any records appended after it."""
+        covered = 0
+        if self.index_file.exists():
+            with open(self.index_file, 'rb') as f:
+                saved = self.codec.loads(f.read())
+            if saved.get("size", 0) <= self.records_file.stat().st_size:
+                covered = saved["size"]
+                self._offsets = {k: tuple(v) for k, v in saved["offsets"].items()}
+                self._userless = set(saved.get("userless", ()))
+        with open(self.records_file, 'rb') as f:
+            f.seek(covered)
+            offset = covered
+            decoder = json.JSONDecoder()
+            for line in f:
+                if line.endswith(b"\n") and line.startswith(USER_ID_PREFIX):
+                    text = line[len(USER_ID_PREFIX):].decode('utf-8')
+                    user_id, end = decoder.raw_decode(text)
+                    self._offsets[user_id] = (offset, len(line))
+                    if text.startswith(NO_USER, end):
+                        self._userless.add(user_id)
+                    else:
+                        self._userless.discard(user_id)
+                offset += len(line)
+
+    def create(self):
+        """Start an empty store."""
+        self.directory.mkdir(parents=True, exist_ok=True)
+        self._close_files()
+        with open(self.records_file, 'w'):
+            pass
+        self.index_file.unlink(missing_ok=True)
+        self._offsets.clear()
+        self._cache.clear()
+        self._dirty.clear()
+        self._userless.clear()
+
+    def __contains__(self, user_id: object) -> bool:
+        return user_id in self._offsets or user_id in self._cache
+
+    def user_ids(self) -> Iterator[str]:
+        return iter(list(self._offsets.keys() | self._cache.keys()))
+
+    def __len__(self) -> int:
+        return len(self._offsets.keys() | self._cache.keys())
+
+    def has_user(self, user_id: object) -> bool:
+        """Whether a record with a users section exists, without loading it."""
+        with self._lock:
+            record = self._cache.get(user_id)
+            if record is not None:
+                return record["users"] is not None
+            return user_id in self._offsets and user_id not in self._userless
+
+    @property
+    def resident_count(self) -> int:
+        return len(self._cache)
+
+    def get(self, user_id: str) -> Optional[Dict[str, Any]]:
+        """Return a user's record, reading it from disk on a cache miss."""
+        with self._lock:
+            record = self._cache.get(user_id)
+            if record is not None:
+                self._cache.move_to_end(user_id)
+                return record
+            location = self._offsets.get(user_id)
+            if location is None:
+                return None
+            if self._reader is None:
+                self._reader = open(self.records_file, 'rb')
+            self._reader.seek(location[0])
+            line = self.codec.loads(self._reader.read(location[1]))
+            record = {
+                "users": UserRecord.from_dict(line["users"]),
+                "transactions": transactions_from_dicts(line["transactions"])
+            }
+            self.loads += 1
+            self._cache[user_id] = record
+            self._evict()
+            return record
+
+    def ensure(self, user_id: str) -> Dict[str, Any]:
+        """Return a user's record, creating an empty one if needed."""
+        with self._lock:
+            record = self.get(user_id)
+            if record is None:
+                record = {"users": None, "transactions": TransactionColumns()}
+                self._cache[user_id] = record
+                self._dirty.add(user_id)
+            return record
+
+    def _evict(self):
+        """Drop least recently used records; dirty ones stay until written."""
+        if len(self._cache) <= self.cache_size:
+            return
+        for user_id in list(self._cache):
+            if len(self._cache) <= self.cache_size:
+                break
+            if user_id not in self._dirty:
+                del self._cache[user_id]
+
+    def set(self, user_id: str, section: str, value: Any):
+        """Replace one section of a user's record, creating the record if needed, and mark it dirty.
+
+        One step under the lock, so no other thread's load can evict the
+        record between the change and the dirty mark.
+        """
+        with self._lock:
+            self.ensure(user_id)[section] = value
+            self._dirty.add(user_id)
+
+    def mark_dirty(self, user_id: str):
+        with self._lock:
+            if user_id in self._cache:
+                self._dirty.add(user_id)
+
+    def write_dirty(self) -> int:
+        """Append the new version of every dirty record and repoint the index."""
+        with self._lock:
+            dirty, self._dirty = self._dirty, set()
+            if not dirty:
+                return 0
+            if self._writer is None:
+                self._writer = open(self.records_file, 'ab')
+            offset = self._writer.seek(0, os.SEEK_END)
+            chunks = []
+            for user_id in dirty:
+                record = self._cache[user_id]
+                line = self._encode(user_id, record)
+                self._offsets[user_id] = (offset, len(line))
+                if record["users"] is None:
+                    self._userless.add(user_id)
+                else:
+                    self._userless.discard(user_id)
+                offset += len(line)
+                chunks.append(line)
+            self._writer.write(b"".join(chunks))
+            self._writer.flush()
+            self._evict()
+            return len(dirty)
+
+    def _encode(self, user_id: str, record: Dict[str, Any]) -> bytes:
+        line = {"user_id": user_id, **{section: record[section] for section in SECTIONS}}
+        return self.codec.dumps(line) + b"\n"
+
+    def checkpoint(self):
+        """Write dirty records, drop superseded versions and save the index."""
+        with self._lock:
+            self.write_dirty()
+            self._close_files()
+            tmp = self.records_file.with_name(self.records_file.name + ".tmp")
+            offsets: Dict[str, Tuple[int, int]] = {}
+            offset = 0
+            with open(self.records_file, 'rb') as src, open(tmp, 'wb') as dst:
+                for user_id, (start, length) in self._offsets.items():
+                    src.seek(start)
+                    dst.write(src.read(length))
+                    offsets[user_id] = (offset, length)
+                    offset += length
+            os.replace(tmp, self.records_file)
+            self._offsets = offsets
+            self.save_index()
+
+    def save_index(self):
+        """Persist the offset index so the next startup skips the scan."""
+        with self._lock:
+            tmp = self.index_file.with_name(self.index_file.name + ".tmp")
+            with open(tmp, 'wb') as f:
+                f.write(self.codec.dumps({
+                    "size": self.records_file.stat().st_size,
+                    "offsets": self._offsets,
+                    "userless": sorted(self._userless)
+                }))
+            os.replace(tmp, self.index_file)
+
+    def _close_files(self):
+        for fh in (self._reader, self._writer):
+            if fh is not None:
+                fh.close()
+        self._reader = self._writer = None
+
+    def close(self):
+        """Save the index and close file handles."""
+        with self._lock:
+            self._close_files()
+            if self.records_file.exists():
+                self.save_index()
+
+
+class LazyMapping(MutableMapping):
+    """Dict-like view of one section (users or transactions) of a LazyRecordStore."""
+
+    def __init__(self, store: LazyRecordStore, section: str):
+        self.store = store
+        self.section = section
+
+    def __getitem__(self, key: str) -> Any:
+        record = self.store.get(key)
+        if record is None or record[self.section] is None:
+            raise KeyError(key)
+        return record[self.section]
+
+    def get(self, key: str, default: Any = None) -> Any:
+        try:
+            return self[key]
+        except KeyError:
+            return default
+
+    def __contains__(self, key: object) -> bool:
+        # Answered from the index for users, without loading the record
+        if self.section == "users":
+            return self.store.has_user(key)
+        return MutableMapping.__contains__(self, key)
+
+    def __setitem__(self, key: str, value: Any):
+        self.store.set(key, self.section, value)
+
+    def __delitem__(self, key: str):
+        if self.store.get(key) is None:
+            raise KeyError(key)
+        self.store.set(key, self.section, None if self.section == "users" else TransactionColumns())
+
+    def __iter__(self) -> Iterator[str]:
+        # Records that only hold transactions are not users
+        if self.section == "users":
+            return (user_id for user_id in self.store.user_ids() if self.store.has_user(user_id))
+        return self.store.user_ids()
+
+    def __len__(self) -> int:
+        if self.section == "users":
+            return sum(1 for _ in self)
+        return len(self.store)
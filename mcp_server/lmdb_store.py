@@ -0,0 +1,211 @@
+# mcp_server/lmdb_store.py
+"""
+LMDB-backed record store for the mock database.
+Each user's record and transaction list is one value keyed by user_id in
+a memory-mapped LMDB B+tree, so a record is read without scanning or
+parsing anything else, and each write of dirty records is one ACID
+transaction. Decoded records are kept in a bounded LRU, as in lazy mode.
+Needs the optional `lmdb` package.
+"""
+
+from typing import Any, Dict, Iterator, Optional, Set
+from collections import OrderedDict
+import sys
+import threading
+from pathlib import Path
+
+from .codec import get_codec
+from .lazy_store import LazyMapping, SECTIONS
+from .records import UserRecord, transactions_from_dicts
+from .txn_store import TransactionColumns
+
+try:
+    import lmdb
+except ImportError:
+    lmdb = None
+
+# Stored value of a record that only has transactions (sections are written users first)
+NO_USER = b'{"users":null'
+
+
+class LMDBRecordStore:
+    """Per-user records in an LMDB environment with an LRU of resident records."""
+
+    def __init__(self, directory: Path, cache_size: int = 10000, map_size: int = 1024 ** 3,
+                 fsync: bool = False, codec=None):
+        if lmdb is None:
+            raise RuntimeError("DB_PERSISTENCE=lmdb needs the lmdb package (pip install lmdb)")
+        self.directory = Path(directory)
+        self.codec = codec or get_codec()
+        self.cache_size = max(1, cache_size)
+        # LMDB reserves address space up front; the map doubles when it fills
+        self.map_size = map_size
+        self.fsync = fsync
+        self._env = None
+        self._cache: "OrderedDict[str, Dict[str, Any]]" = OrderedDict()
+        self._dirty: Set[str] = set()
+        # Created in memory and not yet written, so not in LMDB either
+        self._new: Set[str] = set()
+        self._lock = threading.RLock()
+        self.loads = 0
+
+    def _log(self, message: str):
+        """Log to stderr to avoid interfering with stdio MCP protocol."""
+        print(message, file=sys.stderr)
+
+    def exists(self) -> bool:
+        return (self.directory / "data.mdb").exists()
+
+    def mapping(self, section: str) -> LazyMapping:
+        return LazyMapping(self, section)
+
+    def describe(self) -> str:
+        return f"Opened LMDB store of {len(self)} users (records load on demand, LRU {self.cache_size})"
+
+    def open(self):
+        with self._lock:
+            if self._env is None:
+                self.directory.mkdir(parents=True, exist_ok=True)
+                # sync=False still keeps the store consistent, like DB_WAL_FSYNC=false
+                self._env = lmdb.open(str(self.directory), map_size=self.map_size, sync=self.fsync)
+
+    def create(self):
+        """Start an empty store."""
+        with self._lock:
+            self.open()
+            with self._env.begin(write=True) as txn:
+                txn.drop(self._env.open_db(), delete=False)
+            self._cache.clear()
+            self._dirty.clear()
+            self._new.clear()
+
+    def __contains__(self, user_id: object) -> bool:
+        if not isinstance(user_id, str):
+            return False
+        with self._lock:
+            if user_id in self._cache:
+                return True
+            with self._env.begin() as txn:
+                return txn.get(user_id.encode('utf-8')) is not None
+
+    def user_ids(self) -> Iterator[str]:
+        with self._lock:
+            with self._env.begin() as txn:
+                stored = [key.decode('utf-8') for key in txn.cursor().iternext(keys=True, values=False)]
+            return iter(stored + sorted(self._new))
+
+    def __len__(self) -> int:
+        with self._lock:
+            return self._env.stat()["entries"] + len(self._new)
+
+    def has_user(self, user_id: object) -> bool:
+        """Whether a record with a users section exists, checked without decoding it."""
+        if not isinstance(user_id, str):
+            return False
+        with self._lock:
+            record = self._cache.get(user_id)
+            if record is not None:
+                return record["users"] is not None
+            with self._env.begin() as txn:
+                value = txn.get(user_id.encode('utf-8'))
+                return value is not None and bytes(value[:len(NO_USER)]) != NO_USER
+
+    @property
+    def resident_count(self) -> int:
+        return len(self._cache)
+
+    def get(self, user_id: str) -> Optional[Dict[str, Any]]:
+        """Return a user's record, reading it from LMDB on a cache miss."""
+        with self._lock:
+            record = self._cache.get(user_id)
+            if record is not None:
+                self._cache.move_to_end(user_id)
+                return record
+            with self._env.begin() as txn:
+                value = txn.get(user_id.encode('utf-8'))
+                if value is None:
+                    return None
+                line = self.codec.loads(bytes(value))
+            record = {
+                "users": UserRecord.from_dict(line["users"]),
+                "transactions": transactions_from_dicts(line["transactions"])
+            }
+            self.loads += 1
+            self._cache[user_id] = record
+            self._evict()
+            return record
+
+    def ensure(self, user_id: str) -> Dict[str, Any]:
+        """Return a user's record, creating an empty one if needed."""
+        with self._lock:
+            record = self.get(user_id)
+            if record is None:
+                record = {"users": None, "transactions": TransactionColumns()}
+                self._cache[user_id] = record
+                self._dirty.add(user_id)
+                self._new.add(user_id)
+            return record
+
+    def _evict(self):
+        """Drop least recently used records; dirty ones stay until written."""
+        if len(self._cache) <= self.cache_size:
+            return
+        for user_id in list(self._cache):
+            if len(self._cache) <= self.cache_size:
+                break
+            if user_id not in self._dirty:
+                del self._cache[user_id]
+
+    def set(self, user_id: str, section: str, value: Any):
+        """Replace one section of a user's record, creating the record if needed, and mark it dirty.
+
+        One step under the lock, so no other thread's load can evict the
+        record between the change and the dirty mark.
+        """
+        with self._lock:
+            self.ensure(user_id)[section] = value
+            self._dirty.add(user_id)
+
+    def mark_dirty(self, user_id: str):
+        with self._lock:
+            if user_id in self._cache:
+                self._dirty.add(user_id)
+
+    def write_dirty(self) -> int:
+        """Put the new version of every dirty record in one write transaction."""
+        with self._lock:
+            if not self._dirty:
+                return 0
+            items = [
+                (user_id.encode('utf-8'), self.codec.dumps({s: self._cache[user_id][s] for s in SECTIONS}))
+                for user_id in self._dirty
+            ]
+            while True:
+                try:
+                    with self._env.begin(write=True) as txn:
+                        for key, value in items:
+                            txn.put(key, value)
+                    break
+                except lmdb.MapFullError:
+                    # The aborted transaction wrote nothing; retry with a larger map
+                    self.map_size *= 2
+                    self._env.set_mapsize(self.map_size)
+                    self._log(f"[DB] LMDB map grown to {self.map_size // (1024 ** 2)} MiB")
+            count = len(items)
+            self._dirty.clear()
+            self._new.clear()
+            self._evict()
+            return count
+
+    def checkpoint(self):
+        """Write dirty records and flush them to disk."""
+        with self._lock:
+            self.write_dirty()
+            self._env.sync(True)
+
+    def close(self):
+        with self._lock:
+            if self._env is not None:
+                self._env.sync(True)
+                self._env.close()
+                self._env = None
@@ -0,0 +1,40 @@
+# mcp_server/locks.py
+"""
+Lock striping for MockDatabase.
+Users are hashed onto a fixed pool of locks, so mutations of different
+users run in parallel while two mutations of the same user never interleave.
+"""
+
+from contextlib import contextmanager
+from typing import Iterator, List
+import threading
+import zlib
+
+
+class StripedLock:
+    """A fixed pool of locks, one chosen per key by a stable hash."""
+
+    def __init__(self, stripes: int = 64):
+        self._locks: List[threading.RLock] = [threading.RLock() for _ in range(max(1, stripes))]
+
+    def __len__(self) -> int:
+        return len(self._locks)
+
+    def for_key(self, key: str) -> threading.RLock:
+        """The lock guarding `key` (crc32, like shard placement)."""
+        return self._locks[zlib.crc32(key.encode('utf-8')) % len(self._locks)]
+
+    @contextmanager
+    def all(self) -> Iterator[None]:
+        """Hold every stripe, e.g. for a batch that may touch any user.
+
+        Taken in index order, so two threads doing this can't deadlock; a
+        thread holding one stripe never waits for another.
+        """
+        for lock in self._locks:
+            lock.acquire()
+        try:
+            yield
+        finally:
+            for lock in reversed(self._locks):
+                lock.release()
@@ -1,210 +1,1111 @@
 # mcp_server/mock_data.py
 """
 Mock database for customer support system.
-Changes are now persistent - saved to a JSON file.
+Changes are now persistent - saved to a JSON file, appended to a
+write-ahead log (DB_PERSISTENCE=wal) or written per shard (DB_PERSISTENCE=sharded).
 In production, replace with actual database connections.
 """
 
-from typing import Dict, List, Optional
+from typing import Any, Callable, Dict, Iterable, Iterator, List, Optional, Tuple
+from contextlib import contextmanager
 from datetime import datetime, timedelta
 import random
-import json
+import itertools
+import os
 import sys
+import threading
+import time
+import uuid
+import atexit
 from pathlib import Path
 
-class MockDatabase:
+from .async_db import AsyncDatabaseMixin, WouldBlock
+from .flusher import GroupCommitFlusher
+from .indexes import SecondaryIndexes
+from .locks import StripedLock
+from .records import (
+    UserRecord, TransactionRecord, IssueRecord, VersionConflict,
+    CARD_DEACTIVATED, ISSUE_OPEN, ISSUE_CLOSED, PRIORITIES
+)
+from .issue_store import IssueStore, check_issue_change, check_new_issue_ids
+from .txn_store import TransactionColumns, decode_cursor, encode_cursor, to_cents
+from .read_cache import ReadCache, cached_read
+from .mvcc import VersionManager
+from .persistence import (
+    SnapshotPersistence, WALPersistence, ShardedPersistence, LazyPersistence, LMDBPersistence, MemoryPersistence
+)
+
+# Persistence modes:
+#   snapshot - rewrite database.json on every mutation (default)
+#   wal      - append one record per mutation to database.wal, replayed on load
+#   sharded  - one file per user_id hash bucket, only touched shards rewritten
+#   lazy     - per-user records located by an offset index, loaded on first access
+#   lmdb     - per-user records in an LMDB environment, loaded on first access
+#   memory   - nothing is written; data lasts as long as the process
+PERSISTENCE_CLASSES = {
+    "snapshot": SnapshotPersistence,
+    "wal": WALPersistence,
+    "sharded": ShardedPersistence,
+    "lazy": LazyPersistence,
+    "lmdb": LMDBPersistence,
+    "memory": MemoryPersistence
+}
+PERSISTENCE_MODES = tuple(PERSISTENCE_CLASSES)
+# Modes whose data bgsave() and compact() can write in the background
+BACKGROUND_SAVE_MODES = tuple(
+    mode for mode, persistence in PERSISTENCE_CLASSES.items() if persistence.supports_background_save
+)
+# Modes whose reads may have to load a record from disk
+ON_DEMAND_MODES = ("sharded", "lazy", "lmdb")
+
+
+def create_persistence(mode: str, data_file: Path) -> SnapshotPersistence:
+    """Build the persistence strategy for a DB_PERSISTENCE mode."""
+    fsync = os.getenv("DB_WAL_FSYNC", "false").lower() == "true"
+    if mode == "snapshot":
+        return SnapshotPersistence(data_file)
+    if mode == "wal":
+        return WALPersistence(
+            data_file, fsync=fsync,
+            compact_bytes=int(os.getenv("DB_WAL_COMPACT_BYTES", str(16 * 1024 * 1024)))
+        )
+    if mode == "sharded":
+        return ShardedPersistence(data_file, shard_count=int(os.getenv("DB_SHARD_COUNT", "64")), fsync=fsync)
+    if mode == "lazy":
+        return LazyPersistence(data_file, cache_size=int(os.getenv("DB_LAZY_CACHE_SIZE", "10000")), fsync=fsync)
+    if mode == "lmdb":
+        return LMDBPersistence(
+            data_file, cache_size=int(os.getenv("DB_LAZY_CACHE_SIZE", "10000")),
+            map_size=int(os.getenv("DB_LMDB_MAP_SIZE", str(1024 ** 3))), fsync=fsync
+        )
+    if mode == "memory":
+        return MemoryPersistence(data_file)
+    raise ValueError(
+        f"Unknown DB_PERSISTENCE '{mode}'. Use one of: {', '.join(PERSISTENCE_MODES)}"
+    )
+
+
+def default_data() -> Dict[str, Any]:
+    """Build the default seed data (two users with a few transactions)."""
+    users = {
+        "user_001": {
+            "user_id": "user_001",
+            "name": "John Doe",
+            "email": "john.doe@example.com",
+            "password": "hashed_password_123",
+            "address": "123 Main St, Springfield, IL 62701",
+            "account_balance": 5420.50,
+            "card_status": "active",
+            "card_number": "**** **** **** 1234",
+            "phone": "+1-555-0123"
+        },
+        "user_002": {
+            "user_id": "user_002",
+            "name": "Jane Smith",
+            "email": "jane.smith@example.com",
+            "password": "hashed_password_456",
+            "address": "456 Oak Ave, Portland, OR 97201",
+            "account_balance": 12750.25,
+            "card_status": "active",
+            "card_number": "**** **** **** 5678",
+            "phone": "+1-555-0456"
+        }
+    }
+    
+    transactions = {
+        "user_001": [
+            {
+                "id": "txn_001",
+                "date": (datetime.now() - timedelta(days=1)).isoformat(),
+                "description": "Amazon Purchase",
+                "amount": -89.99,
+                "balance": 5420.50
+            },
+            {
+                "id": "txn_002",
+                "date": (datetime.now() - timedelta(days=3)).isoformat(),
+                "description": "Salary Deposit",
+                "amount": 3500.00,
+                "balance": 5510.49
+            },
+            {
+                "id": "txn_003",
+                "date": (datetime.now() - timedelta(days=5)).isoformat(),
+                "description": "Electric Bill",
+                "amount": -125.50,
+                "balance": 2010.49
+            }
+        ],
+        "user_002": [
+            {
+                "id": "txn_004",
+                "date": (datetime.now() - timedelta(days=2)).isoformat(),
+                "description": "Grocery Store",
+                "amount": -156.32,
+                "balance": 12750.25
+            }
+        ]
+    }
+    
+    return {"users": users, "transactions": transactions, "issues": []}
+
+
+def _account_details(user: Optional[UserRecord]) -> Optional[Dict]:
+    if user:
+        return {
+            "name": user.name,
+            "email": user.email,
+            "address": user.address,
+            "phone": user.phone,
+            "account_balance": user.account_balance,
+            "card_status": user.card_status,
+            "card_number": user.card_number,
+            "version": user.version
+        }
+    return None
+
+
+def _transactions_page(
+    transactions: Optional[TransactionColumns],
+    limit: int,
+    since: Optional[str],
+    until: Optional[str],
+    cursor: Optional[str]
+) -> Dict[str, Any]:
+    after = None
+    if cursor:
+        position = decode_cursor(cursor)
+        if len(position) != 2 or not isinstance(position[0], int) or not isinstance(position[1], str):
+            raise ValueError("Invalid cursor")
+        after = (position[0], position[1])
+    if not transactions:
+        return {"transactions": [], "next_cursor": None}
+    records, next_key = transactions.page(limit, since, until, after)
+    return {"transactions": records, "next_cursor": encode_cursor(list(next_key)) if next_key else None}
+
+
+class DatabaseSnapshot:
+    """Read-only view of every user's record and transactions as of one commit.
+    
+    Obtained from MockDatabase.snapshot(). Reads take no locks and see
+    neither later commits nor part of one, so several reads (a balance and
+    the transactions behind it) always agree.
+    """
+    
+    def __init__(self, db: "MockDatabase", seq: int):
+        self._db = db
+        self.seq = seq
+    
+    def user_version(self, user_id: str) -> Tuple[Optional[UserRecord], Optional[TransactionColumns]]:
+        """A user's record and transactions as of this snapshot."""
+        return self._db.mvcc.read(self.seq, user_id, lambda: self._db._user_version(user_id))
+    
+    def get_user(self, user_id: str) -> Optional[UserRecord]:
+        return self.user_version(user_id)[0]
+    
+    def get_account_balance(self, user_id: str) -> Optional[float]:
+        user = self.get_user(user_id)
+        return user.account_balance if user else None
+    
+    def get_account_details(self, user_id: str) -> Optional[Dict]:
+        return _account_details(self.get_user(user_id))
+    
+    def get_recent_transactions(
+        self,
+        user_id: str,
+        limit: int = 10,
+        since: Optional[str] = None,
+        until: Optional[str] = None,
+        cursor: Optional[str] = None
+    ) -> List[TransactionRecord]:
+        return self.get_transactions_page(user_id, limit, since, until, cursor)["transactions"]
+    
+    def get_transactions_page(
+        self,
+        user_id: str,
+        limit: int = 10,
+        since: Optional[str] = None,
+        until: Optional[str] = None,
+        cursor: Optional[str] = None
+    ) -> Dict[str, Any]:
+        return _transactions_page(self.user_version(user_id)[1], limit, since, until, cursor)
+
+
+class _Batch:
+    """The state of an open MockDatabase.batch(): what to write at commit and what to restore on error."""
+    
+    def __init__(self, seq: int, issue_count: int):
+        # The commit every mutation in the batch belongs to
+        self.seq = seq
+        # Only this thread's plain reads see the batch before it commits
+        self.owner = threading.get_ident()
+        # Recorded with the persistence store only at commit
+        self.ops: List[Tuple[str, Dict[str, Any]]] = []
+        # Each touched user's record and transactions from before the batch
+        self.users: Dict[str, Tuple[Optional[UserRecord], Optional[TransactionColumns]]] = {}
+        # Each changed issue from before the batch; issues past issue_count are new
+        self.issues: Dict[str, Optional[IssueRecord]] = {}
+        self.issue_count = issue_count
+
+
+class MockDatabase(AsyncDatabaseMixin):
     """Simulates a customer database with support operations."""
     
-    def __init__(self):
-        self.data_file = Path(__file__).parent.parent / "database.json"
+    def __init__(self, data_file: Optional[Path] = None, persistence: Optional[str] = None):
+        self.data_file = Path(data_file) if data_file else Path(__file__).parent.parent / "database.json"
+        self.persistence = persistence or os.getenv("DB_PERSISTENCE", "snapshot")
+        self.store = create_persistence(self.persistence, self.data_file)
+        # Sharded, lazy and lmdb records may be read from disk on first access
+        self.blocking_reads = self.persistence in ON_DEMAND_MODES
+        # Concurrency: published user records are never modified in place, so
+        # reads need no lock. Mutations of one user are serialized by its
+        # stripe, issue IDs by _issue_lock, and writes to the store by _lock.
+        # Commits are numbered by mvcc so snapshot() reads stay consistent.
+        # A batch() holds all of these locks, in this order, until it ends.
+        self._lock = threading.RLock()
+        self.mvcc = VersionManager()
+        self._user_locks = StripedLock(int(os.getenv("DB_LOCK_STRIPES", "64")))
+        self._issue_lock = threading.RLock()
+        self._batch: Optional[_Batch] = None
+        # Bumped when a batch begins and when it ends, before and after all of its
+        # writes, so a lock-free read can tell whether it overlapped one
+        self._batch_epoch = 0
+        # Group commit: with a non-"always" DB_FLUSH_POLICY mutations are
+        # buffered and written in batches by a GroupCommitFlusher.
+        self.flusher = None
+        flush_policy = os.getenv("DB_FLUSH_POLICY", "always")
+        if flush_policy != "always":
+            self.flusher = GroupCommitFlusher(
+                self._write_pending,
+                policy=flush_policy,
+                interval_ms=int(os.getenv("DB_FLUSH_INTERVAL_MS", "100")),
+                batch_size=int(os.getenv("DB_FLUSH_BATCH_SIZE", "100"))
+            )
+            atexit.register(self.close)
+        # Background compaction or BGSAVE waiter, and the last save's metrics
+        self._snapshot_thread: Optional[threading.Thread] = None
+        self._save_stats: Dict[str, Any] = {
+            "last_save_time": None,
+            "last_save_duration_ms": None,
+            "last_save_kind": None,
+            "last_save_status": None,
+            "last_save_error": None,
+            "saves": 0,
+            "failed_saves": 0
+        }
+        self.indexes = SecondaryIndexes(lambda: self.users.values())
+        self.issue_store = IssueStore()
+        # Read-through cache for the modes whose reads may go to disk;
+        # DB_READ_CACHE_SIZE=0 turns it off
+        self.read_cache: Optional[ReadCache] = None
+        cache_size = int(os.getenv("DB_READ_CACHE_SIZE", "10000"))
+        if self.blocking_reads and cache_size > 0:
+            self.read_cache = ReadCache(cache_size, float(os.getenv("DB_READ_CACHE_TTL", "0")))
         self.load_data()
     
     def _log(self, message: str):
         """Log to stderr to avoid interfering with stdio MCP protocol."""
         print(message, file=sys.stderr)
     
+    @property
+    def issues(self) -> List[IssueRecord]:
+        """Every issue in creation order (kept by the issue store)."""
+        return self.issue_store.issues
+    
+    @issues.setter
+    def issues(self, issues: List[IssueRecord]):
+        # Set by the persistence layer when it loads or adopts data
+        self.issue_store.rebuild(issues)
+    
     def load_data(self):
         """Load data from file if it exists, otherwise use defaults."""
-        if self.data_file.exists():
-            self._log(f"[DB] Loading data from {self.data_file}")
-            with open(self.data_file, 'r') as f:
-                data = json.load(f)
-                self.users = data.get('users', {})
-                self.transactions = data.get('transactions', {})
-                self.issues = data.get('issues', [])
-            self._log(f"[DB] Loaded {len(self.users)} users, {len(self.issues)} issues")
+        if self.store.exists():
+            self._log(f"[DB] Loading data from {self.store.location}")
+            self.store.load(self)
         else:
             self._log("[DB] No saved data found, using defaults")
             self._initialize_default_data()
-            self.save_data()
+        self.indexes.rebuild(self.issues)
+        if self.read_cache:
+            self.read_cache.invalidate_all()
     
     def _initialize_default_data(self):
         """Initialize with default data."""
-        self.users = {
-            "user_001": {
-                "user_id": "user_001",
-                "name": "John Doe",
-                "email": "john.doe@example.com",
-                "password": "hashed_password_123",
-                "address": "123 Main St, Springfield, IL 62701",
-                "account_balance": 5420.50,
-                "card_status": "active",
-                "card_number": "**** **** **** 1234",
-                "phone": "+1-555-0123"
-            },
-            "user_002": {
-                "user_id": "user_002",
-                "name": "Jane Smith",
-                "email": "jane.smith@example.com",
-                "password": "hashed_password_456",
-                "address": "456 Oak Ave, Portland, OR 97201",
-                "account_balance": 12750.25,
-                "card_status": "active",
-                "card_number": "**** **** **** 5678",
-                "phone": "+1-555-0456"
-            }
-        }
-        
-        self.transactions = {
-            "user_001": [
-                {
-                    "id": "txn_001",
-                    "date": (datetime.now() - timedelta(days=1)).isoformat(),
-                    "description": "Amazon Purchase",
-                    "amount": -89.99,
-                    "balance": 5420.50
-                },
-                {
-                    "id": "txn_002",
-                    "date": (datetime.now() - timedelta(days=3)).isoformat(),
-                    "description": "Salary Deposit",
-                    "amount": 3500.00,
-                    "balance": 5510.49
-                },
-                {
-                    "id": "txn_003",
-                    "date": (datetime.now() - timedelta(days=5)).isoformat(),
-                    "description": "Electric Bill",
-                    "amount": -125.50,
-                    "balance": 2010.49
-                }
-            ],
-            "user_002": [
-                {
-                    "id": "txn_004",
-                    "date": (datetime.now() - timedelta(days=2)).isoformat(),
-                    "description": "Grocery Store",
-                    "amount": -156.32,
-                    "balance": 12750.25
-                }
-            ]
-        }
-        
-        self.issues = []
+        with self._lock:
+            self.store.initialize(self, default_data())
+        self._log(f"[DB] ✓ Data saved to {self.store.location}")
     
     def save_data(self):
         """Save data to file for persistence."""
-        data = {
-            'users': self.users,
-            'transactions': self.transactions,
-            'issues': self.issues
-        }
-        with open(self.data_file, 'w') as f:
-            json.dump(data, f, indent=2)
-        self._log(f"[DB] ✓ Data saved to {self.data_file}")
+        started = time.time()
+        with self._lock:
+            self.store.save(self)
+        self._record_save("save", started)
+        self._log(f"[DB] ✓ Data saved to {self.store.location}")
+    
+    def _commit(self, op: str, **payload: Any):
+        """Publish a mutation in memory and persist it according to the persistence mode."""
+        self._commit_many([(op, payload)])
+    
+    def _commit_many(self, ops: List[Tuple[str, Dict[str, Any]]], write: bool = True):
+        """Publish several mutations and persist them with a single write.
+        
+        With write=False they are only recorded, for the caller to save later.
+        Inside a batch() they join the batch and are recorded when it ends.
+        """
+        with self._lock:
+            batch = self._batch
+            seq = batch.seq if batch else self.mvcc.seq + 1
+            for op, payload in ops:
+                user_id = payload.get("user_id")
+                if user_id is not None:
+                    # Saved before the change, for snapshots older than this commit
+                    previous = self._user_version(user_id)
+                    self.mvcc.supersede(seq, user_id, previous)
+                    if batch:
+                        batch.users.setdefault(user_id, previous)
+                if batch and op == "put_issue":
+                    issue_id = payload["issue"].issue_id
+                    if issue_id not in batch.issues:
+                        batch.issues[issue_id] = self.issue_store.get(issue_id)
+                self._publish(op, payload)
+                if self.read_cache and user_id is not None:
+                    self.read_cache.invalidate(user_id)
+                if batch:
+                    batch.ops.append((op, payload))
+                else:
+                    self.store.record(op, payload)
+            if batch:
+                return
+            self.mvcc.publish(seq)
+            if self.flusher is None and write:
+                self.store.write_pending(self)
+                self._maybe_compact()
+        if self.flusher:
+            self.flusher.mark_dirty()
+    
+    def _publish(self, op: str, payload: Dict[str, Any]):
+        """Apply one mutation to the in-memory state (caller holds the lock)."""
+        if op == "put_user":
+            self.users[payload["user_id"]] = payload["user"]
+            self.indexes.put_user(payload["user"])
+        elif op == "put_issue":
+            self.issue_store.put(payload["issue"])
+            self.indexes.put_issue(payload["issue"])
+        elif op == "put_transactions":
+            columns = self._columns(payload["user_id"])
+            columns.extend(payload["transactions"])
+            # Assigned back: an on-demand store may have evicted the clean record meanwhile
+            self.transactions[payload["user_id"]] = columns
+        elif op == "add_transaction":
+            self.users[payload["user_id"]] = payload["user"]
+            self.indexes.put_user(payload["user"])
+            self._columns(payload["user_id"]).append(payload["transaction"])
+        elif op == "set_balances":
+            self.users[payload["user_id"]] = payload["user"]
+            self.indexes.put_user(payload["user"])
+            self._columns(payload["user_id"]).set_running_balances(payload["opening"])
+    
+    def _user_version(self, user_id: str) -> Tuple[Optional[UserRecord], Optional[TransactionColumns]]:
+        """A user's current record and a snapshot of their transactions."""
+        columns = self.transactions.get(user_id)
+        return self.users.get(user_id), columns.snapshot() if columns is not None else None
+    
+    def _foreign_batch(self) -> bool:
+        """Whether another thread has a batch open, whose writes this thread must not see yet."""
+        batch = self._batch
+        return batch is not None and batch.owner != threading.get_ident()
+    
+    def _before_batch(self, user_id: str) -> Tuple[Optional[UserRecord], Optional[TransactionColumns]]:
+        """A user's record and transactions as of the commit before another thread's open batch."""
+        with self.snapshot() as snapshot:
+            return snapshot.user_version(user_id)
+    
+    def _visible_user(self, user_id: str) -> Optional[UserRecord]:
+        """The user a plain read returns: committed, or written by this thread's batch.
+        
+        The live record is read first and kept only if no batch of another
+        thread was open and none began or ended meanwhile (_batch_epoch is
+        unchanged); otherwise it may be a batch's uncommitted write, and the
+        record is read from a snapshot instead.
+        """
+        epoch = self._batch_epoch
+        if not self._foreign_batch():
+            user = self.users.get(user_id)
+            if self._batch_epoch == epoch:
+                return user
+        return self._before_batch(user_id)[0]
+    
+    def _visible_transactions(self, user_id: str) -> Optional[TransactionColumns]:
+        """The transactions a plain read returns (see _visible_user), as a snapshot of the columns."""
+        epoch = self._batch_epoch
+        if not self._foreign_batch():
+            # Taken before the check: a batch beginning after it may append to the live columns
+            columns = self.transactions.get(user_id)
+            transactions = columns.snapshot() if columns is not None else None
+            if self._batch_epoch == epoch:
+                return transactions
+        return self._before_batch(user_id)[1]
+    
+    def _visible_user_ids(self) -> List[str]:
+        """IDs of the users a plain read can find, leaving out those another thread's open batch added."""
+        while True:
+            epoch = self._batch_epoch
+            batch = self._batch
+            user_ids = list(self.users.keys())
+            if self._batch_epoch == epoch:
+                break
+        if batch is None or batch.owner == threading.get_ident():
+            return user_ids
+        # Saved as None by the batch: the user did not exist before it
+        return [user_id for user_id in user_ids if user_id not in batch.users or batch.users[user_id][0] is not None]
+    
+    def _read_issues(self, read: Callable[[], Any]) -> Any:
+        """Run read() on the issue indexes as of the last commit.
+        
+        The indexes keep no older versions, so a read that overlapped
+        another thread's batch (see _visible_user) is repeated under the
+        issue lock, once the batch has ended. An async read running on the
+        event loop raises WouldBlock instead, and is retried on a reader
+        thread.
+        """
+        epoch = self._batch_epoch
+        if not self._foreign_batch():
+            result = read()
+            if self._batch_epoch == epoch:
+                return result
+        if self._reading_inline():
+            raise WouldBlock()
+        with self._issue_lock:
+            return read()
+    
+    @contextmanager
+    def snapshot(self) -> Iterator[DatabaseSnapshot]:
+        """A consistent, lock-free read view of the last commit, for the duration of the block.
+        
+        Versions that later commits replace are kept while the snapshot is
+        open and collected once no open snapshot is older than them.
+        """
+        seq = self.mvcc.begin()
+        try:
+            yield DatabaseSnapshot(self, seq)
+        finally:
+            self.mvcc.end(seq)
+    
+    @contextmanager
+    def batch(self) -> Iterator["MockDatabase"]:
+        """Apply the block's mutations atomically, with one persistence write at the end.
+        
+        The block has the database to itself: it holds every write lock, so
+        other writers wait for it (keep it short, and don't wait on other
+        threads' writes inside it). Mutations take effect as they are made,
+        so later ones see earlier ones, but other threads see none of them
+        until the batch commits: their user and transaction reads come from
+        a snapshot of the commit before it, and their issue reads wait for
+        it to end (on a reader thread, for async reads). If the block
+        raises, every mutation is undone and nothing is written. A nested
+        batch() joins the outer one.
+        """
+        with self._user_locks.all(), self._issue_lock, self._lock:
+            if self._batch is not None:
+                yield self
+                return
+            batch = self._batch = _Batch(self.mvcc.seq + 1, len(self.issues))
+            self._batch_epoch += 1
+            try:
+                yield self
+            except BaseException:
+                self._rollback(batch)
+                raise
+            finally:
+                self._batch = None
+                self._batch_epoch += 1
+            if not batch.ops:
+                return
+            for op, payload in batch.ops:
+                self.store.record(op, payload)
+            self.mvcc.publish(batch.seq)
+            if self.flusher is None:
+                self.store.write_pending(self)
+                self._maybe_compact()
+        if self.flusher:
+            self.flusher.mark_dirty()
+    
+    def _rollback(self, batch: _Batch):
+        """Undo a batch's mutations in memory; none of them were recorded (caller holds every lock)."""
+        for user_id, (user, columns) in batch.users.items():
+            if user is None:
+                self.users.pop(user_id, None)
+            else:
+                self.users[user_id] = user
+            if columns is None:
+                self.transactions.pop(user_id, None)
+            else:
+                self._columns(user_id).restore(columns)
+            if self.read_cache:
+                self.read_cache.invalidate(user_id)
+        if batch.issues:
+            self.issues = [batch.issues.get(issue.issue_id, issue) for issue in self.issues[:batch.issue_count]]
+        if batch.ops:
+            # Rare enough that re-indexing everything beats undoing index entries one by one
+            self.indexes.rebuild(self.issues)
+        # Published as a commit that changed nothing, not forgotten: a reader of the
+        # commit before may have read a value the batch wrote and needs the saved one
+        self.mvcc.publish(batch.seq)
+        self._log(f"[DB] Batch of {len(batch.ops)} mutations rolled back")
     
-    def get_user(self, user_id: str) -> Optional[Dict]:
+    def _columns(self, user_id: str) -> TransactionColumns:
+        """A user's transaction columns, created empty on first use."""
+        columns = self.transactions.get(user_id)
+        if columns is None:
+            columns = self.transactions[user_id] = TransactionColumns()
+        return columns
+    
+    def _update_user(
+        self,
+        user_id: str,
+        expected_version: Optional[int] = None,
+        **changes: Any
+    ) -> Optional[UserRecord]:
+        """Publish a copy of a user with `changes` applied; returns the previous version.
+        
+        With expected_version this is a compare-and-set: VersionConflict is
+        raised, and nothing written, unless the user is still at that version.
+        """
+        with self._user_locks.for_key(user_id):
+            user = self.users.get(user_id)
+            if user:
+                if expected_version is not None and user.version != expected_version:
+                    raise VersionConflict(user_id, expected_version, user.version)
+                self._commit("put_user", user_id=user_id, user=user.revise(**changes))
+            return user
+    
+    def _write_pending(self):
+        """Write everything recorded since the last flush (called by the flusher)."""
+        with self._lock:
+            self.store.write_pending(self)
+            self._maybe_compact()
+    
+    def _maybe_compact(self):
+        """Start a background compaction once the log is large enough (caller holds the lock)."""
+        if self.store.needs_compaction() and not (self._snapshot_thread and self._snapshot_thread.is_alive()):
+            self._snapshot_thread = threading.Thread(target=self.compact, name="db-compaction", daemon=True)
+            self._snapshot_thread.start()
+    
+    def compact(self) -> bool:
+        """Fold the write-ahead log into a fresh snapshot; False if a snapshot is already running.
+        
+        Only copying the in-memory state holds the database lock; writing
+        the snapshot does not, so other threads keep committing meanwhile.
+        """
+        if not self.store.supports_background_save:
+            return False
+        started = time.time()
+        with self._lock:
+            write = self.store.begin_snapshot(self)
+        if write is None:
+            return False
+        return self._run_snapshot(write, "compaction", started)
+    
+    def bgsave(self) -> Dict[str, Any]:
+        """Write a snapshot from a forked child process (like Redis BGSAVE).
+        
+        The child serializes its copy-on-write image of the database while
+        this process keeps serving; a thread reaps it and records the result
+        in save_stats(). Where fork is unavailable (Windows) a copy of the
+        in-memory state is written from a thread instead.
+        """
+        if not self.store.supports_background_save:
+            return {
+                "success": False,
+                "message": f"Background save is not available in {self.persistence} mode "
+                           f"(use DB_PERSISTENCE={' or '.join(BACKGROUND_SAVE_MODES)})"
+            }
+        started = time.time()
+        can_fork = hasattr(os, "fork")
+        with self._lock:
+            write = self.store.begin_snapshot(self, copy=not can_fork)
+            if write is None:
+                return {"success": False, "message": "A background save is already in progress"}
+            if can_fork:
+                try:
+                    pid = os.fork()
+                except OSError as e:
+                    self._finish_snapshot("bgsave", started, error=str(e))
+                    return {"success": False, "message": f"Background save failed: {e}"}
+                if pid == 0:
+                    self._bgsave_child(write)
+                target, args = self._reap_bgsave, (pid, started)
+            else:
+                pid = None
+                target, args = self._run_snapshot, (write, "bgsave", started)
+            self._snapshot_thread = threading.Thread(target=target, args=args, name="db-bgsave", daemon=True)
+            self._snapshot_thread.start()
+        self._log("[DB] Background save started" + (f" (pid {pid})" if pid else ""))
+        return {"success": True, "message": "Background save started", "pid": pid}
+    
+    @staticmethod
+    def _bgsave_child(write: Callable[[], None]):
+        """Forked child: write the snapshot and exit without running the parent's cleanup."""
+        status = 1
+        try:
+            write()
+            status = 0
+        except BaseException as e:
+            # os.write, not print: another thread may have held stdio's lock at fork time
+            os.write(2, f"[DB] ✗ Background save failed: {e}\n".encode('utf-8'))
+        finally:
+            os._exit(status)
+    
+    def _reap_bgsave(self, pid: int, started: float):
+        _, status = os.waitpid(pid, 0)
+        code = os.waitstatus_to_exitcode(status)
+        self._finish_snapshot("bgsave", started, error=None if code == 0 else f"child exited with status {code}")
+    
+    def _run_snapshot(self, write: Callable[[], None], kind: str, started: float) -> bool:
+        try:
+            write()
+        except Exception as e:
+            self._finish_snapshot(kind, started, error=str(e))
+            raise
+        self._finish_snapshot(kind, started)
+        return True
+    
+    def _finish_snapshot(self, kind: str, started: float, error: Optional[str] = None):
+        self._record_save(kind, started, error)
+        self.store.end_snapshot(error is None)
+        if self.store.save_deferred:
+            # Writes made while the snapshot was written skipped their save
+            with self._lock:
+                if self.store.save_deferred:
+                    self.store.save(self)
+        if error:
+            self._log(f"[DB] ✗ Snapshot ({kind}) failed: {error}")
+        else:
+            self._log(f"[DB] ✓ Snapshot ({kind}) written to {self.store.location} "
+                      f"in {self._save_stats['last_save_duration_ms']} ms")
+    
+    def _record_save(self, kind: str, started: float, error: Optional[str] = None):
+        stats = self._save_stats
+        stats["last_save_time"] = datetime.now().isoformat()
+        stats["last_save_duration_ms"] = round((time.time() - started) * 1000, 1)
+        stats["last_save_kind"] = kind
+        stats["last_save_status"] = "failed" if error else "ok"
+        stats["last_save_error"] = error
+        stats["failed_saves" if error else "saves"] += 1
+    
+    def cache_stats(self) -> Dict[str, Any]:
+        """Read cache hits, misses, evictions and invalidated entries."""
+        if self.read_cache is None:
+            return {"enabled": False}
+        return {"enabled": True, **self.read_cache.stats()}
+    
+    def snapshot_stats(self) -> Dict[str, Any]:
+        """Last commit, open snapshots and superseded versions retained for them."""
+        return self.mvcc.stats()
+    
+    def save_stats(self) -> Dict[str, Any]:
+        """Metrics for the last snapshot written (save, compaction or bgsave)."""
+        return {**self._save_stats, "snapshot_in_progress": self.store.snapshot_in_progress}
+    
+    def flush(self):
+        """Barrier: return once every mutation so far has been persisted."""
+        if self.flusher:
+            self.flusher.flush()
+        if self.store.save_deferred and self._snapshot_thread:
+            # Saved by the snapshot thread once the background snapshot is written
+            self._snapshot_thread.join()
+    
+    def close(self):
+        """Flush pending writes and release file handles."""
+        self._close_executors()
+        if self.flusher:
+            self.flusher.close()
+        if self._snapshot_thread:
+            self._snapshot_thread.join()
+        self.store.close()
+    
+    def _apply(self, record: Dict[str, Any]):
+        """Apply a WAL record to the in-memory state."""
+        op = record.get("op")
+        if op == "put_user":
+            self.users[record["user_id"]] = UserRecord.from_dict(record["user"])
+        elif op == "put_issue":
+            # Replaces an earlier version of the issue, so replay is idempotent
+            self.issue_store.put(IssueRecord.from_dict(record["issue"]))
+        elif op == "put_transactions":
+            self._columns(record["user_id"]).extend(record["transactions"])
+        elif op == "add_transaction":
+            self.users[record["user_id"]] = UserRecord.from_dict(record["user"])
+            columns = self._columns(record["user_id"])
+            txn = record["transaction"]
+            # The user record is replaced wholesale, so only the append needs to be idempotent
+            if not columns.contains(txn["date"], txn["id"]):
+                columns.append(txn)
+        elif op == "set_balances":
+            self.users[record["user_id"]] = UserRecord.from_dict(record["user"])
+            self._columns(record["user_id"]).set_running_balances(record["opening"])
+        else:
+            self._log(f"[DB] Skipping unknown WAL op: {op}")
+    
+    @cached_read
+    def get_user(self, user_id: str) -> Optional[UserRecord]:
         """Get user by ID."""
-        return self.users.get(user_id)
+        return self._visible_user(user_id)
     
-    def change_password(self, user_id: str, new_password: str) -> bool:
-        """Change user password - PERMANENT."""
-        if user_id in self.users:
-            self.users[user_id]["password"] = f"hashed_{new_password}"
+    def change_password(self, user_id: str, new_password: str, expected_version: Optional[int] = None) -> bool:
+        """Change user password - PERMANENT. See _update_user for expected_version."""
+        if self._update_user(user_id, expected_version, password=f"hashed_{new_password}"):
             self._log(f"[DB] Password changed for {user_id}")
-            self.save_data()
             return True
         return False
     
+    @cached_read
     def get_account_balance(self, user_id: str) -> Optional[float]:
         """Get account balance."""
-        user = self.users.get(user_id)
-        return user["account_balance"] if user else None
-    
-    def update_address(self, user_id: str, new_address: str) -> bool:
-        """Update user address - PERMANENT."""
-        if user_id in self.users:
-            old_address = self.users[user_id]["address"]
-            self.users[user_id]["address"] = new_address
+        user = self._visible_user(user_id)
+        return user.account_balance if user else None
+    
+    def update_address(self, user_id: str, new_address: str, expected_version: Optional[int] = None) -> bool:
+        """Update user address - PERMANENT. See _update_user for expected_version."""
+        old_user = self._update_user(user_id, expected_version, address=new_address)
+        if old_user:
             self._log(f"[DB] Address changed for {user_id}")
-            self._log(f"     Old: {old_address}")
+            self._log(f"     Old: {old_user.address}")
             self._log(f"     New: {new_address}")
-            self.save_data()
             return True
         return False
     
-    def get_recent_transactions(self, user_id: str, limit: int = 10) -> List[Dict]:
-        """Get recent transactions."""
-        return self.transactions.get(user_id, [])[:limit]
+    def get_recent_transactions(
+        self,
+        user_id: str,
+        limit: int = 10,
+        since: Optional[str] = None,
+        until: Optional[str] = None,
+        cursor: Optional[str] = None
+    ) -> List[TransactionRecord]:
+        """Get recent transactions dated in [since, until), newest first (see get_transactions_page)."""
+        return self.get_transactions_page(user_id, limit, since, until, cursor)["transactions"]
+    
+    @cached_read
+    def get_transactions_page(
+        self,
+        user_id: str,
+        limit: int = 10,
+        since: Optional[str] = None,
+        until: Optional[str] = None,
+        cursor: Optional[str] = None
+    ) -> Dict[str, Any]:
+        """A page of a user's transactions, newest first.
+        
+        Pass the returned next_cursor (None after the last page) with the
+        same since/until to get the following page.
+        """
+        return _transactions_page(self._visible_transactions(user_id), limit, since, until, cursor)
+    
+    def query_transactions(
+        self,
+        user_id: str,
+        since: Optional[str] = None,
+        until: Optional[str] = None,
+        min_amount: Optional[float] = None,
+        max_amount: Optional[float] = None,
+        limit: Optional[int] = None
+    ) -> List[TransactionRecord]:
+        """Get transactions dated in [since, until) within an amount range, newest first."""
+        transactions = self._visible_transactions(user_id)
+        if not transactions:
+            return []
+        return transactions.query(since, until, min_amount, max_amount, limit)
+    
+    def add_transaction(self, user_id: str, description: str, amount: float) -> Optional[TransactionRecord]:
+        """Record a transaction dated now and update the balance - PERMANENT.
+        
+        The running balance is the materialized account_balance plus
+        `amount`, so this is O(1) at any history length. The new transaction
+        and the updated user are published, and logged, as one mutation.
+        """
+        with self._user_locks.for_key(user_id):
+            user = self.users.get(user_id)
+            if not user:
+                return None
+            balance = (to_cents(user.account_balance or 0) + to_cents(amount)) / 100
+            date = datetime.now().isoformat()
+            columns = self.transactions.get(user_id)
+            if columns:
+                # Never date it before the newest one, so its running balance stays last
+                date = max(date, columns[0].date)
+            txn = {
+                "id": f"txn_{uuid.uuid4().hex[:12]}",
+                "date": date,
+                "description": description,
+                "amount": to_cents(amount) / 100,
+                "balance": balance
+            }
+            self._commit("add_transaction", user_id=user_id, user=user.revise(account_balance=balance), transaction=txn)
+        self._log(f"[DB] Transaction {txn['id']} for {user_id}: {txn['amount']:+.2f}, balance {balance:.2f}")
+        return TransactionRecord.from_dict(txn)
+    
+    def reconcile_balances(self, fix: bool = False, sample: int = 20) -> Dict[str, Any]:
+        """Recompute every running and account balance from transaction history and report drift.
+        
+        Each user's history is anchored at the balance before its first
+        transaction (or, if that has no running balance, at the account
+        balance minus the history's total). Balances are recomputed with a
+        cumulative sum over the amount column and compared array to array.
+        With fix=True drifted users get the recomputed balances.
+        """
+        started = time.perf_counter()
+        report: Dict[str, Any] = {
+            "users": 0, "transactions": 0, "users_with_drift": 0,
+            "transactions_with_drift": 0, "total_drift": 0.0, "drifted": [], "fixed": 0
+        }
+        with self.snapshot() as snapshot:
+            for user_id in list(self.users):
+                report["users"] += 1
+                # A user and their transactions from the same commit, even mid add_transaction
+                user, columns = snapshot.user_version(user_id)
+                if not columns or user is None:
+                    continue
+                report["transactions"] += len(columns)
+                drift = self._balance_drift(user, columns)
+                if drift is None:
+                    continue
+                txn_drift, account_drift, opening = drift
+                report["users_with_drift"] += 1
+                report["transactions_with_drift"] += txn_drift
+                report["total_drift"] += abs(account_drift)
+                if len(report["drifted"]) < sample:
+                    report["drifted"].append({
+                        "user_id": user_id,
+                        "account_balance": user.account_balance,
+                        "expected_balance": round(user.account_balance - account_drift, 2),
+                        "transactions_with_drift": txn_drift
+                    })
+                if fix:
+                    with self._user_locks.for_key(user_id):
+                        # Re-check under the lock: a concurrent add_transaction may have moved things
+                        user, columns = self.users[user_id], self.transactions[user_id]
+                        drift = self._balance_drift(user, columns)
+                        if drift is not None:
+                            opening = drift[2]
+                            final = (opening + sum(columns.amounts)) / 100
+                            self._commit("set_balances", user_id=user_id,
+                                         user=user.revise(account_balance=final), opening=opening)
+                            report["fixed"] += 1
+        report["total_drift"] = round(report["total_drift"], 2)
+        report["seconds"] = time.perf_counter() - started
+        self._log(f"[DB] Reconciled {report['users']} users, {report['transactions']} transactions: "
+                  f"{report['users_with_drift']} users drifted, {report['fixed']} fixed")
+        return report
+    
+    def _balance_drift(self, user: UserRecord, columns: TransactionColumns) -> Optional[Tuple[int, float, int]]:
+        """(transactions with a wrong running balance, account drift, opening cents), or None if consistent."""
+        balance = to_cents(user.account_balance or 0)
+        opening = columns.opening_balance()
+        if opening is None:
+            opening = balance - sum(columns.amounts)
+        expected = columns.running_balances(opening)
+        txn_drift = 0 if expected == columns.balances else sum(
+            1 for stored, correct in zip(columns.balances, expected) if stored != correct
+        )
+        if not txn_drift and expected[-1] == balance:
+            return None
+        return txn_drift, (balance - expected[-1]) / 100, opening
     
-    def deactivate_card(self, user_id: str) -> bool:
-        """Deactivate user's card - PERMANENT."""
-        if user_id in self.users:
-            old_status = self.users[user_id]["card_status"]
-            self.users[user_id]["card_status"] = "deactivated"
+    def deactivate_card(self, user_id: str, expected_version: Optional[int] = None) -> bool:
+        """Deactivate user's card - PERMANENT. See _update_user for expected_version."""
+        old_user = self._update_user(user_id, expected_version, card_status=CARD_DEACTIVATED)
+        if old_user:
             self._log(f"[DB] Card status changed for {user_id}")
-            self._log(f"     Old: {old_status}")
-            self._log(f"     New: deactivated")
-            self.save_data()
+            self._log(f"     Old: {old_user.card_status}")
+            self._log(f"     New: {CARD_DEACTIVATED}")
             return True
         return False
     
-    def report_issue(self, user_id: str, issue_description: str) -> str:
-        """Report a customer issue - PERMANENT."""
-        issue_id = f"issue_{len(self.issues) + 1:03d}"
-        issue = {
-            "issue_id": issue_id,
-            "user_id": user_id,
-            "description": issue_description,
-            "status": "open",
-            "created_at": datetime.now().isoformat(),
-            "priority": random.choice(["low", "medium", "high"])
-        }
-        self.issues.append(issue)
+    def report_issue(self, user_id: str, issue_description: str, priority: Optional[str] = None) -> str:
+        """Report a customer issue - PERMANENT. Without a priority one is picked at random."""
+        check_issue_change(ISSUE_OPEN, priority=priority)
+        with self._issue_lock:
+            issue_id = self.issue_store.next_id()
+            issue = IssueRecord(
+                issue_id=issue_id,
+                user_id=user_id,
+                description=issue_description,
+                status=ISSUE_OPEN,
+                created_at=datetime.now().isoformat(),
+                priority=priority or random.choice(PRIORITIES)
+            )
+            self._commit("put_issue", issue=issue)
         self._log(f"[DB] Issue created: {issue_id}")
-        self.save_data()
         return issue_id
     
+    def update_issue(
+        self,
+        issue_id: str,
+        status: Optional[str] = None,
+        priority: Optional[str] = None
+    ) -> Optional[IssueRecord]:
+        """Change an issue's status and/or priority - PERMANENT. Returns the updated issue, None if not found.
+        
+        Raises ValueError for an unknown status or priority, or a status
+        change ISSUE_TRANSITIONS doesn't allow (e.g. closed -> in_progress).
+        """
+        with self._issue_lock:
+            issue = self.issue_store.get(issue_id)
+            if issue is None:
+                return None
+            check_issue_change(issue.status, status, priority)
+            changes = {k: v for k, v in (("status", status), ("priority", priority)) if v is not None}
+            if changes:
+                issue = issue.replace(**changes)
+                self._commit("put_issue", issue=issue)
+        self._log(f"[DB] Issue {issue_id} updated: {issue.status}, {issue.priority} priority")
+        return issue
+    
+    def close_issue(self, issue_id: str) -> Optional[IssueRecord]:
+        """Close an issue - PERMANENT. Returns the closed issue, None if not found."""
+        return self.update_issue(issue_id, status=ISSUE_CLOSED)
+    
+    def next_open_issue(self, priority: Optional[str] = None) -> Optional[IssueRecord]:
+        """The open issue to work on next: highest priority (or the given one), then oldest."""
+        check_issue_change(ISSUE_OPEN, priority=priority)
+        return self._read_issues(lambda: self.issue_store.next_open(priority))
+    
+    def open_issue_count(self, user_id: Optional[str] = None) -> int:
+        """Open issues of a user, or of everyone."""
+        return self._read_issues(lambda: self.issue_store.open_count(user_id))
+    
+    def list_issues(
+        self,
+        user_id: str,
+        status: Optional[str] = None,
+        limit: int = 20,
+        cursor: Optional[str] = None
+    ) -> Dict[str, Any]:
+        """A page of a user's issues, oldest first, optionally with one status.
+        
+        Pass the returned next_cursor (None after the last page) with the
+        same status to get the following page.
+        """
+        start = 0
+        if cursor:
+            position = decode_cursor(cursor)
+            if len(position) != 1 or not isinstance(position[0], int) or position[0] < 0:
+                raise ValueError("Invalid cursor")
+            start = position[0]
+        limit = max(0, limit)
+        
+        def read_page() -> Dict[str, Any]:
+            page: List[IssueRecord] = []
+            end = start
+            user_issues = self.indexes.issues_by_user.get(user_id, ())
+            while end < len(user_issues) and len(page) < limit:
+                if status is None or user_issues[end].status == status:
+                    page.append(user_issues[end])
+                end += 1
+            more = any(status is None or issue.status == status for issue in itertools.islice(user_issues, end, None))
+            return {"issues": page, "next_cursor": encode_cursor([end]) if more and page else None}
+        
+        return self._read_issues(read_page)
+    
+    def import_batch(self, kind: str, rows: Iterable[Dict[str, Any]]) -> int:
+        """Add a batch of users, transactions or issues (see bulk_import); returns the row count.
+        
+        In wal mode each batch is appended to the log as one write, and in
+        lazy and lmdb mode its records are written (so they can be evicted
+        and memory stays within the LRU bound). Snapshot and sharded mode
+        would rewrite whole files for every batch, so they only record the
+        batch and write once at the end (import_finished). A batch of issues
+        with an ID that exists or repeats raises ValueError and adds nothing.
+        """
+        ops: List[Tuple[str, Dict[str, Any]]] = []
+        count = 0
+        if kind == "users":
+            for row in rows:
+                user = UserRecord.from_dict(row)
+                ops.append(("put_user", {"user_id": user.user_id, "user": user}))
+            count = len(ops)
+        elif kind == "transactions":
+            by_user: Dict[str, List[Dict[str, Any]]] = {}
+            for row in rows:
+                by_user.setdefault(row["user_id"], []).append(row)
+                count += 1
+            ops = [("put_transactions", {"user_id": user_id, "transactions": txns})
+                   for user_id, txns in by_user.items()]
+        elif kind == "issues":
+            ops = [("put_issue", {"issue": IssueRecord.from_dict(row)}) for row in rows]
+            count = len(ops)
+        else:
+            raise ValueError(f"Unknown import kind '{kind}'. Use one of: users, transactions, issues")
+        # Imported issues move the next issue ID, so imports hold the issue lock too
+        with self._issue_lock:
+            if kind == "issues":
+                check_new_issue_ids(
+                    (payload["issue"].issue_id for _, payload in ops),
+                    lambda issue_id: self.issue_store.get(issue_id) is not None
+                )
+            self._commit_many(ops, write=self.store.append_only_writes)
+        return count
+    
+    def import_finished(self):
+        """Persist an import whose batches were only recorded."""
+        if self.store.append_only_writes:
+            self.flush()
+        else:
+            self.save_data()
+    
+    def last_issue_number(self) -> int:
+        """Highest number among stored issue IDs (0 if there are none)."""
+        return self.issue_store.last_number
+    
+    def find_user_by_email(self, email: str) -> Optional[UserRecord]:
+        """Look up a user by email (case-insensitive)."""
+        user_id = self.indexes.user_id_by_email(email)
+        return self._visible_user(user_id) if user_id else None
+    
+    def find_user_by_phone(self, phone: str) -> Optional[UserRecord]:
+        """Look up a user by phone number (punctuation ignored)."""
+        user_id = self.indexes.user_id_by_phone(phone)
+        return self._visible_user(user_id) if user_id else None
+    
+    def get_issue(self, issue_id: str) -> Optional[IssueRecord]:
+        """Get an issue by its ticket ID."""
+        return self._read_issues(lambda: self.indexes.issue(issue_id))
+    
+    def get_user_issues(self, user_id: str) -> List[IssueRecord]:
+        """Get all issues reported for a user, oldest first."""
+        return self._read_issues(lambda: self.indexes.issues_for_user(user_id))
+    
+    def get_issues_by_status(self, status: str) -> List[IssueRecord]:
+        """Get all issues with the given status."""
+        return self._read_issues(lambda: self.indexes.issues_with_status(status))
+    
+    @cached_read
     def get_account_details(self, user_id: str) -> Optional[Dict]:
         """Get full account details."""
-        user = self.users.get(user_id)
-        if user:
-            return {
-                "name": user["name"],
-                "email": user["email"],
-                "address": user["address"],
-                "phone": user["phone"],
-                "account_balance": user["account_balance"],
-                "card_status": user["card_status"],
-                "card_number": user["card_number"]
-            }
-        return None
+        return _account_details(self._visible_user(user_id))
     
     def switch_user(self, new_user_id: str) -> Dict:
         """Switch to a different user account."""
-        user = self.users.get(new_user_id)
+        user = self._visible_user(new_user_id)
         if user:
             self._log(f"[DB] Switching to user: {new_user_id}")
             return {
                 "success": True,
                 "user_id": new_user_id,
-                "user_name": user["name"],
-                "message": f"Switched to user: {user['name']} ({new_user_id})"
+                "user_name": user.name,
+                "message": f"Switched to user: {user.name} ({new_user_id})"
             }
         return {
             "success": False,
-            "message": f"User {new_user_id} not found. Available users: {', '.join(self.users.keys())}"
+            "message": f"User {new_user_id} not found. Available users: {', '.join(self._visible_user_ids())}"
         }
 
-# Global database instance
-db = MockDatabase()
\ No newline at end of file
+
+def __getattr__(name: str):
+    # The global instance moved to storage.py; `from .mock_data import db` still works
+    if name == "db":
+        from .storage import db
+        return db
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
@@ -0,0 +1,96 @@
+# mcp_server/mvcc.py
+"""
+Multi-version concurrency control for MockDatabase snapshot reads.
+Every commit gets a sequence number. Before a commit replaces a user's
+record and transactions it saves the versions it supersedes, so a reader
+holding an older snapshot can still find what was current at its commit.
+Readers never take the database or user locks. A superseded version is
+dropped once no open snapshot is older than the commit that replaced it.
+"""
+
+from typing import Any, Callable, Deque, Dict, List, Tuple
+from collections import deque
+import threading
+
+
+class VersionManager:
+    """Commit sequence numbers, open snapshots and the superseded versions they may still need.
+
+    Writers are serialized by the caller (MockDatabase._lock): for each
+    commit they call supersede() for every key before changing it, then
+    publish(). Reading the current value before the saved versions makes a
+    snapshot read correct whether or not it races with that commit.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.seq = 0
+        # Snapshot seq -> how many readers hold it
+        self._snapshots: Dict[int, int] = {}
+        # key -> [(seq of the commit that replaced it, value before it)], oldest first
+        self._history: Dict[str, List[Tuple[int, Any]]] = {}
+        # (seq, key) of every saved version in commit order, for collection
+        self._order: Deque[Tuple[int, str]] = deque()
+        self.collected = 0
+
+    def begin(self) -> int:
+        """Open a snapshot of the last published commit; pair with end()."""
+        with self._lock:
+            seq = self.seq
+            self._snapshots[seq] = self._snapshots.get(seq, 0) + 1
+            return seq
+
+    def end(self, seq: int):
+        with self._lock:
+            remaining = self._snapshots[seq] - 1
+            if remaining:
+                self._snapshots[seq] = remaining
+            else:
+                del self._snapshots[seq]
+                self._collect()
+
+    def supersede(self, seq: int, key: str, value: Any):
+        """Save `value` as `key` before commit `seq` changes it (once per key per commit)."""
+        with self._lock:
+            versions = self._history.setdefault(key, [])
+            if versions and versions[-1][0] == seq:
+                return
+            versions.append((seq, value))
+            self._order.append((seq, key))
+
+    def publish(self, seq: int):
+        """Make commit `seq` visible to new snapshots."""
+        with self._lock:
+            self.seq = seq
+            self._collect()
+
+    def _collect(self):
+        """Drop versions that no open snapshot can read (caller holds the lock)."""
+        # Commits up to the oldest snapshot are visible to every reader
+        horizon = min(self._snapshots) if self._snapshots else self.seq
+        while self._order and self._order[0][0] <= horizon:
+            _, key = self._order.popleft()
+            versions = self._history[key]
+            versions.pop(0)
+            if not versions:
+                del self._history[key]
+            self.collected += 1
+
+    def read(self, seq: int, key: str, current: Callable[[], Any]) -> Any:
+        """`key` as of snapshot `seq`; current() reads the live value."""
+        value = current()
+        # The value replaced first after the snapshot was taken is the one it saw
+        for replaced_at, previous in tuple(self._history.get(key, ())):
+            if replaced_at > seq:
+                return previous
+        return value
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "seq": self.seq,
+                "open_snapshots": sum(self._snapshots.values()),
+                "oldest_snapshot": min(self._snapshots) if self._snapshots else None,
+                "retained_versions": len(self._order),
+                "collected_versions": self.collected
+            }
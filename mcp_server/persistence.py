@@ -0,0 +1,456 @@
+# mcp_server/persistence.py
+"""
+Persistence strategies for MockDatabase.
+Each strategy decides how the in-memory users, transactions and issues
+are loaded and how mutations are written back to disk.
+"""
+
+from typing import Any, Callable, Dict, Iterator, List, Optional, Tuple
+import itertools
+import os
+import shutil
+import sys
+import threading
+from pathlib import Path
+
+from .codec import get_codec, get_snapshot_codec, CODECS
+from .fragments import FragmentCache
+from .wal import WriteAheadLog
+from .records import IssueRecord, data_from_dicts
+from .shards import ShardedStore
+from .lazy_store import LazyRecordStore
+from .lmdb_store import LMDBRecordStore
+
+
+class SnapshotPersistence:
+    """Whole-file snapshot: every write rewrites database.json (or database.msgpack).
+
+    JSON snapshots are assembled from per-record fragments cached between
+    writes, so only records changed since the last write are re-encoded.
+    """
+
+    # Whether begin_snapshot() can write this mode's data in the background
+    supports_background_save = True
+    # Whether write_pending() only appends the recorded mutations, at a cost
+    # independent of the data size (bulk imports then write every batch,
+    # which also lets the on-demand stores evict what each batch loaded)
+    append_only_writes = False
+
+    def __init__(self, data_file: Path, codec=None, snapshot_codec=None):
+        self.data_file = Path(data_file)
+        self.codec = codec or get_codec()
+        # database.json, the WAL and the lazy and shard files are JSON text
+        if self.codec.binary:
+            raise ValueError(f"Codec '{self.codec.name}' is binary; only snapshots can use it")
+        self.snapshot_codec = snapshot_codec or get_snapshot_codec()
+        # Binary snapshots sit next to database.json, e.g. database.msgpack
+        self.snapshot_file = (
+            self.data_file.with_suffix(self.snapshot_codec.suffix) if self.snapshot_codec.binary
+            else self.data_file
+        )
+        # Held while a snapshot is written, so an older one never replaces a newer one
+        self._snapshot_lock = threading.Lock()
+        # Set when save() found a background snapshot running and skipped the write.
+        # Set, and the snapshot lock released, under _deferred_lock: a save that
+        # misses the lock is always seen by the check that follows the release
+        self.save_deferred = False
+        self._deferred_lock = threading.Lock()
+        # Used for JSON snapshots; binary ones are a single msgpack object, encoded whole
+        self.fragments = FragmentCache(self.snapshot_codec)
+
+    def _log(self, message: str):
+        """Log to stderr to avoid interfering with stdio MCP protocol."""
+        print(message, file=sys.stderr)
+
+    @property
+    def location(self) -> Path:
+        return self.snapshot_file
+
+    def _snapshot_candidates(self) -> List[Tuple[Path, Any]]:
+        """The configured snapshot, then one in the other format to migrate from."""
+        candidates = [(self.snapshot_file, self.snapshot_codec)]
+        if self.snapshot_codec.binary:
+            candidates.append((self.data_file, self.codec))
+        elif CODECS["msgpack"][1]:
+            candidates.append((self.data_file.with_suffix(".msgpack"), get_codec("msgpack")))
+        return [(path, codec) for path, codec in candidates if path.exists()]
+
+    def exists(self) -> bool:
+        return bool(self._snapshot_candidates())
+
+    def _read(self) -> Dict[str, Any]:
+        # The newest file wins, so switching DB_SNAPSHOT_FORMAT back and forth is safe
+        path, codec = max(self._snapshot_candidates(), key=lambda c: c[0].stat().st_mtime_ns)
+        if path != self.snapshot_file:
+            self._log(f"[DB] Reading {path}; the next save writes {self.snapshot_file}")
+        with open(path, 'rb') as f:
+            return codec.loads(f.read())
+
+    def _adopt(self, db, data: Dict[str, Any]):
+        """Convert a raw document to records and install it on db."""
+        data = data_from_dicts(data)
+        db.users = data['users']
+        db.transactions = data['transactions']
+        db.issues = data['issues']
+
+    def load(self, db):
+        """Populate db.users, db.transactions and db.issues from disk."""
+        self._adopt(db, self._read())
+        self._log(f"[DB] Loaded {len(db.users)} users, {len(db.issues)} issues")
+
+    def initialize(self, db, data: Dict[str, Any]):
+        """Adopt fresh data (e.g. the defaults) and write it out."""
+        self._adopt(db, data)
+        self.save(db)
+
+    def save(self, db):
+        """Write a full snapshot of the database.
+
+        While a background snapshot is being written this only sets
+        save_deferred instead of holding the caller, and the database lock
+        it holds, until that finishes; the database saves again afterwards.
+        """
+        with self._deferred_lock:
+            if not self._snapshot_lock.acquire(blocking=False):
+                self.save_deferred = True
+                return
+            self.save_deferred = False
+        try:
+            self._write_snapshot(self._capture(db, copy=False))
+        finally:
+            self._snapshot_lock.release()
+
+    def _capture(self, db, copy: bool) -> Dict[str, Any]:
+        """The document to snapshot; with copy=True later writes don't change it.
+
+        Published user and issue records are never modified in place, so
+        copying the containers is enough; transaction columns are frozen
+        with an O(1) snapshot instead of copying their arrays.
+        """
+        if not copy:
+            return {'users': db.users, 'transactions': db.transactions, 'issues': db.issues}
+        return {
+            'users': dict(db.users),
+            'transactions': {user_id: txns.snapshot() for user_id, txns in db.transactions.items()},
+            'issues': list(db.issues)
+        }
+
+    def _write_snapshot(self, data: Dict[str, Any]):
+        """Write to a temp file and rename, so a crash never leaves a torn snapshot."""
+        # Named per process: a forked background save writes alongside this one
+        tmp = self.snapshot_file.with_name(f"{self.snapshot_file.name}.{os.getpid()}.tmp")
+        with open(tmp, 'wb') as f:
+            if self.snapshot_codec.binary:
+                f.write(self.snapshot_codec.dumps(data))
+            else:
+                f.write(self.fragments.encode(data))
+        os.replace(tmp, self.snapshot_file)
+
+    def record(self, op: str, payload: Dict[str, Any]):
+        """Note a mutation; the snapshot is taken from memory, so nothing to buffer."""
+
+    def write_pending(self, db):
+        """Persist every mutation recorded since the last write."""
+        self.save(db)
+
+    def needs_compaction(self) -> bool:
+        """Whether the on-disk log has grown enough to be worth compacting."""
+        return False
+
+    @property
+    def snapshot_in_progress(self) -> bool:
+        return self._snapshot_lock.locked()
+
+    def begin_snapshot(self, db, copy: bool = True) -> Optional[Callable[[], None]]:
+        """Capture db for a background snapshot; the caller holds the database lock.
+
+        Returns the slow part, which writes the snapshot without any
+        database lock, or None if a snapshot is already being written.
+        Pass copy=False when the writer runs in a forked child, whose memory
+        image is already private. Call end_snapshot() once it has finished.
+        """
+        if not self._snapshot_lock.acquire(blocking=False):
+            return None
+        try:
+            snapshot = self._prepare_snapshot(db, copy)
+        except Exception:
+            self._snapshot_lock.release()
+            raise
+        return lambda: self._write_snapshot(snapshot)
+
+    def _prepare_snapshot(self, db, copy: bool) -> Dict[str, Any]:
+        return self._capture(db, copy)
+
+    def end_snapshot(self, success: bool):
+        """Release the snapshot started by begin_snapshot(); then check save_deferred."""
+        with self._deferred_lock:
+            self._snapshot_lock.release()
+
+    def close(self):
+        """Release file handles."""
+
+
+# First record of every WAL segment after the first compaction
+GENERATION_OP = "generation"
+
+
+class WALPersistence(SnapshotPersistence):
+    """Snapshot plus an append-only log of mutations, replayed on load.
+
+    The log is split into generations. A snapshot stores the generation of
+    the log segment started when it was taken, and load skips older
+    segments. Compaction therefore never has to edit the log in place.
+    """
+
+    append_only_writes = True
+
+    def __init__(self, data_file: Path, fsync: bool = False, compact_bytes: int = 0,
+                 codec=None, snapshot_codec=None):
+        super().__init__(data_file, codec=codec, snapshot_codec=snapshot_codec)
+        self.wal = WriteAheadLog(self.data_file.with_suffix(".wal"), fsync=fsync, codec=self.codec)
+        # Segment being folded into a snapshot by a running compaction
+        self.compacting_file = self.wal.log_file.with_name(self.wal.log_file.name + ".compacting")
+        self.compact_bytes = compact_bytes
+        self.generation = 0
+        self._buffer: List[bytes] = []
+
+    def _segment(self, path: Path) -> Tuple[int, Iterator[Dict[str, Any]]]:
+        """A log segment's generation (0 for logs without a header) and its records."""
+        records = WriteAheadLog(path, codec=self.codec).replay()
+        first = next(records, None)
+        if first is None:
+            return 0, iter(())
+        if first.get("op") == GENERATION_OP:
+            return first["generation"], records
+        return 0, itertools.chain([first], records)
+
+    def _start_segment(self, generation: int):
+        """Empty the live log and stamp it with a new generation."""
+        self._buffer.clear()
+        self.wal.truncate()
+        self.wal.append(GENERATION_OP, {"generation": generation})
+        self.generation = generation
+
+    def load(self, db):
+        data = self._read()
+        self._adopt(db, data)
+        covered = data.get("wal_generation", 0)
+        replayed = 0
+        self.generation = covered
+        for path in (self.compacting_file, self.wal.log_file):
+            log_generation, records = self._segment(path)
+            self.generation = max(self.generation, log_generation)
+            if log_generation < covered:
+                continue
+            for record in records:
+                if record.get("op") != GENERATION_OP:
+                    db._apply(record)
+                    replayed += 1
+        self._log(f"[DB] Loaded {len(db.users)} users, {len(db.issues)} issues")
+        self._log(f"[DB] Replayed {replayed} WAL records from {self.wal.log_file}")
+        if self.compacting_file.exists():
+            # A compaction was interrupted before its snapshot landed
+            self._log("[DB] Finishing interrupted WAL compaction")
+            self.save(db)
+        elif log_generation < covered:
+            # The snapshot already covers this log; start appending after it
+            self._start_segment(covered)
+
+    def save(self, db):
+        """Write a full snapshot synchronously; the caller holds the database lock."""
+        with self._snapshot_lock:
+            generation = self.generation + 1
+            self._write_snapshot({**self._capture(db, copy=False), 'wal_generation': generation})
+            # The snapshot now covers everything in the log
+            self._start_segment(generation)
+            self.compacting_file.unlink(missing_ok=True)
+
+    def needs_compaction(self) -> bool:
+        return (
+            self.compact_bytes > 0
+            and not self._snapshot_lock.locked()
+            and self.wal.size() >= self.compact_bytes
+        )
+
+    def _prepare_snapshot(self, db, copy: bool) -> Dict[str, Any]:
+        """Set the live log aside for the snapshot to replace; writers continue in a new segment."""
+        self.write_pending(db)
+        self.wal.close()
+        if self.compacting_file.exists():
+            # An earlier snapshot failed: keep its segment and add this one
+            if self.wal.log_file.exists():
+                with open(self.wal.log_file, 'rb') as src, open(self.compacting_file, 'ab') as dst:
+                    shutil.copyfileobj(src, dst)
+                self.wal.log_file.unlink()
+        elif self.wal.log_file.exists():
+            os.replace(self.wal.log_file, self.compacting_file)
+        generation = self.generation + 1
+        self._start_segment(generation)
+        return {**self._capture(db, copy), 'wal_generation': generation}
+
+    def end_snapshot(self, success: bool):
+        try:
+            if success:
+                self.compacting_file.unlink(missing_ok=True)
+        finally:
+            super().end_snapshot(success)
+
+    def record(self, op: str, payload: Dict[str, Any]):
+        # Encode now so the log keeps the value as of this mutation
+        self._buffer.append(self.wal.encode(op, payload))
+
+    def write_pending(self, db):
+        lines, self._buffer = self._buffer, []
+        self.wal.write_lines(lines)
+
+    def close(self):
+        self.wal.close()
+
+
+class RecordStorePersistence(SnapshotPersistence):
+    """Per-user record store for users and transactions, issues in an append-only log.
+
+    Shared by the sharded and lazy modes: the store loads user records on
+    demand and writes only the ones a mutation touched.
+    """
+
+    # Writes are already incremental; there is no whole-database snapshot
+    supports_background_save = False
+
+    def __init__(self, data_file: Path, store, fsync: bool = False, codec=None):
+        super().__init__(data_file, codec=codec)
+        self.store = store
+        self.issue_log = WriteAheadLog(self.store.directory / "issues.jsonl", fsync=fsync, codec=self.codec)
+        self._buffer: List[bytes] = []
+
+    @property
+    def location(self) -> Path:
+        return self.store.directory
+
+    def exists(self) -> bool:
+        # An existing database.json is migrated on first load
+        return self.store.exists() or super().exists()
+
+    def load(self, db):
+        if not self.store.exists():
+            self._log(f"[DB] Migrating {self.data_file} to {self.store.directory}")
+            self.initialize(db, self._read())
+            return
+        self.store.open()
+        self._attach(db)
+        issues: Dict[str, Dict[str, Any]] = {}
+        for record in self.issue_log.replay():
+            if record.get("op") == "put_issue":
+                issue = IssueRecord.from_dict(record["issue"])
+                issues[issue.issue_id] = issue
+        db.issues = list(issues.values())
+        self._log(f"[DB] {self.store.describe()}, {len(db.issues)} issues")
+
+    def _attach(self, db):
+        db.users = self.store.mapping("users")
+        db.transactions = self.store.mapping("transactions")
+
+    def initialize(self, db, data: Dict[str, Any]):
+        data = data_from_dicts(data)
+        self.store.create()
+        self._attach(db)
+        db.users.update(data.get('users', {}))
+        db.transactions.update(data.get('transactions', {}))
+        db.issues = list(data.get('issues', []))
+        self.save(db)
+
+    def save(self, db):
+        """Checkpoint the record store and compact the issue log."""
+        self.store.checkpoint()
+        self._buffer.clear()
+        self.issue_log.rewrite(self.issue_log.encode("put_issue", {"issue": i}) for i in db.issues)
+
+    def record(self, op: str, payload: Dict[str, Any]):
+        if op == "put_issue":
+            self._buffer.append(self.issue_log.encode(op, payload))
+        elif "user_id" in payload:
+            self.store.mark_dirty(payload["user_id"])
+
+    def write_pending(self, db):
+        self.store.write_dirty()
+        lines, self._buffer = self._buffer, []
+        self.issue_log.write_lines(lines)
+
+    def close(self):
+        self.store.close()
+        self.issue_log.close()
+
+
+class ShardedPersistence(RecordStorePersistence):
+    """Users and transactions in hash-bucketed shard files under database_shards/.
+
+    Shards load on first access and a mutation rewrites only its own shard,
+    so both startup and per-write cost are independent of the user count.
+    """
+
+    def __init__(self, data_file: Path, shard_count: int = 64, fsync: bool = False, codec=None):
+        data_file = Path(data_file)
+        codec = codec or get_codec()
+        store = ShardedStore(data_file.parent / f"{data_file.stem}_shards", shard_count, codec=codec)
+        super().__init__(data_file, store, fsync=fsync, codec=codec)
+
+
+class LazyPersistence(RecordStorePersistence):
+    """Per-user JSON lines under database_lazy/, located through an offset index.
+
+    Startup only reads the index; records are parsed on first access and
+    held in an LRU of at most cache_size users. Writes append the new
+    version of the touched record.
+    """
+
+    # Appends the touched records; writing every import batch keeps the LRU bound
+    append_only_writes = True
+
+    def __init__(self, data_file: Path, cache_size: int = 10000, fsync: bool = False, codec=None):
+        data_file = Path(data_file)
+        codec = codec or get_codec()
+        store = LazyRecordStore(data_file.parent / f"{data_file.stem}_lazy", cache_size, codec=codec)
+        super().__init__(data_file, store, fsync=fsync, codec=codec)
+
+
+class LMDBPersistence(RecordStorePersistence):
+    """Per-user records in an LMDB environment under database_lmdb/.
+
+    Like lazy mode, records load on first access into an LRU of cache_size
+    users, but the store is a memory-mapped B+tree: reads need no offset
+    index and each write is a single transaction. Needs the lmdb package.
+    """
+
+    append_only_writes = True
+
+    def __init__(self, data_file: Path, cache_size: int = 10000, map_size: int = 1024 ** 3,
+                 fsync: bool = False, codec=None):
+        data_file = Path(data_file)
+        codec = codec or get_codec()
+        store = LMDBRecordStore(data_file.parent / f"{data_file.stem}_lmdb", cache_size, map_size,
+                                fsync=fsync, codec=codec)
+        super().__init__(data_file, store, fsync=fsync, codec=codec)
+
+
+class MemoryPersistence(SnapshotPersistence):
+    """Nothing is written: the data lives and dies with the process (tests, benchmarks)."""
+
+    supports_background_save = False
+    # Writes cost nothing, so bulk imports need no deferred save
+    append_only_writes = True
+
+    @property
+    def location(self) -> str:
+        return "memory"
+
+    def exists(self) -> bool:
+        return False
+
+    def initialize(self, db, data: Dict[str, Any]):
+        self._adopt(db, data)
+
+    def save(self, db):
+        """Nothing to write."""
+
+    def write_pending(self, db):
+        """Nothing to write."""
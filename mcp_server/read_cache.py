@@ -0,0 +1,117 @@
+# mcp_server/read_cache.py
+"""
+Read-through cache for per-user reads of MockDatabase.
+Results are cached under the user's version counter, which every mutation
+of that user bumps after publishing it. A lookup only returns an entry
+stamped with the current version, so a write is visible to the very next
+read however the cache is sized.
+"""
+
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Hashable, Optional, Tuple
+import functools
+import threading
+import time
+
+
+def _copy(value: Any) -> Any:
+    """Fresh dicts and lists around the (immutable) cached values, so callers can't edit the cache."""
+    if isinstance(value, dict):
+        return {key: _copy(item) for key, item in value.items()}
+    if isinstance(value, list):
+        return [_copy(item) for item in value]
+    return value
+
+
+class ReadCache:
+    """Bounded LRU of read results, invalidated by per-user version counters."""
+
+    def __init__(self, max_entries: int = 10000, ttl: Optional[float] = None):
+        self.max_entries = max(1, max_entries)
+        self.ttl = ttl or None
+        self._lock = threading.Lock()
+        # (user_id, read) -> (version, expiry or None, value)
+        self._entries: "OrderedDict[Tuple[str, Hashable], Tuple[int, Optional[float], Any]]" = OrderedDict()
+        self._versions: Dict[str, int] = {}
+        # Added to every version by invalidate_all(), so older entries never match
+        self._epoch = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.stale = 0
+        self.expired = 0
+
+    def version(self, user_id: str) -> int:
+        return self._epoch + self._versions.get(user_id, 0)
+
+    def get(self, user_id: str, read: Hashable, load: Callable[[], Any]) -> Any:
+        """The cached result of `read` for a user, calling load() on a miss."""
+        key = (user_id, read)
+        with self._lock:
+            # Taken before loading: a write that lands during load() bumps the
+            # version past this one, so the result is never served as current
+            version = self.version(user_id)
+            entry = self._entries.get(key)
+            if entry is not None:
+                if entry[0] != version:
+                    self.stale += 1
+                    del self._entries[key]
+                elif entry[1] is not None and entry[1] <= time.monotonic():
+                    self.expired += 1
+                    del self._entries[key]
+                else:
+                    self.hits += 1
+                    self._entries.move_to_end(key)
+                    return _copy(entry[2])
+            self.misses += 1
+        value = load()
+        with self._lock:
+            if version == self.version(user_id):
+                expiry = time.monotonic() + self.ttl if self.ttl else None
+                self._entries[key] = (version, expiry, value)
+                self._entries.move_to_end(key)
+                while len(self._entries) > self.max_entries:
+                    self._entries.popitem(last=False)
+                    self.evictions += 1
+        return _copy(value)
+
+    def invalidate(self, user_id: str):
+        """Bump a user's version; call after the change is visible to readers."""
+        with self._lock:
+            self._versions[user_id] = self._versions.get(user_id, 0) + 1
+
+    def invalidate_all(self):
+        with self._lock:
+            self._epoch += 1
+            self._entries.clear()
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "entries": len(self._entries),
+                "max_entries": self.max_entries,
+                "ttl_seconds": self.ttl,
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": self.hits / lookups if lookups else 0.0,
+                "evictions": self.evictions,
+                "stale": self.stale,
+                "expired": self.expired
+            }
+
+
+def cached_read(method: Callable) -> Callable:
+    """Serve a `method(self, user_id, ...)` read through `self.read_cache` when one is configured.
+
+    Reads made while a batch is open bypass the cache: what its own thread
+    reads may still be rolled back, and other threads read older versions.
+    """
+    @functools.wraps(method)
+    def wrapper(self, user_id: str, *args: Any, **kwargs: Any) -> Any:
+        cache = self.read_cache
+        if cache is None or self._batch is not None:
+            return method(self, user_id, *args, **kwargs)
+        read = (method.__name__, args, tuple(sorted(kwargs.items()))) if kwargs else (method.__name__, args)
+        return cache.get(user_id, read, lambda: method(self, user_id, *args, **kwargs))
+    return wrapper
@@ -0,0 +1,36 @@
+# mcp_server/reconcile.py
+"""
+Balance reconciliation job.
+Recomputes every user's running balances from the transaction amounts and
+reports where stored balances have drifted; --fix writes the recomputed
+balances back.
+
+Usage: python -m mcp_server.reconcile [--fix] [--sample N]
+"""
+
+import argparse
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Check account and running balances against transaction history")
+    parser.add_argument("--fix", action="store_true", help="Write the recomputed balances back")
+    parser.add_argument("--sample", type=int, default=20, help="Drifted users to list (default: 20)")
+    args = parser.parse_args()
+
+    # Imported here so --help works without opening the database
+    from .storage import db
+
+    try:
+        report = db.reconcile_balances(fix=args.fix, sample=args.sample)
+    finally:
+        db.close()
+    for user in report["drifted"]:
+        print(f"{user['user_id']}: balance {user['account_balance']:.2f}, expected {user['expected_balance']:.2f}, "
+              f"{user['transactions_with_drift']} running balances wrong")
+    print(f"Checked {report['users']:,} users and {report['transactions']:,} transactions in "
+          f"{report['seconds']:.1f}s: {report['users_with_drift']:,} users drifted "
+          f"(total {report['total_drift']:,.2f}), {report['fixed']:,} fixed")
+
+
+if __name__ == "__main__":
+    main()
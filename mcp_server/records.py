@@ -0,0 +1,180 @@
+# mcp_server/records.py
+"""
+Compact record types for users, transactions and issues.
+Records use __slots__ instead of a per-instance dict and intern their
+enum-like status values, so millions of them stay cheap to hold in memory.
+They are converted to plain dicts only at the tool-response boundary.
+"""
+
+from typing import TYPE_CHECKING, Any, Dict, Iterator, List
+import sys
+
+if TYPE_CHECKING:
+    # txn_store imports this module, so the runtime import stays in the function
+    from .txn_store import TransactionColumns
+
+# Enum-like values shared (interned) by every record that uses them
+CARD_ACTIVE = sys.intern("active")
+CARD_DEACTIVATED = sys.intern("deactivated")
+ISSUE_OPEN = sys.intern("open")
+ISSUE_IN_PROGRESS = sys.intern("in_progress")
+ISSUE_CLOSED = sys.intern("closed")
+ISSUE_STATUSES = (ISSUE_OPEN, ISSUE_IN_PROGRESS, ISSUE_CLOSED)
+# Allowed status changes; a closed issue can only be reopened
+ISSUE_TRANSITIONS = {
+    ISSUE_OPEN: (ISSUE_IN_PROGRESS, ISSUE_CLOSED),
+    ISSUE_IN_PROGRESS: (ISSUE_OPEN, ISSUE_CLOSED),
+    ISSUE_CLOSED: (ISSUE_OPEN,),
+}
+PRIORITIES = tuple(sys.intern(p) for p in ("low", "medium", "high"))
+
+
+class Record:
+    """Base for slotted records, with read/write dict-style access for compatibility."""
+
+    __slots__ = ()
+    FIELDS: tuple = ()
+    INTERNED: tuple = ()
+
+    def __init__(self, **fields: Any):
+        for name in self.FIELDS:
+            value = fields.get(name)
+            if name in self.INTERNED and isinstance(value, str):
+                value = sys.intern(value)
+            setattr(self, name, value)
+
+    @classmethod
+    def from_dict(cls, data: Any):
+        """Build a record from a dict (records are returned unchanged)."""
+        if isinstance(data, cls) or data is None:
+            return data
+        return cls(**data)
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {name: getattr(self, name) for name in self.FIELDS}
+
+    def replace(self, **changes: Any):
+        """Return a copy with `changes` applied, leaving this record untouched."""
+        unknown = changes.keys() - set(self.FIELDS)
+        if unknown:
+            raise KeyError(", ".join(sorted(unknown)))
+        return type(self)(**{**self.to_dict(), **changes})
+
+    def __getitem__(self, key: str) -> Any:
+        if key not in self.FIELDS:
+            raise KeyError(key)
+        return getattr(self, key)
+
+    def __setitem__(self, key: str, value: Any):
+        if key not in self.FIELDS:
+            raise KeyError(key)
+        setattr(self, key, value)
+
+    def __contains__(self, key: object) -> bool:
+        return key in self.FIELDS
+
+    def get(self, key: str, default: Any = None) -> Any:
+        return getattr(self, key, default) if key in self.FIELDS else default
+
+    def keys(self) -> Iterator[str]:
+        return iter(self.FIELDS)
+
+    def __eq__(self, other: object) -> bool:
+        if not isinstance(other, Record):
+            return NotImplemented
+        return type(self) is type(other) and all(
+            getattr(self, name) == getattr(other, name) for name in self.FIELDS
+        )
+
+    __hash__ = None
+
+    def __repr__(self) -> str:
+        return f"{type(self).__name__}({self.to_dict()!r})"
+
+
+class UserRecord(Record):
+    FIELDS = (
+        "user_id", "name", "email", "password", "address",
+        "account_balance", "card_status", "card_number", "phone", "version"
+    )
+    INTERNED = ("card_status",)
+    __slots__ = FIELDS
+
+    def __init__(self, **fields: Any):
+        super().__init__(**fields)
+        # Records saved before versioning start at 0
+        if self.version is None:
+            self.version = 0
+
+    def revise(self, **changes: Any) -> "UserRecord":
+        """A copy with `changes` applied and the version bumped, as every user mutation publishes."""
+        return self.replace(version=self.version + 1, **changes)
+
+
+class VersionConflict(ValueError):
+    """A write with expected_version found the user at a different version."""
+
+    def __init__(self, user_id: str, expected_version: int, current_version: int):
+        super().__init__(
+            f"{user_id} is at version {current_version}, not {expected_version}: re-read the account and retry"
+        )
+        self.user_id = user_id
+        self.expected_version = expected_version
+        self.current_version = current_version
+
+
+class TransactionRecord(Record):
+    FIELDS = ("id", "date", "description", "amount", "balance")
+    __slots__ = FIELDS
+
+
+class IssueRecord(Record):
+    FIELDS = ("issue_id", "user_id", "description", "status", "created_at", "priority")
+    INTERNED = ("status", "priority")
+    __slots__ = FIELDS
+
+
+def users_from_dicts(users: Dict[str, Any]) -> Dict[str, UserRecord]:
+    return {user_id: UserRecord.from_dict(user) for user_id, user in users.items()}
+
+
+def transactions_from_dicts(txns: Any) -> "TransactionColumns":
+    """Build a user's columnar transaction store (see txn_store)."""
+    from .txn_store import TransactionColumns
+    if isinstance(txns, TransactionColumns):
+        return txns
+    return TransactionColumns.from_dicts(txns)
+
+
+def issues_from_dicts(issues: List[Any]) -> List[IssueRecord]:
+    return [IssueRecord.from_dict(issue) for issue in issues]
+
+
+def data_from_dicts(data: Dict[str, Any]) -> Dict[str, Any]:
+    """Convert a raw {'users', 'transactions', 'issues'} document to records."""
+    return {
+        'users': users_from_dicts(data.get('users', {})),
+        'transactions': {
+            user_id: transactions_from_dicts(txns)
+            for user_id, txns in data.get('transactions', {}).items()
+        },
+        'issues': issues_from_dicts(data.get('issues', []))
+    }
+
+
+def encode_record(obj: Any) -> Dict[str, Any]:
+    """`default=` hook so json.dump can serialize records and transaction columns."""
+    if isinstance(obj, Record):
+        return obj.to_dict()
+    if hasattr(obj, "to_dicts"):
+        return obj.to_dicts()
+    raise TypeError(f"Object of type {type(obj).__name__} is not JSON serializable")
+
+
+def as_dict(value: Any) -> Any:
+    """Convert a record (or list of records) to plain dicts for tool responses."""
+    if isinstance(value, Record):
+        return value.to_dict()
+    if isinstance(value, list):
+        return [as_dict(item) for item in value]
+    return value
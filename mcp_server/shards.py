@@ -0,0 +1,165 @@
+# mcp_server/shards.py
+"""
+Sharded on-disk layout for the mock database.
+Users and their transactions are split into hash buckets by user_id, one
+JSON file per bucket. Shards are loaded on first access and only shards
+touched by a mutation are rewritten, re-encoding only the changed users.
+"""
+
+from typing import Any, Dict, Iterator, Set
+from collections.abc import MutableMapping
+import json
+import os
+import sys
+import threading
+import zlib
+from pathlib import Path
+
+from .codec import get_codec
+from .fragments import FragmentCache
+from .records import users_from_dicts, transactions_from_dicts
+
+SHARD_SECTIONS = ("users", "transactions")
+
+
+class ShardedStore:
+    """Directory of hash-bucketed shard files plus a small meta file."""
+
+    def __init__(self, directory: Path, shard_count: int = 64, codec=None):
+        self.directory = Path(directory)
+        self.codec = codec or get_codec()
+        self.meta_file = self.directory / "meta.json"
+        self.shard_count = shard_count
+        self._shards: Dict[int, Dict[str, Dict[str, Any]]] = {}
+        self._dirty: Set[int] = set()
+        # Per shard, so each keeps the encoded users of its own file
+        self._fragments: Dict[int, FragmentCache] = {}
+        self._load_lock = threading.Lock()
+
+    def _log(self, message: str):
+        """Log to stderr to avoid interfering with stdio MCP protocol."""
+        print(message, file=sys.stderr)
+
+    def exists(self) -> bool:
+        return self.meta_file.exists()
+
+    def mapping(self, section: str) -> "ShardedMapping":
+        return ShardedMapping(self, section)
+
+    def describe(self) -> str:
+        return f"Opened {self.shard_count} shards (loaded on demand)"
+
+    def open(self):
+        """Read the shard layout from an existing directory."""
+        with open(self.meta_file, 'r') as f:
+            meta = json.load(f)
+        if meta["shard_count"] != self.shard_count:
+            self._log(f"[DB] Using existing layout of {meta['shard_count']} shards")
+        self.shard_count = meta["shard_count"]
+
+    def create(self):
+        """Create an empty shard directory."""
+        self.directory.mkdir(parents=True, exist_ok=True)
+        self._atomic_write(self.meta_file, {"shard_count": self.shard_count})
+        self._shards = {i: {section: {} for section in SHARD_SECTIONS} for i in range(self.shard_count)}
+        self._dirty = set(range(self.shard_count))
+
+    def shard_index(self, user_id: str) -> int:
+        """Stable bucket for a user (crc32, so it's the same in every process)."""
+        return zlib.crc32(user_id.encode('utf-8')) % self.shard_count
+
+    def _shard_file(self, index: int) -> Path:
+        return self.directory / f"shard_{index:04d}.json"
+
+    def shard(self, index: int) -> Dict[str, Dict[str, Any]]:
+        """Return a shard, loading it from disk on first access."""
+        shard = self._shards.get(index)
+        if shard is None:
+            with self._load_lock:
+                shard = self._shards.get(index)
+                if shard is None:
+                    path = self._shard_file(index)
+                    if path.exists():
+                        with open(path, 'rb') as f:
+                            shard = self.codec.loads(f.read())
+                        shard["users"] = users_from_dicts(shard["users"])
+                        shard["transactions"] = {
+                            user_id: transactions_from_dicts(txns)
+                            for user_id, txns in shard["transactions"].items()
+                        }
+                    else:
+                        shard = {section: {} for section in SHARD_SECTIONS}
+                    self._shards[index] = shard
+        return shard
+
+    def shard_for(self, user_id: str) -> Dict[str, Dict[str, Any]]:
+        return self.shard(self.shard_index(user_id))
+
+    @property
+    def loaded_count(self) -> int:
+        return len(self._shards)
+
+    def mark_dirty(self, user_id: str):
+        """Schedule the shard holding `user_id` for rewriting."""
+        self._dirty.add(self.shard_index(user_id))
+
+    def write_dirty(self) -> int:
+        """Rewrite only the shards changed since the last write."""
+        dirty, self._dirty = self._dirty, set()
+        for index in sorted(dirty):
+            fragments = self._fragments.get(index)
+            if fragments is None:
+                fragments = self._fragments[index] = FragmentCache(self.codec)
+            self._write_bytes(self._shard_file(index), fragments.encode(self._shards[index]))
+        return len(dirty)
+
+    def checkpoint(self) -> int:
+        """Rewrite every resident shard (unloaded shards are already on disk)."""
+        self._dirty = set(self._shards)
+        return self.write_dirty()
+
+    def close(self):
+        """Nothing to release: shard files are opened per write."""
+
+    def _atomic_write(self, path: Path, data: Any):
+        self._write_bytes(path, self.codec.dumps(data))
+
+    def _write_bytes(self, path: Path, data: bytes):
+        """Write to a temp file and rename, so readers never see a torn shard."""
+        tmp = path.with_name(path.name + ".tmp")
+        with open(tmp, 'wb') as f:
+            f.write(data)
+        os.replace(tmp, path)
+
+
+class ShardedMapping(MutableMapping):
+    """Dict-like view of one section (users or transactions) across all shards."""
+
+    def __init__(self, store: ShardedStore, section: str):
+        self.store = store
+        self.section = section
+
+    def __getitem__(self, key: str) -> Any:
+        return self.store.shard_for(key)[self.section][key]
+
+    def get(self, key: str, default: Any = None) -> Any:
+        return self.store.shard_for(key)[self.section].get(key, default)
+
+    def __contains__(self, key: object) -> bool:
+        return isinstance(key, str) and key in self.store.shard_for(key)[self.section]
+
+    def __setitem__(self, key: str, value: Any):
+        self.store.shard_for(key)[self.section][key] = value
+        self.store.mark_dirty(key)
+
+    def __delitem__(self, key: str):
+        del self.store.shard_for(key)[self.section][key]
+        self.store.mark_dirty(key)
+
+    def __iter__(self) -> Iterator[str]:
+        # Full iteration has to visit (and therefore load) every shard
+        for index in range(self.store.shard_count):
+            yield from list(self.store.shard(index)[self.section])
+
+    def __len__(self) -> int:
+        return sum(len(self.store.shard(i)[self.section]) for i in range(self.store.shard_count))
@@ -0,0 +1,674 @@
+# mcp_server/sqlite_db.py
+"""
+SQLite storage backend for the customer support system.
+Drop-in replacement for MockDatabase that keeps data in a local SQLite
+file instead of in-memory dicts, so memory stays bounded at any dataset size.
+"""
+
+from typing import Any, Dict, Iterable, Iterator, List, Optional
+from contextlib import contextmanager
+from datetime import datetime
+import json
+import random
+import sqlite3
+import sys
+import threading
+import time
+import uuid
+from pathlib import Path
+
+from .async_db import AsyncDatabaseMixin
+from .mock_data import default_data
+from .indexes import normalize_email, normalize_phone
+from .txn_store import decode_cursor, encode_cursor
+from .issue_store import check_issue_change, check_new_issue_ids, format_issue_id, issue_number, triage_rank
+from .records import ISSUE_OPEN, ISSUE_CLOSED, VersionConflict
+
+# Built-in functions only, so the expression index also works from the sqlite3 CLI
+PHONE_DIGITS_SQL = (
+    "replace(replace(replace(replace(replace(replace(phone, '+', ''), '-', ''), ' ', ''), "
+    "'(', ''), ')', ''), '.', '')"
+)
+
+# Triage order (see issue_store.TRIAGE_ORDER); indexed, so the next open issue is one index probe
+PRIORITY_RANK_SQL = "(CASE priority WHEN 'high' THEN 0 WHEN 'medium' THEN 1 ELSE 2 END)"
+
+SCHEMA = f"""
+CREATE TABLE IF NOT EXISTS users (
+    user_id TEXT PRIMARY KEY,
+    name TEXT NOT NULL,
+    email TEXT,
+    password TEXT,
+    address TEXT,
+    account_balance REAL NOT NULL DEFAULT 0,
+    card_status TEXT,
+    card_number TEXT,
+    phone TEXT,
+    version INTEGER NOT NULL DEFAULT 0
+);
+CREATE TABLE IF NOT EXISTS transactions (
+    seq INTEGER PRIMARY KEY,
+    id TEXT NOT NULL,
+    user_id TEXT NOT NULL,
+    date TEXT NOT NULL,
+    description TEXT,
+    amount REAL NOT NULL,
+    balance REAL
+);
+CREATE INDEX IF NOT EXISTS idx_transactions_user_date ON transactions(user_id, date DESC);
+CREATE TABLE IF NOT EXISTS issues (
+    seq INTEGER PRIMARY KEY,
+    issue_id TEXT NOT NULL UNIQUE,
+    user_id TEXT NOT NULL,
+    description TEXT,
+    status TEXT NOT NULL,
+    created_at TEXT NOT NULL,
+    priority TEXT
+);
+CREATE INDEX IF NOT EXISTS idx_issues_user ON issues(user_id);
+CREATE INDEX IF NOT EXISTS idx_issues_status ON issues(status);
+CREATE INDEX IF NOT EXISTS idx_issues_triage ON issues(status, {PRIORITY_RANK_SQL}, created_at, seq);
+CREATE INDEX IF NOT EXISTS idx_users_email ON users(lower(trim(email)));
+CREATE INDEX IF NOT EXISTS idx_users_phone ON users({PHONE_DIGITS_SQL});
+CREATE TABLE IF NOT EXISTS counters (
+    name TEXT PRIMARY KEY,
+    value INTEGER NOT NULL
+);
+"""
+
+# Statements are kept as constants so sqlite3's per-connection statement
+# cache can reuse the prepared form on every call.
+SQL_GET_USER = "SELECT * FROM users WHERE user_id = ?"
+SQL_GET_BALANCE = "SELECT account_balance FROM users WHERE user_id = ?"
+# User updates bump the version; with an expected version they are a
+# compare-and-set (params: value, user_id, expected_version, expected_version)
+USER_CAS_SQL = "version = version + 1 WHERE user_id = ? AND (? IS NULL OR version = ?)"
+SQL_SET_PASSWORD = f"UPDATE users SET password = ?, {USER_CAS_SQL}"
+SQL_SET_ADDRESS = f"UPDATE users SET address = ?, {USER_CAS_SQL}"
+SQL_SET_CARD_STATUS = f"UPDATE users SET card_status = ?, {USER_CAS_SQL}"
+SQL_GET_VERSION = "SELECT version FROM users WHERE user_id = ?"
+# Newest first, ties broken by insertion order; (date, seq) is also the page
+# cursor, and both walk idx_transactions_user_date (seq is the rowid)
+SQL_TRANSACTIONS_PAGE = (
+    "SELECT seq, id, date, description, amount, balance FROM transactions "
+    "WHERE user_id = ? AND date >= ? AND date < ? AND (date < ? OR (date = ? AND seq < ?)) "
+    "ORDER BY date DESC, seq DESC LIMIT ?"
+)
+# Sorts after every ISO date; the open upper bound of a page query
+DATE_MAX = "9999"
+SQL_NEXT_ISSUE_SEQ = "SELECT COALESCE(MAX(seq), 0) + 1 FROM issues"
+# The highest issue number handed out or stored (see issue_store.issue_number):
+# new IDs continue from it, so they never collide with imported ones
+SQL_GET_ISSUE_NUMBER = "SELECT value FROM counters WHERE name = 'issue'"
+SQL_NEXT_ISSUE_NUMBER = "UPDATE counters SET value = value + 1 WHERE name = 'issue'"
+SQL_RAISE_ISSUE_NUMBER = (
+    "INSERT INTO counters (name, value) VALUES ('issue', ?) "
+    "ON CONFLICT(name) DO UPDATE SET value = MAX(value, excluded.value)"
+)
+SQL_ISSUE_IDS = "SELECT issue_id FROM issues"
+SQL_INSERT_ISSUE = (
+    "INSERT INTO issues (seq, issue_id, user_id, description, status, created_at, priority) "
+    "VALUES (?, ?, ?, ?, ?, ?, ?)"
+)
+SQL_INSERT_USER = (
+    "INSERT OR REPLACE INTO users (user_id, name, email, password, address, "
+    "account_balance, card_status, card_number, phone, version) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, COALESCE(?, 0))"
+)
+SQL_INSERT_TRANSACTION = (
+    "INSERT INTO transactions (id, user_id, date, description, amount, balance) "
+    "VALUES (?, ?, ?, ?, ?, ?)"
+)
+SQL_SET_BALANCE = "UPDATE users SET account_balance = ?, version = version + 1 WHERE user_id = ?"
+# Running balances recomputed per user with window functions: anchored at
+# the balance before the first transaction, or at account_balance minus
+# the history's total when that has no running balance (amounts in cents)
+SQL_EXPECTED_BALANCES = """
+WITH running AS (
+    SELECT seq, user_id, balance,
+           SUM(CAST(ROUND(amount * 100) AS INTEGER)) OVER (
+               PARTITION BY user_id ORDER BY date, seq ROWS UNBOUNDED PRECEDING) AS total,
+           SUM(CAST(ROUND(amount * 100) AS INTEGER)) OVER (PARTITION BY user_id) AS history_total,
+           FIRST_VALUE(CAST(ROUND((balance - amount) * 100) AS INTEGER)) OVER (
+               PARTITION BY user_id ORDER BY date, seq) AS first_opening,
+           ROW_NUMBER() OVER (PARTITION BY user_id ORDER BY date DESC, seq DESC) AS from_end
+    FROM transactions
+),
+expected AS MATERIALIZED (
+    SELECT r.seq, r.user_id, r.balance, r.from_end, u.account_balance,
+           COALESCE(r.first_opening, CAST(ROUND(COALESCE(u.account_balance, 0) * 100) AS INTEGER) - r.history_total)
+               + r.total AS cents
+    FROM running r JOIN users u ON u.user_id = r.user_id
+)
+"""
+SQL_BALANCE_DRIFT = SQL_EXPECTED_BALANCES + """
+SELECT user_id, COUNT(*) AS transactions,
+       SUM(balance IS NULL OR CAST(ROUND(balance * 100) AS INTEGER) != cents) AS transactions_with_drift,
+       MAX(COALESCE(account_balance, 0)) AS account_balance,
+       MAX(CASE WHEN from_end = 1 THEN cents END) AS final_cents
+FROM expected GROUP BY user_id
+"""
+SQL_FIX_RUNNING_BALANCES = SQL_EXPECTED_BALANCES + """
+UPDATE transactions SET balance = expected.cents / 100.0 FROM expected
+WHERE transactions.seq = expected.seq
+  AND (expected.balance IS NULL OR CAST(ROUND(expected.balance * 100) AS INTEGER) != expected.cents)
+"""
+SQL_FIX_ACCOUNT_BALANCES = SQL_EXPECTED_BALANCES + """
+UPDATE users SET account_balance = expected.cents / 100.0, version = version + 1 FROM expected
+WHERE users.user_id = expected.user_id AND expected.from_end = 1
+  AND CAST(ROUND(COALESCE(users.account_balance, 0) * 100) AS INTEGER) != expected.cents
+"""
+SQL_COUNT_USERS = "SELECT COUNT(*) FROM users"
+# Any read starts the WAL read transaction that pins a snapshot
+SQL_PIN_SNAPSHOT = "SELECT 1 FROM users LIMIT 1"
+SQL_SAMPLE_USER_IDS = "SELECT user_id FROM users ORDER BY user_id LIMIT 20"
+SQL_USER_BY_EMAIL = "SELECT * FROM users WHERE lower(trim(email)) = ?"
+SQL_USER_BY_PHONE = f"SELECT * FROM users WHERE {PHONE_DIGITS_SQL} = ?"
+ISSUE_COLUMNS_SQL = "issue_id, user_id, description, status, created_at, priority"
+SQL_GET_ISSUE = f"SELECT {ISSUE_COLUMNS_SQL} FROM issues WHERE issue_id = ?"
+SQL_USER_ISSUES = f"SELECT {ISSUE_COLUMNS_SQL} FROM issues WHERE user_id = ? ORDER BY seq"
+SQL_ISSUES_BY_STATUS = f"SELECT {ISSUE_COLUMNS_SQL} FROM issues WHERE status = ? ORDER BY issue_id"
+SQL_UPDATE_ISSUE = "UPDATE issues SET status = ?, priority = ? WHERE issue_id = ?"
+SQL_NEXT_OPEN_ISSUE = (
+    f"SELECT {ISSUE_COLUMNS_SQL} FROM issues WHERE status = 'open' "
+    f"ORDER BY {PRIORITY_RANK_SQL}, created_at, seq LIMIT 1"
+)
+SQL_NEXT_OPEN_ISSUE_AT = (
+    f"SELECT {ISSUE_COLUMNS_SQL} FROM issues WHERE status = 'open' AND {PRIORITY_RANK_SQL} = ? "
+    f"ORDER BY created_at, seq LIMIT 1"
+)
+SQL_OPEN_ISSUE_COUNT = "SELECT COUNT(*) FROM issues WHERE status = 'open'"
+SQL_USER_OPEN_ISSUE_COUNT = "SELECT COUNT(*) FROM issues WHERE user_id = ? AND status = 'open'"
+SQL_USER_ISSUES_PAGE = (
+    f"SELECT seq, {ISSUE_COLUMNS_SQL} FROM issues "
+    "WHERE user_id = ? AND seq > ? AND (? IS NULL OR status = ?) ORDER BY seq LIMIT ?"
+)
+
+USER_COLUMNS = (
+    "user_id", "name", "email", "password", "address",
+    "account_balance", "card_status", "card_number", "phone", "version"
+)
+# Added after the first release; older files get it on open
+SQL_USER_COLUMN_NAMES = "SELECT name FROM pragma_table_info('users')"
+SQL_ADD_USER_VERSION = "ALTER TABLE users ADD COLUMN version INTEGER NOT NULL DEFAULT 0"
+
+
+class SQLiteDatabase(AsyncDatabaseMixin):
+    """Customer database backed by SQLite, with the same interface as MockDatabase."""
+
+    def __init__(self, db_file: Optional[Path] = None):
+        self.db_file = Path(db_file) if db_file else Path(__file__).parent.parent / "database.sqlite3"
+        # One connection per thread: sqlite3 connections must not be shared
+        # across threads, and WAL mode lets them read concurrently.
+        self._local = threading.local()
+        self._connections: List[sqlite3.Connection] = []
+        self._connections_lock = threading.Lock()
+        self._initialize_schema()
+
+    def _log(self, message: str):
+        """Log to stderr to avoid interfering with stdio MCP protocol."""
+        print(message, file=sys.stderr)
+
+    def _conn(self) -> sqlite3.Connection:
+        """Return this thread's connection, opening it on first use."""
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(
+                self.db_file,
+                isolation_level=None,
+                check_same_thread=False,
+                cached_statements=256
+            )
+            conn.row_factory = sqlite3.Row
+            # Set the busy timeout first: other worker processes may hold
+            # the lock while this one switches the journal mode.
+            conn.execute("PRAGMA busy_timeout=5000")
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+            with self._connections_lock:
+                self._connections.append(conn)
+        return conn
+
+    def _initialize_schema(self):
+        """Create tables and indexes, seeding data on first run."""
+        conn = self._conn()
+        conn.executescript(SCHEMA)
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            # Checked under the write lock, so when several worker processes
+            # start together only the first one seeds (or migrates) the database.
+            if "version" not in {row[0] for row in conn.execute(SQL_USER_COLUMN_NAMES)}:
+                conn.execute(SQL_ADD_USER_VERSION)
+            if conn.execute(SQL_COUNT_USERS).fetchone()[0] == 0:
+                self._insert(conn, self._seed_data())
+            if conn.execute(SQL_GET_ISSUE_NUMBER).fetchone() is None:
+                # New file, or one from before the counter: start above every stored ID
+                numbers = (issue_number(row[0]) for row in conn.execute(SQL_ISSUE_IDS))
+                conn.execute(SQL_RAISE_ISSUE_NUMBER, (max(numbers, default=0),))
+            conn.execute("COMMIT")
+        except Exception:
+            conn.execute("ROLLBACK")
+            raise
+        self._log(f"[DB] Using SQLite database at {self.db_file}")
+
+    def _seed_data(self) -> Dict[str, Any]:
+        """Existing database.json contents, or the default data."""
+        json_file = self.db_file.with_name("database.json")
+        if json_file.exists():
+            self._log(f"[DB] Importing {json_file} into {self.db_file}")
+            with open(json_file, 'r') as f:
+                return json.load(f)
+        self._log("[DB] No saved data found, using defaults")
+        return default_data()
+
+    def _insert(self, conn: sqlite3.Connection, data: Dict[str, Any]):
+        """Insert users, transactions and issues inside the caller's transaction."""
+        conn.executemany(SQL_INSERT_USER, (
+            tuple(user.get(col) for col in USER_COLUMNS)
+            for user in data.get('users', {}).values()
+        ))
+        conn.executemany(SQL_INSERT_TRANSACTION, (
+            (txn["id"], user_id, txn["date"], txn.get("description"), txn["amount"], txn.get("balance"))
+            for user_id, txns in data.get('transactions', {}).items()
+            for txn in txns
+        ))
+        conn.executemany(SQL_INSERT_ISSUE, (
+            (seq, issue["issue_id"], issue["user_id"], issue.get("description"),
+             issue["status"], issue["created_at"], issue.get("priority"))
+            for seq, issue in enumerate(data.get('issues', []), 1)
+        ))
+
+    def close(self):
+        """Close every pooled connection."""
+        self._close_executors()
+        with self._connections_lock:
+            for conn in self._connections:
+                conn.close()
+            self._connections.clear()
+        self._local = threading.local()
+
+    def _update_user(self, sql: str, value: Any, user_id: str, expected_version: Optional[int] = None) -> bool:
+        """Run a single-column user update, returning whether the user exists.
+
+        With expected_version the update only matches that version; raises
+        VersionConflict if the user exists at another one.
+        """
+        conn = self._conn()
+        if conn.execute(sql, (value, user_id, expected_version, expected_version)).rowcount > 0:
+            return True
+        if expected_version is not None:
+            row = conn.execute(SQL_GET_VERSION, (user_id,)).fetchone()
+            if row is not None:
+                raise VersionConflict(user_id, expected_version, row[0])
+        return False
+
+    @contextmanager
+    def _transaction(self) -> Iterator[sqlite3.Connection]:
+        """A write transaction on this thread's connection: committed after the block, rolled back if it raises.
+
+        Inside batch() it is a savepoint, so it commits with the batch.
+        """
+        conn = self._conn()
+        if conn.in_transaction:
+            conn.execute("SAVEPOINT write")
+            try:
+                yield conn
+            except BaseException:
+                conn.execute("ROLLBACK TO write")
+                raise
+            finally:
+                conn.execute("RELEASE write")
+            return
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            yield conn
+        except BaseException:
+            conn.execute("ROLLBACK")
+            raise
+        conn.execute("COMMIT")
+
+    @contextmanager
+    def batch(self) -> Iterator["SQLiteDatabase"]:
+        """Commit every write made on this thread within the block as one transaction (one WAL sync).
+
+        If the block raises, all of them are rolled back. BEGIN IMMEDIATE
+        takes the write lock up front, so other connections' writes wait
+        for the batch (up to the busy timeout). A nested batch joins it.
+        """
+        with self._transaction():
+            yield self
+
+    @contextmanager
+    def snapshot(self) -> Iterator["SQLiteDatabase"]:
+        """Reads on this thread within the block see one committed state (don't write in it).
+
+        A WAL read transaction on this thread's connection: other
+        connections keep writing and the reader never waits for them.
+        """
+        conn = self._conn()
+        if conn.in_transaction:
+            # Nested: the outer snapshot is already pinned
+            yield self
+            return
+        conn.execute("BEGIN")
+        try:
+            conn.execute(SQL_PIN_SNAPSHOT).fetchone()
+            yield self
+        finally:
+            conn.execute("COMMIT")
+
+    def get_user(self, user_id: str) -> Optional[Dict]:
+        """Get user by ID."""
+        row = self._conn().execute(SQL_GET_USER, (user_id,)).fetchone()
+        return dict(row) if row else None
+
+    def change_password(self, user_id: str, new_password: str, expected_version: Optional[int] = None) -> bool:
+        """Change user password - PERMANENT. See _update_user for expected_version."""
+        if self._update_user(SQL_SET_PASSWORD, f"hashed_{new_password}", user_id, expected_version):
+            self._log(f"[DB] Password changed for {user_id}")
+            return True
+        return False
+
+    def get_account_balance(self, user_id: str) -> Optional[float]:
+        """Get account balance."""
+        row = self._conn().execute(SQL_GET_BALANCE, (user_id,)).fetchone()
+        return row[0] if row else None
+
+    def update_address(self, user_id: str, new_address: str, expected_version: Optional[int] = None) -> bool:
+        """Update user address - PERMANENT. See _update_user for expected_version."""
+        if self._update_user(SQL_SET_ADDRESS, new_address, user_id, expected_version):
+            self._log(f"[DB] Address changed for {user_id}")
+            self._log(f"     New: {new_address}")
+            return True
+        return False
+
+    def get_recent_transactions(
+        self,
+        user_id: str,
+        limit: int = 10,
+        since: Optional[str] = None,
+        until: Optional[str] = None,
+        cursor: Optional[str] = None
+    ) -> List[Dict]:
+        """Get recent transactions dated in [since, until), newest first (see get_transactions_page)."""
+        return self.get_transactions_page(user_id, limit, since, until, cursor)["transactions"]
+
+    def get_transactions_page(
+        self,
+        user_id: str,
+        limit: int = 10,
+        since: Optional[str] = None,
+        until: Optional[str] = None,
+        cursor: Optional[str] = None
+    ) -> Dict[str, Any]:
+        """A page of a user's transactions, newest first, and the cursor of the next one."""
+        before_date, before_seq = DATE_MAX, 2 ** 63 - 1
+        if cursor:
+            position = decode_cursor(cursor)
+            if len(position) != 2 or not isinstance(position[0], str) or not isinstance(position[1], int):
+                raise ValueError("Invalid cursor")
+            before_date, before_seq = position
+        limit = max(0, limit)
+        # One extra row tells whether another page follows
+        rows = self._conn().execute(SQL_TRANSACTIONS_PAGE, (
+            user_id, since or "", until or DATE_MAX, before_date, before_date, before_seq, limit + 1
+        )).fetchall()
+        page = rows[:limit]
+        next_cursor = encode_cursor([page[-1]["date"], page[-1]["seq"]]) if len(rows) > limit and page else None
+        transactions = []
+        for row in page:
+            txn = dict(row)
+            del txn["seq"]
+            transactions.append(txn)
+        return {"transactions": transactions, "next_cursor": next_cursor}
+
+    def add_transaction(self, user_id: str, description: str, amount: float) -> Optional[Dict]:
+        """Record a transaction dated now and update the balance in one SQLite transaction - PERMANENT."""
+        with self._transaction() as conn:
+            row = conn.execute(SQL_GET_BALANCE, (user_id,)).fetchone()
+            if row is None:
+                return None
+            amount = round(amount, 2)
+            balance = round((row[0] or 0) + amount, 2)
+            txn = {
+                "id": f"txn_{uuid.uuid4().hex[:12]}",
+                "date": datetime.now().isoformat(),
+                "description": description,
+                "amount": amount,
+                "balance": balance
+            }
+            conn.execute(SQL_SET_BALANCE, (balance, user_id))
+            conn.execute(SQL_INSERT_TRANSACTION, (
+                txn["id"], user_id, txn["date"], description, amount, balance
+            ))
+        self._log(f"[DB] Transaction {txn['id']} for {user_id}: {amount:+.2f}, balance {balance:.2f}")
+        return txn
+
+    def reconcile_balances(self, fix: bool = False, sample: int = 20) -> Dict[str, Any]:
+        """Recompute every running and account balance from transaction history and report drift.
+
+        Runs as set-based SQL (see SQL_EXPECTED_BALANCES); fix=True applies
+        the recomputed balances in the same transaction.
+        """
+        started = time.perf_counter()
+        with self._transaction() as conn:
+            rows = conn.execute(SQL_BALANCE_DRIFT).fetchall()
+            report: Dict[str, Any] = {
+                "users": conn.execute(SQL_COUNT_USERS).fetchone()[0],
+                "transactions": sum(row["transactions"] for row in rows),
+                "users_with_drift": 0, "transactions_with_drift": 0,
+                "total_drift": 0.0, "drifted": [], "fixed": 0
+            }
+            for row in rows:
+                account_cents = int(round(row["account_balance"] * 100))
+                if not row["transactions_with_drift"] and account_cents == row["final_cents"]:
+                    continue
+                report["users_with_drift"] += 1
+                report["transactions_with_drift"] += row["transactions_with_drift"]
+                report["total_drift"] += abs(account_cents - row["final_cents"]) / 100
+                if len(report["drifted"]) < sample:
+                    report["drifted"].append({
+                        "user_id": row["user_id"],
+                        "account_balance": row["account_balance"],
+                        "expected_balance": row["final_cents"] / 100,
+                        "transactions_with_drift": row["transactions_with_drift"]
+                    })
+            if fix and report["users_with_drift"]:
+                conn.execute(SQL_FIX_ACCOUNT_BALANCES)
+                conn.execute(SQL_FIX_RUNNING_BALANCES)
+                report["fixed"] = report["users_with_drift"]
+        report["total_drift"] = round(report["total_drift"], 2)
+        report["seconds"] = time.perf_counter() - started
+        self._log(f"[DB] Reconciled {report['users']} users, {report['transactions']} transactions: "
+                  f"{report['users_with_drift']} users drifted, {report['fixed']} fixed")
+        return report
+
+    def deactivate_card(self, user_id: str, expected_version: Optional[int] = None) -> bool:
+        """Deactivate user's card - PERMANENT. See _update_user for expected_version."""
+        if self._update_user(SQL_SET_CARD_STATUS, "deactivated", user_id, expected_version):
+            self._log(f"[DB] Card status changed for {user_id}")
+            self._log("     New: deactivated")
+            return True
+        return False
+
+    def report_issue(self, user_id: str, issue_description: str, priority: Optional[str] = None) -> str:
+        """Report a customer issue - PERMANENT. Without a priority one is picked at random."""
+        check_issue_change(ISSUE_OPEN, priority=priority)
+        # BEGIN IMMEDIATE takes the write lock before reading the sequence,
+        # so concurrent callers can never allocate the same issue ID.
+        with self._transaction() as conn:
+            seq = conn.execute(SQL_NEXT_ISSUE_SEQ).fetchone()[0]
+            conn.execute(SQL_NEXT_ISSUE_NUMBER)
+            issue_id = format_issue_id(conn.execute(SQL_GET_ISSUE_NUMBER).fetchone()[0])
+            conn.execute(SQL_INSERT_ISSUE, (
+                seq, issue_id, user_id, issue_description, "open",
+                datetime.now().isoformat(), priority or random.choice(["low", "medium", "high"])
+            ))
+        self._log(f"[DB] Issue created: {issue_id}")
+        return issue_id
+
+    def update_issue(
+        self,
+        issue_id: str,
+        status: Optional[str] = None,
+        priority: Optional[str] = None
+    ) -> Optional[Dict]:
+        """Change an issue's status and/or priority - PERMANENT. Returns the updated issue, None if not found.
+
+        Raises ValueError for an unknown status or priority, or a status
+        change ISSUE_TRANSITIONS doesn't allow (e.g. closed -> in_progress).
+        """
+        # The status check and the update must see the same row
+        with self._transaction() as conn:
+            row = conn.execute(SQL_GET_ISSUE, (issue_id,)).fetchone()
+            if row is None:
+                return None
+            issue = dict(row)
+            check_issue_change(issue["status"], status, priority)
+            issue["status"] = status or issue["status"]
+            issue["priority"] = priority or issue["priority"]
+            conn.execute(SQL_UPDATE_ISSUE, (issue["status"], issue["priority"], issue_id))
+        self._log(f"[DB] Issue {issue_id} updated: {issue['status']}, {issue['priority']} priority")
+        return issue
+
+    def close_issue(self, issue_id: str) -> Optional[Dict]:
+        """Close an issue - PERMANENT. Returns the closed issue, None if not found."""
+        return self.update_issue(issue_id, status=ISSUE_CLOSED)
+
+    def next_open_issue(self, priority: Optional[str] = None) -> Optional[Dict]:
+        """The open issue to work on next: highest priority (or the given one), then oldest."""
+        check_issue_change(ISSUE_OPEN, priority=priority)
+        if priority:
+            row = self._conn().execute(SQL_NEXT_OPEN_ISSUE_AT, (triage_rank(priority),)).fetchone()
+        else:
+            row = self._conn().execute(SQL_NEXT_OPEN_ISSUE).fetchone()
+        return dict(row) if row else None
+
+    def open_issue_count(self, user_id: Optional[str] = None) -> int:
+        """Open issues of a user, or of everyone."""
+        if user_id is None:
+            return self._conn().execute(SQL_OPEN_ISSUE_COUNT).fetchone()[0]
+        return self._conn().execute(SQL_USER_OPEN_ISSUE_COUNT, (user_id,)).fetchone()[0]
+
+    def list_issues(
+        self,
+        user_id: str,
+        status: Optional[str] = None,
+        limit: int = 20,
+        cursor: Optional[str] = None
+    ) -> Dict[str, Any]:
+        """A page of a user's issues, oldest first, optionally with one status, and the cursor of the next one."""
+        after = 0
+        if cursor:
+            position = decode_cursor(cursor)
+            if len(position) != 1 or not isinstance(position[0], int):
+                raise ValueError("Invalid cursor")
+            after = position[0]
+        limit = max(0, limit)
+        # One extra row tells whether another page follows
+        rows = self._conn().execute(SQL_USER_ISSUES_PAGE, (user_id, after, status, status, limit + 1)).fetchall()
+        page = rows[:limit]
+        next_cursor = encode_cursor([page[-1]["seq"]]) if len(rows) > limit and page else None
+        issues = []
+        for row in page:
+            issue = dict(row)
+            del issue["seq"]
+            issues.append(issue)
+        return {"issues": issues, "next_cursor": next_cursor}
+
+    def import_batch(self, kind: str, rows: Iterable[Dict[str, Any]]) -> int:
+        """Insert a batch of users, transactions or issues in one transaction (see bulk_import).
+
+        A batch of issues with an ID that exists or repeats raises ValueError and adds nothing.
+        """
+        with self._transaction() as conn:
+            before = conn.total_changes
+            if kind == "users":
+                conn.executemany(SQL_INSERT_USER, (tuple(row.get(col) for col in USER_COLUMNS) for row in rows))
+            elif kind == "transactions":
+                conn.executemany(SQL_INSERT_TRANSACTION, (
+                    (row["id"], row["user_id"], row["date"], row.get("description"),
+                     row["amount"], row.get("balance"))
+                    for row in rows
+                ))
+            elif kind == "issues":
+                rows = list(rows)
+                check_new_issue_ids(
+                    (row["issue_id"] for row in rows),
+                    lambda issue_id: conn.execute(SQL_GET_ISSUE, (issue_id,)).fetchone() is not None
+                )
+                start = conn.execute(SQL_NEXT_ISSUE_SEQ).fetchone()[0]
+                conn.executemany(SQL_INSERT_ISSUE, (
+                    (seq, row["issue_id"], row["user_id"], row.get("description"),
+                     row["status"], row["created_at"], row.get("priority"))
+                    for seq, row in enumerate(rows, start)
+                ))
+                count = conn.total_changes - before
+                conn.execute(SQL_RAISE_ISSUE_NUMBER, (max((issue_number(row["issue_id"]) for row in rows), default=0),))
+                return count
+            else:
+                raise ValueError(f"Unknown import kind '{kind}'. Use one of: users, transactions, issues")
+            return conn.total_changes - before
+
+    def import_finished(self):
+        """Every batch is already committed."""
+
+    def last_issue_number(self) -> int:
+        """Highest number among stored or reported issue IDs (0 if there are none)."""
+        return self._conn().execute(SQL_GET_ISSUE_NUMBER).fetchone()[0]
+
+    def find_user_by_email(self, email: str) -> Optional[Dict]:
+        """Look up a user by email (case-insensitive)."""
+        row = self._conn().execute(SQL_USER_BY_EMAIL, (normalize_email(email),)).fetchone()
+        return dict(row) if row else None
+
+    def find_user_by_phone(self, phone: str) -> Optional[Dict]:
+        """Look up a user by phone number (punctuation ignored)."""
+        row = self._conn().execute(SQL_USER_BY_PHONE, (normalize_phone(phone),)).fetchone()
+        return dict(row) if row else None
+
+    def get_issue(self, issue_id: str) -> Optional[Dict]:
+        """Get an issue by its ticket ID."""
+        row = self._conn().execute(SQL_GET_ISSUE, (issue_id,)).fetchone()
+        return dict(row) if row else None
+
+    def get_user_issues(self, user_id: str) -> List[Dict]:
+        """Get all issues reported for a user, oldest first."""
+        return [dict(row) for row in self._conn().execute(SQL_USER_ISSUES, (user_id,))]
+
+    def get_issues_by_status(self, status: str) -> List[Dict]:
+        """Get all issues with the given status."""
+        return [dict(row) for row in self._conn().execute(SQL_ISSUES_BY_STATUS, (status,))]
+
+    def get_account_details(self, user_id: str) -> Optional[Dict]:
+        """Get full account details."""
+        user = self.get_user(user_id)
+        if user:
+            return {
+                "name": user["name"],
+                "email": user["email"],
+                "address": user["address"],
+                "phone": user["phone"],
+                "account_balance": user["account_balance"],
+                "card_status": user["card_status"],
+                "card_number": user["card_number"],
+                "version": user["version"]
+            }
+        return None
+
+    def switch_user(self, new_user_id: str) -> Dict:
+        """Switch to a different user account."""
+        user = self.get_user(new_user_id)
+        if user:
+            self._log(f"[DB] Switching to user: {new_user_id}")
+            return {
+                "success": True,
+                "user_id": new_user_id,
+                "user_name": user["name"],
+                "message": f"Switched to user: {user['name']} ({new_user_id})"
+            }
+        sample = [row[0] for row in self._conn().execute(SQL_SAMPLE_USER_IDS)]
+        return {
+            "success": False,
+            "message": f"User {new_user_id} not found. Available users include: {', '.join(sample)}"
+        }
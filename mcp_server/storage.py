@@ -0,0 +1,161 @@
+# mcp_server/storage.py
+"""
+Storage backend protocol and registry.
+The tool layer codes against StorageBackend and gets its instance from
+here, so the backend is chosen per deployment with STORAGE_BACKEND
+(memory, json, sqlite, lmdb, or "module:factory" for a backend defined
+elsewhere) without touching the tools. Backends register a factory with
+register_backend() and must pass the shared conformance checks in
+mcp_server/conformance.py.
+"""
+
+from pathlib import Path
+from typing import Any, Callable, ContextManager, Dict, Iterable, List, Optional, Protocol, runtime_checkable
+import importlib
+import os
+
+# A user, transaction or issue: a record on the in-memory backends, a dict on
+# SQLite. Both support row["field"] and convert with records.as_dict().
+Row = Any
+
+
+@runtime_checkable
+class StorageBackend(Protocol):
+    """The operations every storage backend provides, blocking and async (see async_db).
+
+    User updates given an expected_version are compare-and-set: they raise
+    records.VersionConflict unless the user is still at that version.
+    """
+
+    def get_user(self, user_id: str) -> Optional[Row]: ...
+    def change_password(self, user_id: str, new_password: str, expected_version: Optional[int] = None) -> bool: ...
+    def get_account_balance(self, user_id: str) -> Optional[float]: ...
+    def update_address(self, user_id: str, new_address: str, expected_version: Optional[int] = None) -> bool: ...
+    def get_recent_transactions(self, user_id: str, limit: int = 10, since: Optional[str] = None,
+                                until: Optional[str] = None, cursor: Optional[str] = None) -> List[Row]: ...
+    def get_transactions_page(self, user_id: str, limit: int = 10, since: Optional[str] = None,
+                              until: Optional[str] = None, cursor: Optional[str] = None) -> Dict[str, Any]: ...
+    def add_transaction(self, user_id: str, description: str, amount: float) -> Optional[Row]: ...
+    def reconcile_balances(self, fix: bool = False, sample: int = 20) -> Dict[str, Any]: ...
+    def deactivate_card(self, user_id: str, expected_version: Optional[int] = None) -> bool: ...
+    def report_issue(self, user_id: str, issue_description: str, priority: Optional[str] = None) -> str: ...
+    def update_issue(self, issue_id: str, status: Optional[str] = None,
+                     priority: Optional[str] = None) -> Optional[Row]: ...
+    def close_issue(self, issue_id: str) -> Optional[Row]: ...
+    def next_open_issue(self, priority: Optional[str] = None) -> Optional[Row]: ...
+    def open_issue_count(self, user_id: Optional[str] = None) -> int: ...
+    def list_issues(self, user_id: str, status: Optional[str] = None, limit: int = 20,
+                    cursor: Optional[str] = None) -> Dict[str, Any]: ...
+    def import_batch(self, kind: str, rows: Iterable[Dict[str, Any]]) -> int: ...
+    def import_finished(self) -> None: ...
+    # Highest number among stored issue IDs (7 for issue_007), for numbering imported issues after it
+    def last_issue_number(self) -> int: ...
+    def find_user_by_email(self, email: str) -> Optional[Row]: ...
+    def find_user_by_phone(self, phone: str) -> Optional[Row]: ...
+    def get_issue(self, issue_id: str) -> Optional[Row]: ...
+    def get_user_issues(self, user_id: str) -> List[Row]: ...
+    def get_issues_by_status(self, status: str) -> List[Row]: ...
+    def get_account_details(self, user_id: str) -> Optional[Dict]: ...
+    def switch_user(self, new_user_id: str) -> Dict: ...
+    # A consistent read view for the block, with get_user, get_account_balance,
+    # get_account_details, get_recent_transactions and get_transactions_page
+    def snapshot(self) -> ContextManager[Any]: ...
+    # Mutations made in the block (on this thread) commit together, or not at all if it raises
+    def batch(self) -> ContextManager[Any]: ...
+    def close(self) -> None: ...
+
+    async def aget_user(self, user_id: str) -> Optional[Row]: ...
+    async def achange_password(self, user_id: str, new_password: str,
+                               expected_version: Optional[int] = None) -> bool: ...
+    async def aget_account_balance(self, user_id: str) -> Optional[float]: ...
+    async def aupdate_address(self, user_id: str, new_address: str,
+                              expected_version: Optional[int] = None) -> bool: ...
+    async def aget_recent_transactions(self, user_id: str, limit: int = 10, since: Optional[str] = None,
+                                       until: Optional[str] = None, cursor: Optional[str] = None) -> List[Row]: ...
+    async def aget_transactions_page(self, user_id: str, limit: int = 10, since: Optional[str] = None,
+                                     until: Optional[str] = None, cursor: Optional[str] = None) -> Dict[str, Any]: ...
+    async def aadd_transaction(self, user_id: str, description: str, amount: float) -> Optional[Row]: ...
+    async def areconcile_balances(self, fix: bool = False) -> Dict[str, Any]: ...
+    async def adeactivate_card(self, user_id: str, expected_version: Optional[int] = None) -> bool: ...
+    async def areport_issue(self, user_id: str, issue_description: str, priority: Optional[str] = None) -> str: ...
+    async def aupdate_issue(self, issue_id: str, status: Optional[str] = None,
+                            priority: Optional[str] = None) -> Optional[Row]: ...
+    async def aclose_issue(self, issue_id: str) -> Optional[Row]: ...
+    async def anext_open_issue(self, priority: Optional[str] = None) -> Optional[Row]: ...
+    async def aopen_issue_count(self, user_id: Optional[str] = None) -> int: ...
+    async def alist_issues(self, user_id: str, status: Optional[str] = None, limit: int = 20,
+                           cursor: Optional[str] = None) -> Dict[str, Any]: ...
+    async def afind_user_by_email(self, email: str) -> Optional[Row]: ...
+    async def afind_user_by_phone(self, phone: str) -> Optional[Row]: ...
+    async def aget_issue(self, issue_id: str) -> Optional[Row]: ...
+    async def aget_user_issues(self, user_id: str) -> List[Row]: ...
+    async def aget_issues_by_status(self, status: str) -> List[Row]: ...
+    async def aget_account_details(self, user_id: str) -> Optional[Dict]: ...
+    async def aswitch_user(self, new_user_id: str) -> Dict: ...
+    async def abatch(self, fn: Callable[..., Any], *args: Any) -> Any: ...
+
+
+# A factory takes the data file to use (None for the backend's default
+# location) and returns a ready backend
+BackendFactory = Callable[[Optional[Path]], StorageBackend]
+
+_BACKENDS: Dict[str, BackendFactory] = {}
+
+
+def register_backend(name: str, factory: BackendFactory):
+    """Make a backend selectable as STORAGE_BACKEND=<name>."""
+    _BACKENDS[name] = factory
+
+
+def available_backends() -> List[str]:
+    return list(_BACKENDS)
+
+
+def create_database(backend: Optional[str] = None, path: Optional[Path] = None) -> StorageBackend:
+    """Create the database for a backend (default: STORAGE_BACKEND, else json).
+
+    `backend` is a registered name or "package.module:factory", which is
+    imported and used as the factory (so a third-party backend needs no
+    change here).
+    """
+    backend = backend or os.getenv("STORAGE_BACKEND", "json")
+    factory = _BACKENDS.get(backend)
+    if factory is None and ":" in backend:
+        module, _, attr = backend.partition(":")
+        factory = getattr(importlib.import_module(module), attr)
+    if factory is None:
+        raise ValueError(
+            f"Unknown STORAGE_BACKEND '{backend}'. Use one of: {', '.join(_BACKENDS)} or module:factory"
+        )
+    return factory(path)
+
+
+# Built-in backends; imported on use so only the selected one is loaded
+
+def _memory(path: Optional[Path]) -> StorageBackend:
+    from .mock_data import MockDatabase
+    return MockDatabase(data_file=path, persistence="memory")
+
+
+def _json(path: Optional[Path]) -> StorageBackend:
+    from .mock_data import MockDatabase
+    return MockDatabase(data_file=path)
+
+
+def _sqlite(path: Optional[Path]) -> StorageBackend:
+    from .sqlite_db import SQLiteDatabase
+    return SQLiteDatabase(path)
+
+
+def _lmdb(path: Optional[Path]) -> StorageBackend:
+    from .mock_data import MockDatabase
+    return MockDatabase(data_file=path, persistence="lmdb")
+
+
+register_backend("memory", _memory)
+register_backend("json", _json)
+register_backend("sqlite", _sqlite)
+register_backend("lmdb", _lmdb)
+
+# Global database instance
+db: StorageBackend = create_database()
@@ -4,21 +4,59 @@ MCP tool definitions for customer support operations.
 Each tool corresponds to a customer support action.
 """
 
-from typing import Any, Dict
+from typing import Any, Awaitable, Dict, Optional
 from mcp.server import Server
 from mcp.types import Tool, TextContent
 from pydantic import BaseModel, Field
-import json
 import logging
+import os
 
-from .mock_data import db
+from .codec import get_codec
+from .storage import db
+from .records import VersionConflict, as_dict
 
 logger = logging.getLogger(__name__)
 
+# TOOL_JSON_COMPACT=true sends results without indentation: smaller and faster to encode
+COMPACT_RESULTS = os.getenv("TOOL_JSON_COMPACT", "false").lower() == "true"
+
+
+def encode_result(result: Dict[str, Any]) -> str:
+    """Serialize a tool result with the configured codec."""
+    return get_codec().dumps(result, pretty=not COMPACT_RESULTS).decode('utf-8')
+
+
+async def user_update_result(write: Awaitable[bool], message: str, expected_version: Optional[int]) -> Dict[str, Any]:
+    """Result of a user update; a failed compare-and-set is a conflict result, not an error.
+
+    After a compare-and-set the new version is known without re-reading
+    (every update bumps it by one), so a chain of writes can keep going.
+    """
+    try:
+        success = await write
+    except VersionConflict as e:
+        return {
+            "success": False,
+            "conflict": True,
+            "current_version": e.current_version,
+            "message": str(e)
+        }
+    result: Dict[str, Any] = {"success": success, "message": message if success else "User not found"}
+    if success and expected_version is not None:
+        result["version"] = expected_version + 1
+    return result
+
+
+EXPECTED_VERSION_DESCRIPTION = (
+    "Only apply the change if the account is still at this version (from get_account_details); "
+    "otherwise a conflict is returned with the current version"
+)
+
 
 class ChangePasswordArgs(BaseModel):
     user_id: str = Field(description="The unique identifier for the user")
     new_password: str = Field(description="The new password to set")
+    expected_version: Optional[int] = Field(default=None, description=EXPECTED_VERSION_DESCRIPTION)
 
 
 class GetAccountBalanceArgs(BaseModel):
@@ -28,32 +66,74 @@ class GetAccountBalanceArgs(BaseModel):
 class UpdateAddressArgs(BaseModel):
     user_id: str = Field(description="The unique identifier for the user")
     new_address: str = Field(description="The new address to set")
+    expected_version: Optional[int] = Field(default=None, description=EXPECTED_VERSION_DESCRIPTION)
 
 
 class GetRecentTransactionsArgs(BaseModel):
     user_id: str = Field(description="The unique identifier for the user")
     limit: int = Field(default=10, description="Maximum number of transactions to return")
+    since: Optional[str] = Field(default=None, description="Only transactions on or after this ISO date, e.g. 2024-01-31")
+    until: Optional[str] = Field(default=None, description="Only transactions before this ISO date")
+    cursor: Optional[str] = Field(
+        default=None,
+        description="next_cursor from the previous page, to continue with older transactions"
+    )
 
 
 class DeactivateCardArgs(BaseModel):
     user_id: str = Field(description="The unique identifier for the user")
+    expected_version: Optional[int] = Field(default=None, description=EXPECTED_VERSION_DESCRIPTION)
 
 
 class ReportIssueArgs(BaseModel):
     user_id: str = Field(description="The unique identifier for the user")
     issue_description: str = Field(description="Description of the issue")
+    priority: Optional[str] = Field(default=None, description="low, medium or high (assigned automatically if omitted)")
 
 
 class GetAccountDetailsArgs(BaseModel):
     user_id: str = Field(description="The unique identifier for the user")
 
 
+class FindUserArgs(BaseModel):
+    email: Optional[str] = Field(default=None, description="Email address to look up")
+    phone: Optional[str] = Field(default=None, description="Phone number to look up")
+
+
+class GetIssueArgs(BaseModel):
+    issue_id: str = Field(description="The ticket ID, e.g. issue_001")
+
+
+class ListUserIssuesArgs(BaseModel):
+    user_id: str = Field(description="The unique identifier for the user")
+    status: Optional[str] = Field(default=None, description="Only tickets with this status: open, in_progress or closed")
+    limit: int = Field(default=20, ge=1, le=100, description="Maximum number of tickets to return (1-100)")
+    cursor: Optional[str] = Field(default=None, description="next_cursor from the previous page")
+
+
+class UpdateIssueArgs(BaseModel):
+    issue_id: str = Field(description="The ticket ID, e.g. issue_001")
+    status: Optional[str] = Field(default=None, description="New status: open, in_progress or closed")
+    priority: Optional[str] = Field(default=None, description="New priority: low, medium or high")
+
+
+class CloseIssueArgs(BaseModel):
+    issue_id: str = Field(description="The ticket ID, e.g. issue_001")
+
+
+class GetNextIssueArgs(BaseModel):
+    priority: Optional[str] = Field(default=None, description="Only consider tickets of this priority")
+
+
 def get_tool_definitions() -> list[Tool]:
     """Return all available MCP tools."""
     return [
         Tool(
             name="change_password",
-            description="Change a user's password. Returns success status.",
+            description=(
+                "Change a user's password. Returns success status. Pass expected_version to apply it "
+                "only if the account hasn't changed since you read it."
+            ),
             inputSchema=ChangePasswordArgs.model_json_schema()
         ),
         Tool(
@@ -63,17 +143,26 @@ def get_tool_definitions() -> list[Tool]:
         ),
         Tool(
             name="update_address",
-            description="Update a user's address in the system.",
+            description=(
+                "Update a user's address in the system. Pass expected_version to apply it only if "
+                "the account hasn't changed since you read it."
+            ),
             inputSchema=UpdateAddressArgs.model_json_schema()
         ),
         Tool(
             name="get_recent_transactions",
-            description="Retrieve recent transactions for a user's account.",
+            description=(
+                "Retrieve a user's transactions, newest first, optionally within a date range. "
+                "Results are paged: pass next_cursor back as cursor to get older transactions."
+            ),
             inputSchema=GetRecentTransactionsArgs.model_json_schema()
         ),
         Tool(
             name="deactivate_card",
-            description="Deactivate a user's card for security purposes.",
+            description=(
+                "Deactivate a user's card for security purposes. Pass expected_version to apply it "
+                "only if the account hasn't changed since you read it."
+            ),
             inputSchema=DeactivateCardArgs.model_json_schema()
         ),
         Tool(
@@ -83,8 +172,41 @@ def get_tool_definitions() -> list[Tool]:
         ),
         Tool(
             name="get_account_details",
-            description="Retrieve comprehensive account details for a user.",
+            description="Retrieve comprehensive account details for a user, including the account version.",
             inputSchema=GetAccountDetailsArgs.model_json_schema()
+        ),
+        Tool(
+            name="find_user",
+            description="Find a user account by email address or phone number.",
+            inputSchema=FindUserArgs.model_json_schema()
+        ),
+        Tool(
+            name="get_issue",
+            description="Look up a support ticket by its ID.",
+            inputSchema=GetIssueArgs.model_json_schema()
+        ),
+        Tool(
+            name="list_user_issues",
+            description=(
+                "List a user's support tickets, oldest first, optionally with one status. "
+                "Results are paged: pass next_cursor back as cursor to get more."
+            ),
+            inputSchema=ListUserIssuesArgs.model_json_schema()
+        ),
+        Tool(
+            name="update_issue",
+            description="Change a support ticket's status (open, in_progress, closed) or priority.",
+            inputSchema=UpdateIssueArgs.model_json_schema()
+        ),
+        Tool(
+            name="close_issue",
+            description="Close a support ticket.",
+            inputSchema=CloseIssueArgs.model_json_schema()
+        ),
+        Tool(
+            name="get_next_issue",
+            description="Get the open support ticket to work on next: highest priority first, then oldest.",
+            inputSchema=GetNextIssueArgs.model_json_schema()
         )
     ]
 
@@ -105,15 +227,14 @@ async def execute_tool(tool_name: str, arguments: Dict[str, Any]) -> list[TextCo
     try:
         if tool_name == "change_password":
             args = ChangePasswordArgs(**arguments)
-            success = db.change_password(args.user_id, args.new_password)
-            result = {
-                "success": success,
-                "message": "Password changed successfully" if success else "User not found"
-            }
+            result = await user_update_result(
+                db.achange_password(args.user_id, args.new_password, args.expected_version),
+                "Password changed successfully", args.expected_version
+            )
             
         elif tool_name == "get_account_balance":
             args = GetAccountBalanceArgs(**arguments)
-            balance = db.get_account_balance(args.user_id)
+            balance = await db.aget_account_balance(args.user_id)
             result = {
                 "success": balance is not None,
                 "balance": balance,
@@ -122,32 +243,33 @@ async def execute_tool(tool_name: str, arguments: Dict[str, Any]) -> list[TextCo
             
         elif tool_name == "update_address":
             args = UpdateAddressArgs(**arguments)
-            success = db.update_address(args.user_id, args.new_address)
-            result = {
-                "success": success,
-                "message": "Address updated successfully" if success else "User not found"
-            }
+            result = await user_update_result(
+                db.aupdate_address(args.user_id, args.new_address, args.expected_version),
+                "Address updated successfully", args.expected_version
+            )
             
         elif tool_name == "get_recent_transactions":
             args = GetRecentTransactionsArgs(**arguments)
-            transactions = db.get_recent_transactions(args.user_id, args.limit)
+            page = await db.aget_transactions_page(
+                args.user_id, args.limit, args.since, args.until, args.cursor
+            )
             result = {
                 "success": True,
-                "transactions": transactions,
-                "count": len(transactions)
+                "transactions": as_dict(page["transactions"]),
+                "count": len(page["transactions"]),
+                "next_cursor": page["next_cursor"]
             }
             
         elif tool_name == "deactivate_card":
             args = DeactivateCardArgs(**arguments)
-            success = db.deactivate_card(args.user_id)
-            result = {
-                "success": success,
-                "message": "Card deactivated successfully" if success else "User not found"
-            }
+            result = await user_update_result(
+                db.adeactivate_card(args.user_id, args.expected_version),
+                "Card deactivated successfully", args.expected_version
+            )
             
         elif tool_name == "report_issue":
             args = ReportIssueArgs(**arguments)
-            issue_id = db.report_issue(args.user_id, args.issue_description)
+            issue_id = await db.areport_issue(args.user_id, args.issue_description, args.priority)
             result = {
                 "success": True,
                 "issue_id": issue_id,
@@ -156,13 +278,70 @@ async def execute_tool(tool_name: str, arguments: Dict[str, Any]) -> list[TextCo
             
         elif tool_name == "get_account_details":
             args = GetAccountDetailsArgs(**arguments)
-            details = db.get_account_details(args.user_id)
+            details = await db.aget_account_details(args.user_id)
             result = {
                 "success": details is not None,
                 "details": details,
                 "message": "Account details retrieved" if details else "User not found"
             }
             
+        elif tool_name == "find_user":
+            args = FindUserArgs(**arguments)
+            user = None
+            if args.email:
+                user = await db.afind_user_by_email(args.email)
+            if user is None and args.phone:
+                user = await db.afind_user_by_phone(args.phone)
+            result = {
+                "success": user is not None,
+                "user_id": user["user_id"] if user else None,
+                "name": user["name"] if user else None,
+                "message": f"Found user {user['user_id']}" if user else "No user matches that email or phone"
+            }
+            
+        elif tool_name == "get_issue":
+            args = GetIssueArgs(**arguments)
+            issue = await db.aget_issue(args.issue_id)
+            result = {
+                "success": issue is not None,
+                "issue": as_dict(issue),
+                "message": "Issue retrieved" if issue else f"Issue {args.issue_id} not found"
+            }
+            
+        elif tool_name == "list_user_issues":
+            args = ListUserIssuesArgs(**arguments)
+            page = await db.alist_issues(args.user_id, args.status, args.limit, args.cursor)
+            result = {
+                "success": True,
+                "issues": as_dict(page["issues"]),
+                "count": len(page["issues"]),
+                "open_count": await db.aopen_issue_count(args.user_id),
+                "next_cursor": page["next_cursor"]
+            }
+            
+        elif tool_name in ("update_issue", "close_issue"):
+            if tool_name == "update_issue":
+                args = UpdateIssueArgs(**arguments)
+                issue = await db.aupdate_issue(args.issue_id, args.status, args.priority)
+            else:
+                args = CloseIssueArgs(**arguments)
+                issue = await db.aclose_issue(args.issue_id)
+            result = {
+                "success": issue is not None,
+                "issue": as_dict(issue),
+                "message": f"Issue {args.issue_id} is now {issue['status']}" if issue else f"Issue {args.issue_id} not found"
+            }
+            
+        elif tool_name == "get_next_issue":
+            args = GetNextIssueArgs(**arguments)
+            issue = await db.anext_open_issue(args.priority)
+            result = {
+                "success": True,
+                "issue": as_dict(issue),
+                "open_count": await db.aopen_issue_count(),
+                "message": f"Next ticket: {issue['issue_id']}" if issue else "No open tickets"
+            }
+            
         else:
             result = {
                 "success": False,
@@ -170,7 +349,7 @@ async def execute_tool(tool_name: str, arguments: Dict[str, Any]) -> list[TextCo
             }
         
         logger.info(f"Tool {tool_name} executed successfully")
-        return [TextContent(type="text", text=json.dumps(result, indent=2))]
+        return [TextContent(type="text", text=encode_result(result))]
         
     except Exception as e:
         logger.error(f"Error executing tool {tool_name}: {str(e)}")
@@ -179,4 +358,4 @@ async def execute_tool(tool_name: str, arguments: Dict[str, Any]) -> list[TextCo
             "error": str(e),
             "message": f"Failed to execute {tool_name}"
         }
-        return [TextContent(type="text", text=json.dumps(error_result, indent=2))]
\ No newline at end of file
+        return [TextContent(type="text", text=encode_result(error_result))]
\ No newline at end of file
@@ -0,0 +1,386 @@
+# mcp_server/txn_store.py
+"""
+Columnar, array-backed transaction storage.
+Each user's transactions are kept as parallel typed arrays sorted by date:
+dates as epoch microseconds, amounts and balances as integer cents and
+descriptions as indexes into a shared interned string table. Recent-N and
+date-range queries are bisect + array slices instead of list scans.
+"""
+
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Tuple, Union
+from array import array
+from bisect import bisect_left, bisect_right
+from datetime import datetime, timedelta, timezone
+import base64
+import heapq
+import itertools
+import json
+import threading
+
+from .records import TransactionRecord
+
+EPOCH = datetime(1970, 1, 1)
+ONE_MICROSECOND = timedelta(microseconds=1)
+# Stands in for a missing balance in the int64 balance column
+NO_BALANCE = -(2 ** 63)
+# Source of TransactionColumns.version; never reused, so equal versions mean equal contents
+_versions = itertools.count(1)
+
+
+def to_epoch_us(value: Union[str, datetime]) -> int:
+    """ISO date (or datetime) -> epoch microseconds; aware values are taken as UTC."""
+    dt = datetime.fromisoformat(value) if isinstance(value, str) else value
+    if dt.tzinfo is not None:
+        dt = dt.astimezone(timezone.utc).replace(tzinfo=None)
+    return (dt - EPOCH) // ONE_MICROSECOND
+
+
+def from_epoch_us(value: int) -> str:
+    return (EPOCH + timedelta(microseconds=value)).isoformat()
+
+
+def to_cents(amount: float) -> int:
+    return int(round(amount * 100))
+
+
+def encode_cursor(position: List[Any]) -> str:
+    """Opaque page cursor for a position in a sorted history."""
+    return base64.urlsafe_b64encode(json.dumps(position, separators=(',', ':')).encode('utf-8')).decode('ascii')
+
+
+def decode_cursor(cursor: str) -> List[Any]:
+    try:
+        position = json.loads(base64.urlsafe_b64decode(cursor.encode('ascii')))
+    except (ValueError, UnicodeError) as e:
+        raise ValueError("Invalid cursor") from e
+    if not isinstance(position, list):
+        raise ValueError("Invalid cursor")
+    return position
+
+
+class StringTable:
+    """Interned string table: each distinct description is stored once."""
+
+    def __init__(self):
+        self._ids: Dict[str, int] = {}
+        self._strings: List[str] = []
+        self._lock = threading.Lock()
+
+    def intern(self, value: str) -> int:
+        index = self._ids.get(value)
+        if index is None:
+            with self._lock:
+                index = self._ids.get(value)
+                if index is None:
+                    index = len(self._strings)
+                    self._strings.append(value)
+                    self._ids[value] = index
+        return index
+
+    def lookup(self, index: int) -> str:
+        return self._strings[index]
+
+    def __len__(self) -> int:
+        return len(self._strings)
+
+
+# Shared by every user's columns so common descriptions are stored once
+descriptions = StringTable()
+
+
+class TransactionColumns:
+    """One user's transactions as date-sorted parallel arrays.
+
+    Indexing, slicing and iteration present transactions newest first, so
+    `columns[:limit]` is the `limit` most recent transactions.
+
+    The arrays and row count are published together as one state tuple and
+    every read takes the tuple once, so readers need no lock: an append
+    grows the arrays past the published count before publishing the new
+    count, and any other change builds new arrays. snapshot() freezes the
+    current state in O(1).
+    """
+
+    __slots__ = ("_state",)
+
+    def __init__(self):
+        # (ids, dates, amounts, balances, desc_ids, count, version): rows
+        # [0, count) of the arrays are published. The version changes on
+        # every change; copies and snapshots keep it (see FragmentCache)
+        self._state = ([], array('q'), array('q'), array('q'), array('i'), 0, next(_versions))
+
+    @classmethod
+    def from_dicts(cls, txns: Iterable[Any]) -> "TransactionColumns":
+        """Build columns from dicts or TransactionRecords in any order."""
+        columns = cls()
+        rows = [columns._encode(txn) for txn in txns]
+        if not rows:
+            return columns
+        # Stable sort keeps insertion order for identical timestamps
+        rows.sort(key=lambda row: row[1])
+        ids, dates, amounts, balances, desc_ids = zip(*rows)
+        columns._state = (
+            list(ids), array('q', dates), array('q', amounts), array('q', balances), array('i', desc_ids),
+            len(rows), next(_versions)
+        )
+        return columns
+
+    @staticmethod
+    def _exact(state: tuple) -> tuple:
+        """The five columns cut to the published row count (a snapshot's arrays may have grown since)."""
+        n = state[5]
+        if len(state[0]) == n:
+            return state[:5]
+        return tuple(column[:n] for column in state[:5])
+
+    @property
+    def version(self) -> int:
+        return self._state[6]
+
+    @property
+    def ids(self) -> List[str]:
+        return self._exact(self._state)[0]
+
+    @property
+    def dates(self) -> array:
+        return self._exact(self._state)[1]
+
+    @property
+    def amounts(self) -> array:
+        return self._exact(self._state)[2]
+
+    @property
+    def balances(self) -> array:
+        return self._exact(self._state)[3]
+
+    @property
+    def desc_ids(self) -> array:
+        return self._exact(self._state)[4]
+
+    def copy(self) -> "TransactionColumns":
+        """Independent copy (array copies are a memcpy, no records are built)."""
+        columns = TransactionColumns()
+        state = self._state
+        columns._state = (*(column[:] for column in self._exact(state)), state[5], state[6])
+        return columns
+
+    def snapshot(self) -> "TransactionColumns":
+        """Read-only view of the current version in O(1); later changes don't show in it.
+
+        It shares the arrays: appends only add rows past its count and other
+        changes replace the arrays. Never modify a snapshot.
+        """
+        columns = TransactionColumns.__new__(TransactionColumns)
+        columns._state = self._state
+        return columns
+
+    def restore(self, snapshot: "TransactionColumns"):
+        """Go back to an earlier snapshot() of these columns, undoing everything since."""
+        state = snapshot._state
+        # Cut to its count: appends since may have grown the shared arrays
+        self._state = (*self._exact(state), state[5], next(_versions))
+
+    def _encode(self, txn: Any) -> Tuple[str, int, int, int, int]:
+        balance = txn["balance"] if "balance" in txn else None
+        return (
+            txn["id"],
+            to_epoch_us(txn["date"]),
+            to_cents(txn["amount"]),
+            NO_BALANCE if balance is None else to_cents(balance),
+            descriptions.intern(txn.get("description") or "")
+        )
+
+    def _push(self, position: int, row: Tuple[str, int, int, int, int]):
+        state = self._state
+        n = state[5]
+        if position == n:
+            # Past the published count, so no reader sees these rows until the new state is set
+            for column, value in zip(state[:5], row):
+                column.append(value)
+            self._state = (*state[:5], n + 1, next(_versions))
+        else:
+            # Inserting would move rows under readers, so insert into copies
+            columns = []
+            for column, value in zip(self._exact(state), row):
+                column = column[:]
+                column.insert(position, value)
+                columns.append(column)
+            self._state = (*columns, n + 1, next(_versions))
+
+    def append(self, txn: Any) -> TransactionRecord:
+        """Add a transaction, keeping date order (O(1) for the usual newest-last case)."""
+        row = self._encode(txn)
+        state = self._state
+        position = state[5]
+        if position and state[1][position - 1] > row[1]:
+            position = bisect_right(state[1], row[1], 0, position)
+        self._push(position, row)
+        return self._record(self._state, position)
+
+    def extend(self, txns: Iterable[Any]):
+        """Add many transactions at once; unlike append() no records are built."""
+        rows = [self._encode(txn) for txn in txns]
+        if not rows:
+            return
+        rows.sort(key=lambda row: row[1])
+        state = self._state
+        n = state[5]
+        if n and state[1][n - 1] > rows[0][1]:
+            # Some are older than the newest stored one: merge into new arrays (existing rows first on ties)
+            stored = zip(*self._exact(state))
+            rows = list(heapq.merge(stored, rows, key=lambda row: row[1]))
+            columns = ([], array('q'), array('q'), array('q'), array('i'))
+            count = 0
+        else:
+            columns, count = state[:5], n
+        for column, values in zip(columns, zip(*rows)):
+            column.extend(values)
+        self._state = (*columns, count + len(rows), next(_versions))
+
+    def contains(self, date: Union[str, int], txn_id: str) -> bool:
+        """Whether the transaction with this date and id is stored (O(log n))."""
+        state = self._state
+        date = date if isinstance(date, int) else to_epoch_us(date)
+        i = self._position_of(state, date, txn_id)
+        return i < state[5] and state[0][i] == txn_id
+
+    def opening_balance(self) -> Optional[int]:
+        """Balance in cents before the first transaction, from its stored running balance."""
+        state = self._state
+        if not state[5] or state[3][0] == NO_BALANCE:
+            return None
+        return state[3][0] - state[2][0]
+
+    def running_balances(self, opening: int) -> array:
+        """Balances in cents after each transaction, recomputed from the amounts."""
+        return array('q', itertools.accumulate(self.amounts, initial=opening))[1:]
+
+    def set_running_balances(self, opening: int):
+        """Replace every stored running balance with one recomputed from `opening` cents."""
+        ids, dates, amounts, _, desc_ids = self._exact(self._state)
+        balances = array('q', itertools.accumulate(amounts, initial=opening))[1:]
+        self._state = (ids, dates, amounts, balances, desc_ids, len(ids), next(_versions))
+
+    @staticmethod
+    def _record(state: tuple, i: int) -> TransactionRecord:
+        balance = state[3][i]
+        return TransactionRecord(
+            id=state[0][i],
+            date=from_epoch_us(state[1][i]),
+            description=descriptions.lookup(state[4][i]),
+            amount=state[2][i] / 100,
+            balance=None if balance == NO_BALANCE else balance / 100
+        )
+
+    def __len__(self) -> int:
+        return self._state[5]
+
+    def __getitem__(self, key: Union[int, slice]) -> Union[TransactionRecord, List[TransactionRecord]]:
+        state = self._state
+        n = state[5]
+        if isinstance(key, slice):
+            return [self._record(state, n - 1 - i) for i in range(*key.indices(n))]
+        if key < 0:
+            key += n
+        if not 0 <= key < n:
+            raise IndexError("transaction index out of range")
+        return self._record(state, n - 1 - key)
+
+    def __iter__(self) -> Iterator[TransactionRecord]:
+        state = self._state
+        for i in range(state[5] - 1, -1, -1):
+            yield self._record(state, i)
+
+    def recent(self, limit: int) -> List[TransactionRecord]:
+        """The `limit` most recent transactions, newest first."""
+        return self[:max(0, limit)]
+
+    def date_range(self, since: Optional[Union[str, datetime]] = None,
+                   until: Optional[Union[str, datetime]] = None) -> Tuple[int, int]:
+        """Array bounds [lo, hi) of transactions with since <= date < until (O(log n))."""
+        return self._range(self._state, since, until)
+
+    @staticmethod
+    def _range(state: tuple, since: Optional[Union[str, datetime]],
+               until: Optional[Union[str, datetime]]) -> Tuple[int, int]:
+        dates, n = state[1], state[5]
+        lo = 0 if since is None else bisect_left(dates, to_epoch_us(since), 0, n)
+        hi = n if until is None else bisect_left(dates, to_epoch_us(until), 0, n)
+        return lo, max(lo, hi)
+
+    def query(
+        self,
+        since: Optional[Union[str, datetime]] = None,
+        until: Optional[Union[str, datetime]] = None,
+        min_amount: Optional[float] = None,
+        max_amount: Optional[float] = None,
+        limit: Optional[int] = None
+    ) -> List[TransactionRecord]:
+        """Transactions in [since, until) with amount in [min_amount, max_amount], newest first."""
+        state = self._state
+        lo, hi = self._range(state, since, until)
+        amounts = state[2][lo:hi]
+        low = None if min_amount is None else to_cents(min_amount)
+        high = None if max_amount is None else to_cents(max_amount)
+        results = []
+        for offset in range(hi - lo - 1, -1, -1):
+            cents = amounts[offset]
+            if (low is not None and cents < low) or (high is not None and cents > high):
+                continue
+            results.append(self._record(state, lo + offset))
+            if limit is not None and len(results) >= limit:
+                break
+        return results
+
+    @staticmethod
+    def _position_of(state: tuple, date: int, txn_id: str) -> int:
+        """Array index of a transaction, or where its date starts if it is gone."""
+        ids, dates, n = state[0], state[1], state[5]
+        lo, hi = bisect_left(dates, date, 0, n), bisect_right(dates, date, 0, n)
+        for i in range(hi - 1, lo - 1, -1):
+            if ids[i] == txn_id:
+                return i
+        return lo
+
+    def page(
+        self,
+        limit: int,
+        since: Optional[Union[str, datetime]] = None,
+        until: Optional[Union[str, datetime]] = None,
+        after: Optional[Tuple[int, str]] = None
+    ) -> Tuple[List[TransactionRecord], Optional[Tuple[int, str]]]:
+        """Up to `limit` transactions in [since, until), newest first, older than `after`.
+
+        Returns the page and the (date, id) key to pass as `after` for the
+        next one, or None after the last page. Keys rather than offsets
+        keep pages stable while new transactions arrive. O(log n + limit).
+        """
+        state = self._state
+        lo, hi = self._range(state, since, until)
+        if after is not None:
+            hi = max(lo, min(hi, self._position_of(state, *after)))
+        start = max(lo, hi - max(0, limit))
+        records = [self._record(state, i) for i in range(hi - 1, start - 1, -1)]
+        next_key = (state[1][start], state[0][start]) if records and start > lo else None
+        return records, next_key
+
+    def to_dicts(self) -> List[Dict[str, Any]]:
+        """Plain dicts, newest first (the on-disk JSON layout).
+
+        Built straight from the arrays, without intermediate records, since
+        this runs for every transaction on each snapshot.
+        """
+        lookup = descriptions.lookup
+        ids, dates, amounts, balances, desc_ids = self._exact(self._state)
+        return [
+            {
+                "id": txn_id,
+                "date": from_epoch_us(date),
+                "description": lookup(desc_id),
+                "amount": amount / 100,
+                "balance": None if balance == NO_BALANCE else balance / 100
+            }
+            for txn_id, date, desc_id, amount, balance in zip(
+                reversed(ids), reversed(dates), reversed(desc_ids), reversed(amounts), reversed(balances)
+            )
+        ]
@@ -0,0 +1,105 @@
+# mcp_server/wal.py
+"""
+Append-only write-ahead log for the mock database.
+Each mutation is stored as one compact JSON line, so a write costs
+O(record size) instead of re-serializing the whole database.
+"""
+
+from typing import Any, Dict, Iterable, Iterator, List
+import os
+import sys
+from pathlib import Path
+
+from .codec import get_codec
+
+
+class WriteAheadLog:
+    """Append-only journal of database mutations (one JSON record per line)."""
+
+    def __init__(self, log_file: Path, fsync: bool = False, codec=None):
+        self.log_file = Path(log_file)
+        self.fsync = fsync
+        # Always a JSON codec (DB_CODEC refuses binary ones): the log stays line-oriented text
+        self.codec = codec or get_codec()
+        self._fh = None
+
+    def _log(self, message: str):
+        """Log to stderr to avoid interfering with stdio MCP protocol."""
+        print(message, file=sys.stderr)
+
+    def _open(self):
+        if self._fh is None:
+            self._fh = open(self.log_file, 'ab')
+        return self._fh
+
+    def encode(self, op: str, payload: Dict[str, Any]) -> bytes:
+        """Encode one mutation as a compact log line."""
+        return self.codec.dumps({"op": op, **payload}) + b"\n"
+
+    def append(self, op: str, payload: Dict[str, Any]):
+        """Append one mutation record and flush it to the OS."""
+        self.write_lines([self.encode(op, payload)])
+
+    def write_lines(self, lines: List[bytes]):
+        """Append pre-encoded records with a single write (group commit)."""
+        if not lines:
+            return
+        fh = self._open()
+        fh.write(b"".join(lines))
+        fh.flush()
+        if self.fsync:
+            os.fsync(fh.fileno())
+
+    def size(self) -> int:
+        """Current size of the log file in bytes."""
+        if self._fh is not None:
+            return os.fstat(self._fh.fileno()).st_size
+        return self.log_file.stat().st_size if self.log_file.exists() else 0
+
+    def replay(self) -> Iterator[Dict[str, Any]]:
+        """Yield every record in the log, oldest first.
+
+        A torn final line (crash mid-append) is ignored.
+        """
+        if not self.log_file.exists():
+            return
+        with open(self.log_file, 'rb') as f:
+            for line_no, line in enumerate(f, 1):
+                line = line.strip()
+                if not line:
+                    continue
+                try:
+                    yield self.codec.loads(line)
+                except ValueError:
+                    self._log(f"[WAL] Ignoring corrupt record at line {line_no} of {self.log_file}")
+
+    def rewrite(self, lines: Iterable[bytes]):
+        """Replace the log with pre-encoded records (compaction).
+
+        They are written to a temp file that is then renamed over the log,
+        so a crash leaves either the old log or the new one, never neither.
+        """
+        self.close()
+        tmp = self.log_file.with_name(self.log_file.name + ".tmp")
+        try:
+            with open(tmp, 'wb') as f:
+                for line in lines:
+                    f.write(line)
+                f.flush()
+                if self.fsync:
+                    os.fsync(f.fileno())
+            os.replace(tmp, self.log_file)
+        finally:
+            tmp.unlink(missing_ok=True)
+
+    def truncate(self):
+        """Discard all records (after they are covered by a snapshot)."""
+        self.close()
+        with open(self.log_file, 'wb'):
+            pass
+
+    def close(self):
+        """Close the underlying file handle."""
+        if self._fh is not None:
+            self._fh.close()
+            self._fh = None
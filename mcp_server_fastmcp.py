@@ -10,33 +10,34 @@ from pathlib import Path
 sys.path.insert(0, str(Path(__file__).parent))
 
 from mcp.server.fastmcp import FastMCP
-from mcp_server.mock_data import db
+from mcp_server.storage import db
+from mcp_server.records import as_dict
+from mcp_server.tools import user_update_result
 
 # Initialize FastMCP server
 mcp = FastMCP("Customer Support MCP Server")
 
 
 @mcp.tool()
-def change_password(user_id: str, new_password: str) -> dict:
+async def change_password(user_id: str, new_password: str, expected_version: int = -1) -> dict:
     """
     Change a user's password. This change is permanent.
     
     Args:
         user_id: The unique identifier for the user
         new_password: The new password to set
+        expected_version: Only apply the change if the account is still at this version
+            (from get_account_details); -1 applies it unconditionally
     
     Returns:
-        dict: Success status and message
+        dict: Success status and message; on a version mismatch, conflict and current_version
     """
-    success = db.change_password(user_id, new_password)
-    return {
-        "success": success,
-        "message": "Password changed successfully and persisted" if success else "User not found"
-    }
+    expected = expected_version if expected_version >= 0 else None
+    return await user_update_result(db.achange_password(user_id, new_password, expected), "Password changed successfully and persisted", expected)
 
 
 @mcp.tool()
-def get_account_balance(user_id: str) -> dict:
+async def get_account_balance(user_id: str) -> dict:
     """
     Retrieve the current account balance for a user.
     
@@ -46,7 +47,7 @@ def get_account_balance(user_id: str) -> dict:
     Returns:
         dict: Success status, balance, and message
     """
-    balance = db.get_account_balance(user_id)
+    balance = await db.aget_account_balance(user_id)
     return {
         "success": balance is not None,
         "balance": balance,
@@ -55,75 +56,82 @@ def get_account_balance(user_id: str) -> dict:
 
 
 @mcp.tool()
-def update_address(user_id: str, new_address: str) -> dict:
+async def update_address(user_id: str, new_address: str, expected_version: int = -1) -> dict:
     """
     Update a user's address in the system. This change is permanent.
     
     Args:
         user_id: The unique identifier for the user
         new_address: The new address to set
+        expected_version: Only apply the change if the account is still at this version
+            (from get_account_details); -1 applies it unconditionally
     
     Returns:
-        dict: Success status and message
+        dict: Success status and message; on a version mismatch, conflict and current_version
     """
-    success = db.update_address(user_id, new_address)
-    return {
-        "success": success,
-        "message": "Address updated successfully and persisted" if success else "User not found"
-    }
+    expected = expected_version if expected_version >= 0 else None
+    return await user_update_result(db.aupdate_address(user_id, new_address, expected), "Address updated successfully and persisted", expected)
 
 
 @mcp.tool()
-def get_recent_transactions(user_id: str, limit: int = 10) -> dict:
+async def get_recent_transactions(user_id: str, limit: int = 10, since: str = "", until: str = "",
+                                  cursor: str = "") -> dict:
     """
-    Retrieve recent transactions for a user's account.
+    Retrieve a user's transactions, newest first, optionally within a date range.
+    Results are paged: pass next_cursor back as cursor to get older transactions.
     
     Args:
         user_id: The unique identifier for the user
         limit: Maximum number of transactions to return (default: 10)
+        since: Only transactions on or after this ISO date, e.g. 2024-01-31
+        until: Only transactions before this ISO date
+        cursor: next_cursor from the previous page
     
     Returns:
-        dict: Success status, transactions list, and count
+        dict: Success status, transactions list, count, and next_cursor (null on the last page)
     """
-    transactions = db.get_recent_transactions(user_id, limit)
+    page = await db.aget_transactions_page(
+        user_id, limit, since or None, until or None, cursor or None
+    )
     return {
         "success": True,
-        "transactions": transactions,
-        "count": len(transactions)
+        "transactions": as_dict(page["transactions"]),
+        "count": len(page["transactions"]),
+        "next_cursor": page["next_cursor"]
     }
 
 
 @mcp.tool()
-def deactivate_card(user_id: str) -> dict:
+async def deactivate_card(user_id: str, expected_version: int = -1) -> dict:
     """
     Deactivate a user's card for security purposes. This change is permanent.
     
     Args:
         user_id: The unique identifier for the user
+        expected_version: Only apply the change if the account is still at this version
+            (from get_account_details); -1 applies it unconditionally
     
     Returns:
-        dict: Success status and message
+        dict: Success status and message; on a version mismatch, conflict and current_version
     """
-    success = db.deactivate_card(user_id)
-    return {
-        "success": success,
-        "message": "Card deactivated successfully and persisted" if success else "User not found"
-    }
+    expected = expected_version if expected_version >= 0 else None
+    return await user_update_result(db.adeactivate_card(user_id, expected), "Card deactivated successfully and persisted", expected)
 
 
 @mcp.tool()
-def report_issue(user_id: str, issue_description: str) -> dict:
+async def report_issue(user_id: str, issue_description: str, priority: str = "") -> dict:
     """
     Report a customer support issue and create a ticket. The ticket is permanently stored.
     
     Args:
         user_id: The unique identifier for the user
         issue_description: Description of the issue
+        priority: low, medium or high (assigned automatically if omitted)
     
     Returns:
         dict: Success status, issue ID, and message
     """
-    issue_id = db.report_issue(user_id, issue_description)
+    issue_id = await db.areport_issue(user_id, issue_description, priority or None)
     return {
         "success": True,
         "issue_id": issue_id,
@@ -132,9 +140,10 @@ def report_issue(user_id: str, issue_description: str) -> dict:
 
 
 @mcp.tool()
-def get_account_details(user_id: str) -> dict:
+async def get_account_details(user_id: str) -> dict:
     """
-    Retrieve comprehensive account details for a user, including any recent updates.
+    Retrieve comprehensive account details for a user, including any recent updates and the
+    account version to pass as expected_version.
     
     Args:
         user_id: The unique identifier for the user
@@ -142,7 +151,7 @@ def get_account_details(user_id: str) -> dict:
     Returns:
         dict: Success status, account details, and message
     """
-    details = db.get_account_details(user_id)
+    details = await db.aget_account_details(user_id)
     return {
         "success": details is not None,
         "details": details,
@@ -151,7 +160,136 @@ def get_account_details(user_id: str) -> dict:
 
 
 @mcp.tool()
-def switch_user(new_user_id: str) -> dict:
+async def find_user(email: str = "", phone: str = "") -> dict:
+    """
+    Find a user account by email address or phone number.
+    
+    Args:
+        email: Email address to look up (case-insensitive)
+        phone: Phone number to look up (punctuation ignored)
+    
+    Returns:
+        dict: Success status, matching user ID and name, and message
+    """
+    user = None
+    if email:
+        user = await db.afind_user_by_email(email)
+    if user is None and phone:
+        user = await db.afind_user_by_phone(phone)
+    return {
+        "success": user is not None,
+        "user_id": user["user_id"] if user else None,
+        "name": user["name"] if user else None,
+        "message": f"Found user {user['user_id']}" if user else "No user matches that email or phone"
+    }
+
+
+@mcp.tool()
+async def get_issue(issue_id: str) -> dict:
+    """
+    Look up a support ticket by its ID.
+    
+    Args:
+        issue_id: The ticket ID (e.g., issue_001)
+    
+    Returns:
+        dict: Success status, issue, and message
+    """
+    issue = await db.aget_issue(issue_id)
+    return {
+        "success": issue is not None,
+        "issue": as_dict(issue),
+        "message": "Issue retrieved" if issue else f"Issue {issue_id} not found"
+    }
+
+
+@mcp.tool()
+async def list_user_issues(user_id: str, status: str = "", limit: int = 20, cursor: str = "") -> dict:
+    """
+    List a user's support tickets, oldest first, optionally with one status.
+    Results are paged: pass next_cursor back as cursor to get more.
+    
+    Args:
+        user_id: The unique identifier for the user
+        status: Only tickets with this status: open, in_progress or closed
+        limit: Maximum number of tickets to return (1-100, default: 20)
+        cursor: next_cursor from the previous page
+    
+    Returns:
+        dict: Success status, issues list, count, the user's open ticket count, and next_cursor
+    """
+    page = await db.alist_issues(user_id, status or None, max(1, min(limit, 100)), cursor or None)
+    return {
+        "success": True,
+        "issues": as_dict(page["issues"]),
+        "count": len(page["issues"]),
+        "open_count": await db.aopen_issue_count(user_id),
+        "next_cursor": page["next_cursor"]
+    }
+
+
+@mcp.tool()
+async def update_issue(issue_id: str, status: str = "", priority: str = "") -> dict:
+    """
+    Change a support ticket's status or priority. The change is permanently stored.
+    
+    Args:
+        issue_id: The ticket ID (e.g., issue_001)
+        status: New status: open, in_progress or closed
+        priority: New priority: low, medium or high
+    
+    Returns:
+        dict: Success status, updated issue, and message
+    """
+    issue = await db.aupdate_issue(issue_id, status or None, priority or None)
+    return {
+        "success": issue is not None,
+        "issue": as_dict(issue),
+        "message": f"Issue {issue_id} is now {issue['status']}" if issue else f"Issue {issue_id} not found"
+    }
+
+
+@mcp.tool()
+async def close_issue(issue_id: str) -> dict:
+    """
+    Close a support ticket. The change is permanently stored.
+    
+    Args:
+        issue_id: The ticket ID (e.g., issue_001)
+    
+    Returns:
+        dict: Success status, closed issue, and message
+    """
+    issue = await db.aclose_issue(issue_id)
+    return {
+        "success": issue is not None,
+        "issue": as_dict(issue),
+        "message": f"Issue {issue_id} is now closed" if issue else f"Issue {issue_id} not found"
+    }
+
+
+@mcp.tool()
+async def get_next_issue(priority: str = "") -> dict:
+    """
+    Get the open support ticket to work on next: highest priority first, then oldest.
+    
+    Args:
+        priority: Only consider tickets of this priority (low, medium or high)
+    
+    Returns:
+        dict: Success status, the next issue (null if none), total open tickets, and message
+    """
+    issue = await db.anext_open_issue(priority or None)
+    return {
+        "success": True,
+        "issue": as_dict(issue),
+        "open_count": await db.aopen_issue_count(),
+        "message": f"Next ticket: {issue['issue_id']}" if issue else "No open tickets"
+    }
+
+
+@mcp.tool()
+async def switch_user(new_user_id: str) -> dict:
     """
     Switch to a different user account.
     
@@ -161,7 +299,7 @@ def switch_user(new_user_id: str) -> dict:
     Returns:
         dict: Success status, user info, and message
     """
-    result = db.switch_user(new_user_id)
+    result = await db.aswitch_user(new_user_id)
     return result
 
 
@@ -170,7 +308,7 @@ if __name__ == "__main__":
     print("=" * 60)
     print("Starting FastMCP Server...")
     print("=" * 60)
-    print("\nServer is running with 8 tools")
+    print("\nServer is running with 14 tools")
     print("All changes are PERSISTENT (saved to database.json)")
     print("Press CTRL+C to stop\n")
     mcp.run()
\ No newline at end of file
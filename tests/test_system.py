@@ -4,14 +4,32 @@ Test script for the customer support system.
 Tests both MCP server tools and agent integration.
 """
 
+import os
 import sys
 import json
+import sqlite3
+import tempfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
 
 # Add project root to path
 sys.path.insert(0, str(Path(__file__).parent.parent))
 
-from mcp_server.mock_data import db
+from mcp_server.mock_data import MockDatabase
+from mcp_server.storage import db, available_backends, create_database, StorageBackend
+from mcp_server.sqlite_db import SQLiteDatabase
+from mcp_server.flusher import GroupCommitFlusher
+from mcp_server.read_cache import ReadCache
+from mcp_server.issue_store import IssueStore
+from mcp_server.conformance import run_conformance
+from mcp_server.lmdb_store import lmdb
+from mcp_server.records import UserRecord, IssueRecord, VersionConflict, as_dict
+from mcp_server.txn_store import TransactionColumns
+from mcp_server.codec import available_codecs, get_codec
+from mcp_server.bulk_import import import_file
+from mcp_server.datagen import generate, get_profile, populate
 from mcp_server.tools import execute_tool
 import asyncio
 
@@ -69,6 +87,1334 @@ def test_mock_database():
     print("\n✅ All database tests passed!\n")
 
 
+def test_records():
+    """Test the compact record types."""
+    print("\n" + "="*60)
+    print("Testing Record Types")
+    print("="*60)
+    
+    raw = db.get_user("user_002").to_dict()
+    user = UserRecord.from_dict(raw)
+    assert not hasattr(user, "__dict__"), "Records should be slotted"
+    assert user["name"] == user.name == raw["name"], "Dict-style and attribute access should agree"
+    assert user.to_dict() == raw, "Round trip should be lossless"
+    print("✓ Records round-trip to dicts")
+    
+    a = IssueRecord.from_dict({"issue_id": "a", "status": "".join(["op", "en"])})
+    b = IssueRecord.from_dict({"issue_id": "b", "status": "".join(["op", "en"])})
+    assert a.status is b.status, "Status values should be interned"
+    print("✓ Status values are interned")
+    
+    transactions = as_dict(db.get_recent_transactions("user_002"))
+    assert all(isinstance(t, dict) for t in transactions), "Tool boundary should see dicts"
+    json.dumps(transactions)
+    print("✓ Records convert to JSON-ready dicts")
+    
+    print("\n✅ All record tests passed!\n")
+
+
+def test_transaction_columns():
+    """Test the columnar transaction store and its date index."""
+    print("\n" + "="*60)
+    print("Testing Columnar Transactions")
+    print("="*60)
+    
+    columns = TransactionColumns.from_dicts([
+        {"id": f"txn_{day}", "date": f"2024-01-{day:02d}T12:00:00",
+         "description": "Coffee" if day % 2 else "Rent", "amount": -day * 1.25, "balance": 100.0}
+        for day in (5, 1, 3, 2, 4)
+    ])
+    assert [t.id for t in columns.recent(2)] == ["txn_5", "txn_4"], "Newest first"
+    assert columns[0].to_dict() == {"id": "txn_5", "date": "2024-01-05T12:00:00",
+                                    "description": "Coffee", "amount": -6.25, "balance": 100.0}
+    print("✓ Recent transactions come back newest first, losslessly")
+    
+    in_range = columns.query(since="2024-01-02", until="2024-01-04")
+    assert [t.id for t in in_range] == ["txn_3", "txn_2"], "Range should be [since, until)"
+    large = columns.query(max_amount=-5.0)
+    assert [t.id for t in large] == ["txn_5", "txn_4"], "Amount filter should apply"
+    print("✓ Date-range and amount queries work")
+    
+    columns.append({"id": "txn_0", "date": "2023-12-31T00:00:00", "description": "Rent",
+                    "amount": -1.0, "balance": 0.0})
+    assert columns[-1].id == "txn_0", "Out-of-order append should keep date order"
+    version = columns.version
+    columns.extend([
+        {"id": "txn_9", "date": "2024-01-09T00:00:00", "description": "Rent", "amount": -9.0},
+        {"id": "txn_6", "date": "2024-01-03T12:00:00", "description": "Rent", "amount": -6.0}
+    ])
+    assert [t.id for t in columns.recent(3)] == ["txn_9", "txn_5", "txn_4"], "Extend should merge by date"
+    assert [t.id for t in columns.query(since="2024-01-03", until="2024-01-04")] == ["txn_6", "txn_3"]
+    assert columns.version != version, "Extending should change the version"
+    print("✓ Appends and bulk extends keep date order")
+    
+    print("\n✅ All columnar transaction tests passed!\n")
+
+
+def test_codecs():
+    """Test every installed codec round-trips records and snapshots."""
+    print("\n" + "="*60)
+    print("Testing Codecs")
+    print("="*60)
+    
+    user = UserRecord(user_id="user_009", name="Zoë", email="z@example.com", account_balance=1.5)
+    document = {"users": {"user_009": user}, "transactions": {"user_009": TransactionColumns.from_dicts([
+        {"id": "txn_1", "date": "2024-01-02T03:04:05", "description": "Café", "amount": -2.5, "balance": 10.0}
+    ])}}
+    for name in available_codecs():
+        codec = get_codec(name)
+        compact = codec.loads(codec.dumps(document))
+        assert compact == codec.loads(codec.dumps(document, pretty=True)), f"{name}: pretty should decode the same"
+        assert compact["users"]["user_009"] == user.to_dict(), f"{name}: user should round-trip"
+        assert compact["transactions"]["user_009"][0]["description"] == "Café"
+        print(f"✓ {name} round-trips records")
+    
+    if "msgpack" in available_codecs():
+        with tempfile.TemporaryDirectory() as tmp:
+            data_file = Path(tmp) / "database.json"
+            json_db = MockDatabase(data_file=data_file)
+            json_db.update_address("user_001", "1 Codec Court")
+            binary_db = MockDatabase(data_file=data_file, persistence="wal")
+            binary_db.store.snapshot_codec = get_codec("msgpack")
+            binary_db.store.snapshot_file = data_file.with_suffix(".msgpack")
+            binary_db.save_data()
+            binary_db.close()
+            assert data_file.with_suffix(".msgpack").exists(), "Binary snapshot should be written"
+            reloaded = MockDatabase(data_file=data_file, persistence="wal")
+            assert reloaded.get_user("user_001")["address"] == "1 Codec Court", "Newest snapshot should win"
+            reloaded.close()
+        print("✓ msgpack snapshot written and preferred as the newest")
+    
+    # WAL, lazy and shard files are line-oriented, so DB_CODEC takes only JSON codecs
+    previous = os.environ.get("DB_CODEC")
+    try:
+        for name in available_codecs():
+            os.environ["DB_CODEC"] = name
+            if get_codec(name).binary:
+                try:
+                    get_codec()
+                    raise AssertionError(f"DB_CODEC={name} should be refused")
+                except ValueError:
+                    pass
+                print(f"✓ DB_CODEC={name} refused")
+                continue
+            for mode in ("wal", "lazy", "sharded"):
+                with tempfile.TemporaryDirectory() as tmp:
+                    data_file = Path(tmp) / "database.json"
+                    codec_db = MockDatabase(data_file=data_file, persistence=mode)
+                    codec_db.update_address("user_001", f"1 {name} Way")
+                    codec_db.close()
+                    reopened = MockDatabase(data_file=data_file, persistence=mode)
+                    assert reopened.get_user("user_001")["address"] == f"1 {name} Way", f"{mode}: {name} write should survive reopening"
+                    reopened.close()
+            print(f"✓ wal, lazy and sharded reopen with DB_CODEC={name}")
+    finally:
+        if previous is None:
+            os.environ.pop("DB_CODEC", None)
+        else:
+            os.environ["DB_CODEC"] = previous
+    
+    print("\n✅ All codec tests passed!\n")
+
+
+def test_wal_persistence():
+    """Test that WAL mode journals mutations and replays them on load."""
+    print("\n" + "="*60)
+    print("Testing WAL Persistence")
+    print("="*60)
+    
+    with tempfile.TemporaryDirectory() as tmp:
+        data_file = Path(tmp) / "database.json"
+        wal_db = MockDatabase(data_file=data_file, persistence="wal")
+        snapshot_before = data_file.read_text()
+        
+        wal_db.update_address("user_001", "1 WAL Street")
+        issue_id = wal_db.report_issue("user_002", "WAL issue")
+        assert data_file.read_text() == snapshot_before, "Snapshot should not be rewritten"
+        assert len(wal_db.store.wal.log_file.read_text().splitlines()) == 3, "Header plus one record per mutation"
+        print("✓ Mutations appended to the log")
+        
+        wal_db.store.wal.close()
+        reloaded = MockDatabase(data_file=data_file, persistence="wal")
+        assert reloaded.get_user("user_001")["address"] == "1 WAL Street", "Address should be replayed"
+        assert any(i["issue_id"] == issue_id for i in reloaded.issues), "Issue should be replayed"
+        print("✓ Log replayed on load")
+        
+        reloaded.save_data()
+        assert len(reloaded.store.wal.log_file.read_text().splitlines()) == 1, "Snapshot should truncate the log"
+        reloaded.store.wal.close()
+        print("✓ Snapshot truncates the log")
+    
+    print("\n✅ All WAL tests passed!\n")
+
+
+def test_wal_compaction():
+    """Test that compaction folds the log into a snapshot without losing writes."""
+    print("\n" + "="*60)
+    print("Testing WAL Compaction")
+    print("="*60)
+    
+    with tempfile.TemporaryDirectory() as tmp:
+        data_file = Path(tmp) / "database.json"
+        wal_db = MockDatabase(data_file=data_file, persistence="wal")
+        for n in range(20):
+            wal_db.update_address("user_001", f"{n} Compaction Way")
+        assert wal_db.compact(), "Compaction should run"
+        assert len(wal_db.store.wal.log_file.read_text().splitlines()) == 1, "Log prefix should be dropped"
+        assert json.loads(data_file.read_text())["users"]["user_001"]["address"] == "19 Compaction Way"
+        print("✓ Log folded into the snapshot")
+        
+        # Writes made while the snapshot is being written land in the new segment
+        write = wal_db.store.begin_snapshot(wal_db)
+        wal_db.report_issue("user_002", "Filed during compaction")
+        write()
+        wal_db.store.end_snapshot(True)
+        wal_db.close()
+        reloaded = MockDatabase(data_file=data_file, persistence="wal")
+        assert len(reloaded.issues) == 1, "Write during compaction should survive"
+        reloaded.close()
+        print("✓ Writes during compaction are kept")
+        
+        # A crash before the new snapshot lands leaves the old one plus both segments
+        reloaded.store.begin_snapshot(reloaded)
+        reloaded.store.end_snapshot(False)
+        reloaded.store.wal.close()
+        recovered = MockDatabase(data_file=data_file, persistence="wal")
+        assert recovered.get_user("user_001")["address"] == "19 Compaction Way"
+        assert len(recovered.issues) == 1, "Issues should not be replayed twice"
+        assert not recovered.store.compacting_file.exists(), "Interrupted compaction should be finished"
+        print("✓ Interrupted compaction recovered on load")
+        
+        recovered.store.compact_bytes = 512
+        generation = recovered.store.generation
+        for n in range(50):
+            recovered.change_password("user_002", f"pw{n}")
+        recovered.close()
+        assert recovered.store.generation > generation, "Log growth should trigger compaction"
+        final = MockDatabase(data_file=data_file, persistence="wal")
+        assert final.get_user("user_002")["password"] == "hashed_pw49"
+        final.close()
+        print("✓ Background compaction keeps the log bounded")
+    
+    print("\n✅ All compaction tests passed!\n")
+
+
+def test_background_save():
+    """Test that bgsave writes a snapshot in the background and reports metrics."""
+    print("\n" + "="*60)
+    print("Testing Background Save")
+    print("="*60)
+    
+    with tempfile.TemporaryDirectory() as tmp:
+        data_file = Path(tmp) / "database.json"
+        bg_db = MockDatabase(data_file=data_file, persistence="wal")
+        bg_db.update_address("user_001", "1 Fork Lane")
+        result = bg_db.bgsave()
+        assert result["success"], result["message"]
+        bg_db.update_address("user_002", "2 Parent Street")
+        bg_db.close()
+        stats = bg_db.save_stats()
+        assert stats["last_save_kind"] == "bgsave" and stats["last_save_status"] == "ok", stats
+        assert stats["last_save_duration_ms"] is not None and not stats["snapshot_in_progress"]
+        print(f"✓ Background save finished in {stats['last_save_duration_ms']} ms")
+        
+        reloaded = MockDatabase(data_file=data_file, persistence="wal")
+        assert json.loads(data_file.read_text())["users"]["user_001"]["address"] == "1 Fork Lane"
+        assert reloaded.get_user("user_002")["address"] == "2 Parent Street", "Later writes stay in the log"
+        reloaded.close()
+        print("✓ Snapshot plus log tail restore every write")
+        
+        deferred_file = Path(tmp) / "deferred.json"
+        snap_db = MockDatabase(data_file=deferred_file, persistence="snapshot")
+        write_snapshot = snap_db.store._write_snapshot
+        snap_db.store._write_snapshot = lambda data: time.sleep(0.5) or write_snapshot(data)
+        assert snap_db.bgsave()["success"]
+        started = time.perf_counter()
+        snap_db.update_address("user_001", "3 Deferred Drive")
+        assert time.perf_counter() - started < 0.25, "Snapshot writes should not wait for the background save"
+        assert snap_db.store.save_deferred, "The write's save should be left for after the background save"
+        snap_db.flush()
+        assert not snap_db.store.save_deferred, "flush() should wait for the deferred save"
+        snap_db.close()
+        reloaded = MockDatabase(data_file=deferred_file, persistence="snapshot")
+        assert reloaded.get_user("user_001")["address"] == "3 Deferred Drive"
+        reloaded.close()
+        print("✓ Snapshot mode saves writes made during a background save afterwards")
+        
+        # A write that misses the snapshot lock just before the background save releases
+        # it, and only records that late, must still be saved
+        acquire_failed = threading.Event()
+        
+        class SlowToFail:
+            def __init__(self, lock):
+                self.lock = lock
+            
+            def acquire(self, blocking=True):
+                if self.lock.acquire(blocking):
+                    return True
+                acquire_failed.set()
+                time.sleep(0.2)
+                return False
+            
+            def release(self):
+                self.lock.release()
+            
+            def locked(self):
+                return self.lock.locked()
+        
+        race_file = Path(tmp) / "race.json"
+        race_db = MockDatabase(data_file=race_file, persistence="snapshot")
+        race_db.store.begin_snapshot(race_db)()
+        race_db.store._snapshot_lock = SlowToFail(race_db.store._snapshot_lock)
+        writer = threading.Thread(target=race_db.update_address, args=("user_001", "6 Race Road"))
+        writer.start()
+        assert acquire_failed.wait(5)
+        race_db._finish_snapshot("bgsave", time.time())
+        writer.join()
+        race_db.flush()
+        assert json.loads(race_file.read_text())["users"]["user_001"]["address"] == "6 Race Road"
+        race_db.close()
+        print("✓ A save deferred as the background save ends is not lost")
+
+        failing_db = MockDatabase(data_file=Path(tmp) / "snapshot.json")
+        failing_db.store.snapshot_file = Path(tmp) / "missing" / "snapshot.json"
+        assert failing_db.bgsave()["success"], "Failure is reported after the fact"
+        failing_db.close()
+        assert failing_db.save_stats()["last_save_status"] == "failed", "Failure should be recorded"
+        assert failing_db.save_stats()["failed_saves"] == 1
+        print("✓ Failed background save is reported")
+    
+    print("\n✅ All background save tests passed!\n")
+
+
+def test_incremental_snapshots():
+    """Test that a snapshot write re-encodes only the records changed since the last one."""
+    print("\n" + "="*60)
+    print("Testing Incremental Snapshots")
+    print("="*60)
+    
+    with tempfile.TemporaryDirectory() as tmp:
+        data_file = Path(tmp) / "database.json"
+        snap_db = MockDatabase(data_file=data_file, persistence="snapshot")
+        fragments = snap_db.store.fragments
+        entries = len(snap_db.users) + len(snap_db.transactions) + len(snap_db.issues)
+        
+        snap_db.deactivate_card("user_001")
+        assert fragments.encoded == 1, "Only the changed user should be re-encoded"
+        assert fragments.reused == entries - 1, "Every other record should be reused"
+        print("✓ One mutation re-encodes one record")
+        
+        snap_db.report_issue("user_002", "Incremental issue")
+        assert fragments.encoded == 1, "Only the new issue should be encoded"
+        reloaded = MockDatabase(data_file=data_file, persistence="snapshot")
+        assert reloaded.get_user("user_001")["card_status"] == "deactivated", "Change should persist"
+        assert reloaded.issues[-1]["description"] == "Incremental issue", "Issue should persist"
+        assert len(reloaded.transactions["user_001"]) == len(snap_db.transactions["user_001"]), "Transactions should persist"
+        print("✓ Assembled snapshot reloads intact")
+        
+        sharded_db = MockDatabase(data_file=data_file, persistence="sharded")
+        sharded_db.update_address("user_001", "4 Fragment Way")
+        shard_fragments = sharded_db.store.store._fragments[sharded_db.store.store.shard_index("user_001")]
+        assert shard_fragments.encoded == 1, "Only the changed user of the shard should be re-encoded"
+        sharded_db.close()
+        print("✓ Shard rewrites re-encode only changed users")
+    
+    print("\n✅ All incremental snapshot tests passed!\n")
+
+
+def test_sharded_persistence():
+    """Test that sharded mode rewrites only the touched shard and loads lazily."""
+    print("\n" + "="*60)
+    print("Testing Sharded Persistence")
+    print("="*60)
+    
+    with tempfile.TemporaryDirectory() as tmp:
+        data_file = Path(tmp) / "database.json"
+        sharded_db = MockDatabase(data_file=data_file, persistence="sharded")
+        store = sharded_db.store.store
+        shard_files = {p.name: p.stat().st_mtime_ns for p in store.directory.glob("shard_*.json")}
+        
+        sharded_db.update_address("user_001", "3 Shard Lane")
+        touched = store.directory / f"shard_{store.shard_index('user_001'):04d}.json"
+        changed = [p.name for p in store.directory.glob("shard_*.json") if p.stat().st_mtime_ns != shard_files[p.name]]
+        assert changed == [touched.name], "Only the user's shard should be rewritten"
+        print("✓ Only the touched shard was rewritten")
+        
+        issue_id = sharded_db.report_issue("user_001", "Sharded issue")
+        sharded_db.close()
+        reloaded = MockDatabase(data_file=data_file, persistence="sharded")
+        assert reloaded.store.store.loaded_count == 0, "No shard should load at startup"
+        assert reloaded.get_user("user_001")["address"] == "3 Shard Lane", "Address should persist"
+        assert reloaded.store.store.loaded_count == 1, "Only the accessed shard should load"
+        assert [i["issue_id"] for i in reloaded.issues] == [issue_id], "Issue should persist"
+        print("✓ Shards load on first access")
+        
+        # A save that dies while compacting the issue log leaves the previous log intact
+        def fail_encode(op, payload):
+            raise OSError("disk full")
+        issue_log = reloaded.store.issue_log
+        issue_log.encode = fail_encode
+        try:
+            reloaded.save_data()
+            assert False, "The save should fail"
+        except OSError:
+            pass
+        del issue_log.encode
+        reloaded.close()
+        survivor = MockDatabase(data_file=data_file, persistence="sharded")
+        assert [i["issue_id"] for i in survivor.issues] == [issue_id], "Issues should survive a failed compaction"
+        assert not list(store.directory.glob("*.tmp")), "The partial log should be removed"
+        survivor.close()
+        print("✓ Issue log compaction is crash safe")
+    
+    print("\n✅ All sharding tests passed!\n")
+
+
+def test_lazy_persistence():
+    """Test that lazy mode loads records on demand within the LRU bound."""
+    print("\n" + "="*60)
+    print("Testing Lazy Persistence")
+    print("="*60)
+    
+    with tempfile.TemporaryDirectory() as tmp:
+        data_file = Path(tmp) / "database.json"
+        lazy_db = MockDatabase(data_file=data_file, persistence="lazy")
+        lazy_db.update_address("user_002", "4 Lazy Loop")
+        lazy_db.close()
+        
+        reloaded = MockDatabase(data_file=data_file, persistence="lazy")
+        store = reloaded.store.store
+        store.cache_size = 1
+        assert store.resident_count == 0, "No record should be parsed at startup"
+        assert "user_001" in reloaded.users, "Membership should come from the index"
+        assert store.resident_count == 0, "Membership check should not load the record"
+        assert reloaded.get_user("user_002")["address"] == "4 Lazy Loop", "Address should persist"
+        assert len(reloaded.get_recent_transactions("user_001")) == 3, "Transactions should load"
+        assert store.resident_count == 1, "LRU should bound resident records"
+        reloaded.close()
+        print("✓ Records load on first access within the LRU bound")
+        
+        streaming_db = MockDatabase(data_file=Path(tmp) / "import" / "database.json", persistence="lazy")
+        streaming_db.store.store.cache_size = 100
+        for start in range(0, 2000, 250):
+            streaming_db.import_batch("users", [
+                {"user_id": f"import_{n:05d}", "name": f"Import {n}", "email": f"import{n}@example.com"}
+                for n in range(start, start + 250)
+            ])
+            assert streaming_db.store.store.resident_count <= 100, "Each import batch should be written and evicted"
+        streaming_db.import_finished()
+        assert streaming_db.get_user("import_01999")["name"] == "Import 1999" and len(streaming_db.users) == 2002
+        streaming_db.close()
+        print("✓ Imports stay within the LRU bound")
+        
+        # Transactions imported for an id with no user row make a record without a users section
+        orphan_db = MockDatabase(data_file=data_file, persistence="lazy")
+        users_before = len(orphan_db.users)
+        orphan_db.import_batch("transactions", [
+            {"user_id": "user_999", "id": "txn_orphan", "date": "2024-06-01T12:00:00",
+             "description": "Orphan", "amount": -1.0, "balance": None}
+        ])
+        orphan_db.import_finished()
+        for db in (orphan_db, MockDatabase(data_file=data_file, persistence="lazy")):
+            assert "user_999" not in db.users and "user_999" not in list(db.users)
+            assert len(db.users) == users_before, "Transaction-only records are not users"
+            assert db.find_user_by_email("john.doe@example.com") is not None
+            assert not db.switch_user("user_999")["success"]
+            assert db.reconcile_balances()["users"] == users_before
+            db.close()
+        print("✓ Records with only transactions are not listed as users")
+        
+        # A load on another thread must not evict a record between its change and the dirty mark
+        race_db = MockDatabase(data_file=data_file, persistence="lazy")
+        store = race_db.store.store
+        store.cache_size = 1
+        ensure = store.ensure
+        loaders = []
+        
+        def ensure_then_load(user_id):
+            record = ensure(user_id)
+            loader = threading.Thread(target=store.get, args=("user_002",))
+            loader.start()
+            loader.join(0.2)
+            loaders.append(loader)
+            return record
+        
+        store.ensure = ensure_then_load
+        race_db.update_address("user_001", "5 Eviction Row")
+        del store.ensure
+        for loader in loaders:
+            loader.join()
+        race_db.close()
+        reloaded = MockDatabase(data_file=data_file, persistence="lazy")
+        assert reloaded.get_user("user_001")["address"] == "5 Eviction Row", "The write should not be lost"
+        reloaded.close()
+        print("✓ Writes survive concurrent evictions")
+
+    print("\n✅ All lazy loading tests passed!\n")
+
+
+def test_read_cache():
+    """Test that cached reads are served until the user changes, never after."""
+    print("\n" + "="*60)
+    print("Testing Read Cache")
+    print("="*60)
+    
+    with tempfile.TemporaryDirectory() as tmp:
+        cache_db = MockDatabase(data_file=Path(tmp) / "database.json", persistence="lazy")
+        assert cache_db.read_cache is not None, "Lazy mode reads from disk, so it should be cached"
+        
+        first = cache_db.get_account_details("user_001")
+        first["address"] = "edited by the caller"
+        assert cache_db.get_account_details("user_001")["address"] != "edited by the caller"
+        assert cache_db.cache_stats()["hits"] == 1, "Second read should be a hit"
+        print("✓ Repeated reads are served from the cache as copies")
+        
+        cache_db.get_account_balance("user_001")
+        cache_db.get_recent_transactions("user_001", 2)
+        cache_db.update_address("user_001", "9 Fresh Street")
+        assert cache_db.get_account_details("user_001")["address"] == "9 Fresh Street"
+        cache_db.change_password("user_001", "s3cret")
+        assert cache_db.get_user("user_001")["password"] == "hashed_s3cret"
+        txn = as_dict(cache_db.add_transaction("user_001", "Refund", 12.5))
+        assert cache_db.get_account_balance("user_001") == txn["balance"]
+        assert as_dict(cache_db.get_recent_transactions("user_001", 2))[0] == txn
+        cache_db.deactivate_card("user_001")
+        assert cache_db.get_account_details("user_001")["card_status"] == "deactivated"
+        assert cache_db.cache_stats()["stale"] >= 4, "Each write should invalidate the user's entries"
+        print("✓ Every mutation invalidates the user's cached reads")
+        
+        # A write that lands while a miss is loading must not leave its result cached
+        cache = cache_db.read_cache
+        cache.get("user_002", "racy", lambda: cache.invalidate("user_002") or "old value")
+        assert cache.get("user_002", "racy", lambda: "new value") == "new value"
+        print("✓ Results loaded across a concurrent write are not cached")
+        cache_db.close()
+    
+    small = ReadCache(max_entries=2, ttl=0.05)
+    for user_id in ("user_001", "user_002", "user_003"):
+        small.get(user_id, "balance", lambda: 1.0)
+    assert small.stats()["evictions"] == 1 and small.stats()["entries"] == 2
+    time.sleep(0.06)
+    small.get("user_003", "balance", lambda: 2.0)
+    assert small.stats()["expired"] == 1, "Entries should expire after the TTL"
+    print("✓ LRU bound and TTL enforced")
+    
+    print("\n✅ All read cache tests passed!\n")
+
+
+def test_group_commit_flusher():
+    """Test that the flusher coalesces mutations into batched writes."""
+    print("\n" + "="*60)
+    print("Testing Group Commit Flusher")
+    print("="*60)
+    
+    writes = []
+    flusher = GroupCommitFlusher(lambda: writes.append(1), policy="shutdown", batch_size=1000)
+    for _ in range(50):
+        flusher.mark_dirty()
+    assert writes == [], "Shutdown policy should not write before flush()"
+    flusher.flush()
+    assert len(writes) == 1, "50 mutations should coalesce into one write"
+    flusher.flush()
+    assert len(writes) == 1, "Nothing pending means no write"
+    print("✓ Mutations coalesced into one write")
+    
+    flusher = GroupCommitFlusher(lambda: writes.append(1), policy="interval", interval_ms=10_000, batch_size=5)
+    for _ in range(5):
+        flusher.mark_dirty()
+    flusher.close()
+    assert len(writes) == 2 and flusher.pending == 0, "Close should write the remaining batch"
+    print("✓ Close flushes pending mutations")
+    
+    print("\n✅ All flusher tests passed!\n")
+
+
+def test_sqlite_backend():
+    """Test the SQLite backend against the MockDatabase interface."""
+    print("\n" + "="*60)
+    print("Testing SQLite Backend")
+    print("="*60)
+    
+    with tempfile.TemporaryDirectory() as tmp:
+        sqlite_db = SQLiteDatabase(db_file=Path(tmp) / "database.sqlite3")
+        
+        assert sqlite_db.get_user("user_001")["name"] == "John Doe", "Seed user should exist"
+        assert sqlite_db.get_account_balance("user_002") == 12750.25, "Balance should match seed data"
+        print("✓ Seed data loaded")
+        
+        assert sqlite_db.update_address("user_001", "2 SQLite Road"), "Address update should succeed"
+        assert sqlite_db.get_account_details("user_001")["address"] == "2 SQLite Road"
+        assert not sqlite_db.deactivate_card("invalid_user"), "Unknown user should fail"
+        print("✓ Updates persisted")
+        
+        transactions = sqlite_db.get_recent_transactions("user_001", limit=2)
+        assert len(transactions) == 2, "Limit should be respected"
+        assert transactions[0]["date"] > transactions[1]["date"], "Newest transaction first"
+        print("✓ Transactions ordered by date")
+        
+        first = sqlite_db.report_issue("user_001", "Issue one")
+        second = sqlite_db.report_issue("user_001", "Issue two")
+        assert first != second, "Issue IDs should be unique"
+        print(f"✓ Issues reported: {first}, {second}")
+        
+        # A second instance stands in for another worker process
+        other_worker = SQLiteDatabase(db_file=Path(tmp) / "database.sqlite3")
+        assert other_worker.get_user("user_001")["address"] == "2 SQLite Road", "Writes should be shared"
+        third = other_worker.report_issue("user_002", "Issue three")
+        assert third not in (first, second), "Issue IDs should be unique across workers"
+        assert len(other_worker.get_user_issues("user_001")) == 2, "Seed data should not be imported twice"
+        other_worker.close()
+        print(f"✓ Second worker shares the data: {third}")
+        
+        sqlite_db.close()
+    
+    print("\n✅ All SQLite tests passed!\n")
+
+
+def test_secondary_indexes():
+    """Test email/phone and issue lookups stay in sync with mutations."""
+    print("\n" + "="*60)
+    print("Testing Secondary Indexes")
+    print("="*60)
+    
+    with tempfile.TemporaryDirectory() as tmp:
+        index_db = MockDatabase(data_file=Path(tmp) / "database.json")
+        
+        assert index_db.find_user_by_email(" John.Doe@Example.com ").user_id == "user_001"
+        assert index_db.find_user_by_phone("+1 (555) 0123").user_id == "user_001"
+        assert index_db.find_user_by_email("nobody@example.com") is None
+        print("✓ Users found by normalized email and phone")
+        
+        issue_id = index_db.report_issue("user_002", "Card declined")
+        assert index_db.get_issue(issue_id).description == "Card declined"
+        assert [i.issue_id for i in index_db.get_user_issues("user_002")] == [issue_id]
+        assert issue_id in [i.issue_id for i in index_db.get_issues_by_status("open")]
+        print(f"✓ Issue {issue_id} indexed by id, user and status")
+        
+        reloaded = MockDatabase(data_file=Path(tmp) / "database.json")
+        assert reloaded.get_issue(issue_id) is not None, "Indexes should be rebuilt on load"
+        print("✓ Indexes rebuilt on load")
+        
+        sqlite_db = SQLiteDatabase(db_file=Path(tmp) / "database.sqlite3")
+        assert sqlite_db.find_user_by_phone("1-555-0456")["user_id"] == "user_002"
+        sqlite_issue = sqlite_db.report_issue("user_002", "Card declined")
+        assert sqlite_db.get_issue(sqlite_issue)["user_id"] == "user_002"
+        sqlite_db.close()
+        print("✓ SQLite backend answers the same lookups")
+    
+    print("\n✅ All secondary index tests passed!\n")
+
+
+def test_issue_triage():
+    """Test issue status changes, priority triage and per-user paging on both backends."""
+    print("\n" + "="*60)
+    print("Testing Issue Triage")
+    print("="*60)
+    
+    with tempfile.TemporaryDirectory() as tmp:
+        (Path(tmp) / "sqlite").mkdir()
+        backends = {
+            "json": MockDatabase(data_file=Path(tmp) / "database.json", persistence="wal"),
+            "sqlite": SQLiteDatabase(Path(tmp) / "sqlite" / "triage.sqlite3")
+        }
+        for name, triage_db in backends.items():
+            low = triage_db.report_issue("user_001", "Question about a fee", "low")
+            first_high = triage_db.report_issue("user_002", "Card stolen", "high")
+            second_high = triage_db.report_issue("user_001", "Duplicate charge", "high")
+            medium = triage_db.report_issue("user_001", "Deposit missing", "medium")
+            assert triage_db.next_open_issue()["issue_id"] == first_high, f"{name}: oldest high first"
+            assert triage_db.next_open_issue("medium")["issue_id"] == medium
+            assert triage_db.open_issue_count("user_001") == 3 and triage_db.open_issue_count() == 4
+            
+            triage_db.update_issue(first_high, status="in_progress")
+            assert triage_db.next_open_issue()["issue_id"] == second_high, f"{name}: claimed issues leave the queue"
+            triage_db.close_issue(second_high)
+            triage_db.update_issue(low, priority="high")
+            assert triage_db.next_open_issue()["issue_id"] == low, f"{name}: reprioritized issues move up"
+            assert triage_db.open_issue_count("user_001") == 2
+            assert triage_db.update_issue("issue_999", status="closed") is None
+            for bad in ({"status": "in_progress"}, {"status": "pending"}, {"priority": "urgent"}):
+                try:
+                    triage_db.update_issue(second_high, **bad)
+                    assert False, f"{name}: {bad} should be rejected"
+                except ValueError:
+                    pass
+            assert triage_db.update_issue(second_high, status="open")["status"] == "open", "Closed issues reopen"
+            print(f"✓ {name}: next ticket follows priority, age and status changes")
+            
+            for n in range(5):
+                triage_db.report_issue("user_003", f"Ticket {n}", "low")
+            triage_db.close_issue(triage_db.list_issues("user_003", limit=1)["issues"][0]["issue_id"])
+            pages, cursor = [], None
+            while True:
+                page = triage_db.list_issues("user_003", "open", 2, cursor)
+                pages.extend(as_dict(page["issues"]))
+                cursor = page["next_cursor"]
+                if cursor is None:
+                    break
+            assert [i["description"] for i in pages] == [f"Ticket {n}" for n in range(1, 5)], f"{name}: {pages}"
+            print(f"✓ {name}: a user's tickets page by status")
+        
+        backends["sqlite"].close()
+        wal_db = backends["json"]
+        wal_db.store.wal.close()
+        reloaded = MockDatabase(data_file=Path(tmp) / "database.json", persistence="wal")
+        assert [i.issue_id for i in reloaded.issues] == [i.issue_id for i in wal_db.issues], "Updates replace, not append"
+        assert as_dict(reloaded.issues) == as_dict(wal_db.issues)
+        assert reloaded.next_open_issue()["issue_id"] == wal_db.next_open_issue()["issue_id"]
+        reloaded.store.wal.close()
+        print("✓ Updates replay in place from the log")
+    
+    store = IssueStore()
+    store.put(IssueRecord(issue_id="issue_1", user_id="u", status="open", created_at="2024", priority="high"))
+    for n in range(1000):
+        issue = store.get("issue_1")
+        store.put(issue.replace(status="closed" if issue.status == "open" else "open"))
+    assert len(store._heaps[0]) <= 2 * store.open_count() + 64, "Dead heap entries should be compacted"
+    print("✓ Heaps stay bounded under repeated reopen")
+    
+    print("\n✅ All issue triage tests passed!\n")
+
+
+def test_bulk_import():
+    """Test streaming JSONL and CSV imports in every persistence mode and the SQLite backend."""
+    print("\n" + "="*60)
+    print("Testing Bulk Import")
+    print("="*60)
+    
+    with tempfile.TemporaryDirectory() as tmp:
+        users_file = Path(tmp) / "users.jsonl"
+        users_file.write_text("".join(
+            json.dumps({"user_id": f"bulk_{i:03d}", "name": f"Bulk {i}", "email": f"bulk{i}@example.com",
+                        "account_balance": 10.0 * i, "card_status": "active"}) + "\n"
+            for i in range(50)
+        ))
+        txns_file = Path(tmp) / "transactions.csv"
+        txns_file.write_text("user_id,id,date,description,amount,balance\n" + "".join(
+            f"bulk_{i % 50:03d},txn_bulk_{i},2024-03-{i % 28 + 1:02d}T10:00:00,Bulk,-{i}.5,\n"
+            for i in range(500)
+        ))
+        
+        for mode in ("snapshot", "wal", "sharded", "lazy"):
+            data_file = Path(tmp) / mode / "database.json"
+            data_file.parent.mkdir()
+            bulk_db = MockDatabase(data_file=data_file, persistence=mode)
+            stats = import_file(bulk_db, "users", users_file, batch_size=16)
+            assert stats["rows"] == 50 and stats["rows_per_second"] > 0, "Every user should be imported"
+            assert import_file(bulk_db, "transactions", txns_file, batch_size=64)["rows"] == 500
+            assert bulk_db.find_user_by_email("BULK7@example.com")["user_id"] == "bulk_007", "Index should be updated"
+            bulk_db.close()
+            
+            reloaded = MockDatabase(data_file=data_file, persistence=mode)
+            assert reloaded.get_user("bulk_049")["account_balance"] == 490.0, f"{mode}: users should persist"
+            txns = reloaded.get_recent_transactions("bulk_003", 100)
+            assert len(txns) == 10 and txns[0]["amount"] == -53.5, f"{mode}: transactions should persist"
+            assert txns[0]["balance"] is None, f"{mode}: empty CSV cells should import as None"
+            reloaded.close()
+            print(f"✓ {mode}: 50 users and 500 transactions imported and reloaded")
+        
+        sqlite_db = SQLiteDatabase(Path(tmp) / "bulk.sqlite3")
+        assert import_file(sqlite_db, "users", users_file, batch_size=16)["rows"] == 50
+        assert import_file(sqlite_db, "transactions", txns_file)["rows"] == 500
+        assert len(sqlite_db.get_recent_transactions("bulk_003", 100)) == 10, "SQLite should hold the rows"
+        sqlite_db.close()
+        print("✓ sqlite: rows imported in batched transactions")
+        
+        imported_issues = [
+            {"issue_id": f"issue_{n:03d}", "user_id": "user_001", "description": "Imported",
+             "status": "open", "created_at": "2024-01-01T00:00:00", "priority": "low"}
+            for n in (5, 6)
+        ]
+        for name, open_db in (
+            ("json", lambda: MockDatabase(data_file=Path(tmp) / "issues" / "database.json")),
+            ("sqlite", lambda: SQLiteDatabase(Path(tmp) / "issues.sqlite3"))
+        ):
+            (Path(tmp) / "issues").mkdir(exist_ok=True)
+            issues_db = open_db()
+            issues_db.import_batch("issues", imported_issues)
+            issues_db.import_finished()
+            reported = [issues_db.report_issue("user_002", f"New {n}", "high") for n in range(3)]
+            assert reported == ["issue_007", "issue_008", "issue_009"], f"{name}: new IDs follow imported ones"
+            assert issues_db.get_issue("issue_005")["description"] == "Imported", f"{name}: imports kept"
+            issues_db.close()
+            issues_db = open_db()
+            assert issues_db.report_issue("user_002", "After reopening", "low") == "issue_010"
+            issues_db.close()
+            print(f"✓ {name}: reported issues never reuse imported IDs")
+        
+        bad_file = Path(tmp) / "bad.jsonl"
+        bad_file.write_text('{"user_id": "bulk_x"}\n')
+        try:
+            import_file(MockDatabase(data_file=Path(tmp) / "bad.json"), "users", bad_file)
+            assert False, "A row without a name should be rejected"
+        except ValueError as e:
+            assert "row 1" in str(e)
+        print("✓ Rows missing required columns are rejected")
+    
+    print("\n✅ All bulk import tests passed!\n")
+
+
+def test_data_generator():
+    """Test the seeded generator is deterministic, consistent and loads into each backend."""
+    print("\n" + "="*60)
+    print("Testing Synthetic Data Generator")
+    print("="*60)
+    
+    profile = get_profile("demo", users=200)
+    rows = list(generate(profile, seed=7))
+    assert rows == list(generate(profile, seed=7)), "Same seed should give the same rows"
+    assert rows != list(generate(profile, seed=8)), "Another seed should give other rows"
+    print("✓ Output is deterministic per seed")
+    
+    counts = sorted(len(txns) for _, txns, _ in rows)
+    assert counts[-1] > 3 * counts[len(counts) // 2], "Transaction counts should be heavy-tailed"
+    for user, txns, _ in rows:
+        assert [t["date"] for t in txns] == sorted(t["date"] for t in txns), "History should be in date order"
+        if txns:
+            assert txns[-1]["balance"] == user["account_balance"], "Running balance should end at the account balance"
+    print("✓ Power-law histories with consistent running balances")
+    
+    with tempfile.TemporaryDirectory() as tmp:
+        gen_db = MockDatabase(data_file=Path(tmp) / "database.json")
+        ticket = gen_db.report_issue("user_001", "Real ticket")
+        stats = populate(gen_db, profile, seed=7, batch_users=64)
+        assert gen_db.get_issue(ticket)["description"] == "Real ticket", "Existing tickets should be kept"
+        assert stats["users"] == 200 and stats["transactions"] == sum(counts), "Every row should be imported"
+        assert stats["issues"] == sum(len(issues) for _, _, issues in rows)
+        assert len(gen_db.get_issues_by_status("open")) > 0, "There should be an open backlog"
+        user_id = rows[0][0]["user_id"]
+        reloaded = MockDatabase(data_file=Path(tmp) / "database.json")
+        assert reloaded.get_account_balance(user_id) == rows[0][0]["account_balance"], "Users should persist"
+        print(f"✓ {stats['rows']:,} rows generated into MockDatabase ({stats['rows_per_second']:,.0f} rows/s)")
+        
+        # In its own directory: SQLite would import the database.json above
+        (Path(tmp) / "sqlite").mkdir()
+        sqlite_db = SQLiteDatabase(Path(tmp) / "sqlite" / "gen.sqlite3")
+        ticket = sqlite_db.report_issue("user_001", "Real ticket")
+        assert populate(sqlite_db, profile, seed=7)["rows"] == stats["rows"], "SQLite should get the same rows"
+        assert sqlite_db.get_issue(ticket)["description"] == "Real ticket"
+        assert sqlite_db.get_account_balance(user_id) == rows[0][0]["account_balance"]
+        sqlite_db.close()
+        print("✓ Same rows generated into SQLite")
+        print("✓ Generated issues are numbered after existing tickets")
+    
+    print("\n✅ All data generator tests passed!\n")
+
+
+def test_transaction_paging():
+    """Test cursor pagination with date bounds on both backends."""
+    print("\n" + "="*60)
+    print("Testing Transaction Paging")
+    print("="*60)
+    
+    profile = get_profile("demo", users=20)
+    with tempfile.TemporaryDirectory() as tmp:
+        (Path(tmp) / "sqlite").mkdir()
+        backends = {
+            "json": MockDatabase(data_file=Path(tmp) / "database.json"),
+            "sqlite": SQLiteDatabase(Path(tmp) / "sqlite" / "paging.sqlite3")
+        }
+        user_id = max(generate(profile, seed=3), key=lambda row: len(row[1]))[0]["user_id"]
+        for name, paging_db in backends.items():
+            populate(paging_db, profile, seed=3)
+            # Two transactions sharing a timestamp must not be split or repeated across pages
+            paging_db.import_batch("transactions", [
+                {"user_id": user_id, "id": f"txn_tie_{n}", "date": "2024-06-01T12:00:00",
+                 "description": "Tie", "amount": -1.0, "balance": None}
+                for n in range(2)
+            ])
+            everything = as_dict(paging_db.get_recent_transactions(user_id, 100000))
+            assert [t["date"] for t in everything] == sorted((t["date"] for t in everything), reverse=True)
+            
+            pages, cursor = [], None
+            while True:
+                page = paging_db.get_transactions_page(user_id, 7, cursor=cursor)
+                pages.extend(as_dict(page["transactions"]))
+                cursor = page["next_cursor"]
+                if cursor is None:
+                    break
+            assert pages == everything, f"{name}: pages should cover the history exactly once"
+            
+            window = [t for t in everything if "2024-03-01" <= t["date"] < "2024-09-01"]
+            paged, cursor = [], None
+            while True:
+                page = paging_db.get_transactions_page(user_id, 5, "2024-03-01", "2024-09-01", cursor)
+                paged.extend(as_dict(page["transactions"]))
+                cursor = page["next_cursor"]
+                if cursor is None:
+                    break
+            assert paged == window and window, f"{name}: since/until should bound every page"
+            
+            try:
+                paging_db.get_transactions_page(user_id, 5, cursor="not-a-cursor")
+                assert False, "A malformed cursor should be rejected"
+            except ValueError:
+                pass
+            print(f"✓ {name}: {len(everything)} transactions paged newest first, bounded by date")
+        
+        backends["sqlite"].close()
+    
+    print("\n✅ All paging tests passed!\n")
+
+
+def test_balances():
+    """Test that add_transaction keeps balances consistent and reconcile finds and fixes drift."""
+    print("\n" + "="*60)
+    print("Testing Balances and Reconciliation")
+    print("="*60)
+    
+    profile = get_profile("demo", users=30)
+    with tempfile.TemporaryDirectory() as tmp:
+        (Path(tmp) / "sqlite").mkdir()
+        backends = {
+            "json": MockDatabase(data_file=Path(tmp) / "database.json"),
+            "sqlite": SQLiteDatabase(Path(tmp) / "sqlite" / "balances.sqlite3")
+        }
+        user_id = max(generate(profile, seed=5), key=lambda row: len(row[1]))[0]["user_id"]
+        for name, balance_db in backends.items():
+            populate(balance_db, profile, seed=5)
+            report = balance_db.reconcile_balances()
+            assert report["users_with_drift"] == 0, f"{name}: generated data should reconcile"
+            
+            before = balance_db.get_account_balance(user_id)
+            txn = as_dict(balance_db.add_transaction(user_id, "Coffee Shop", -4.35))
+            assert txn["balance"] == round(before - 4.35, 2)
+            assert balance_db.get_account_balance(user_id) == txn["balance"]
+            assert as_dict(balance_db.get_recent_transactions(user_id, 1))[0]["id"] == txn["id"]
+            assert balance_db.add_transaction("user_missing", "Nothing", 1.0) is None
+            assert balance_db.reconcile_balances()["users_with_drift"] == 0
+            print(f"✓ {name}: add_transaction moves the balance and the history together")
+            
+            # Corrupt one account balance and the newest running balance of another user
+            if name == "json":
+                user = balance_db.users[user_id]
+                balance_db.users[user_id] = user.replace(account_balance=user.account_balance + 10)
+                balance_db.transactions["user_00000001"].balances[-1] += 500
+            else:
+                conn = balance_db._conn()
+                conn.execute("UPDATE users SET account_balance = account_balance + 10 WHERE user_id = ?", (user_id,))
+                conn.execute("UPDATE transactions SET balance = balance + 5 WHERE seq = "
+                             "(SELECT MAX(seq) FROM transactions WHERE user_id = 'user_00000001')")
+            report = balance_db.reconcile_balances(fix=True)
+            assert report["users_with_drift"] == 2 and report["fixed"] == 2, f"{name}: {report}"
+            assert report["transactions_with_drift"] == 1, f"{name}: {report}"
+            assert report["total_drift"] == 10.0, f"{name}: {report['total_drift']}"
+            assert balance_db.get_account_balance(user_id) == txn["balance"], "Fix should restore the balance"
+            assert balance_db.reconcile_balances()["users_with_drift"] == 0, "Nothing left to fix"
+            print(f"✓ {name}: reconcile found {report['users_with_drift']} drifted users and fixed them")
+        
+        backends["sqlite"].close()
+        
+        data_file = Path(tmp) / "wal.json"
+        wal_db = MockDatabase(data_file=data_file, persistence="wal")
+        txn = as_dict(wal_db.add_transaction("user_001", "Deposit", 250))
+        wal_db.store.wal.close()
+        reloaded = MockDatabase(data_file=data_file, persistence="wal")
+        assert reloaded.get_account_balance("user_001") == txn["balance"]
+        assert as_dict(reloaded.get_recent_transactions("user_001", 1))[0] == txn
+        assert reloaded.reconcile_balances()["users_with_drift"] == 0
+        reloaded.store.wal.close()
+        print("✓ WAL replays the transaction and the balance as one record")
+    
+    print("\n✅ All balance tests passed!\n")
+
+
+def test_storage_backends():
+    """Test every registered storage backend against the shared conformance checks."""
+    print("\n" + "="*60)
+    print("Testing Storage Backends")
+    print("="*60)
+    
+    assert isinstance(db, StorageBackend), "The global database should implement StorageBackend"
+    try:
+        create_database("no_such_backend")
+        assert False, "Unknown backend should be rejected"
+    except ValueError:
+        pass
+    with tempfile.TemporaryDirectory() as tmp:
+        external = create_database("mcp_server.sqlite_db:SQLiteDatabase", Path(tmp) / "database.sqlite3")
+        assert isinstance(external, SQLiteDatabase), "module:factory should name the factory to use"
+        external.close()
+    print(f"✓ Registered backends: {', '.join(available_backends())}")
+    
+    for name in available_backends():
+        if name == "lmdb" and lmdb is None:
+            print("✓ lmdb skipped (package not installed)")
+            continue
+        file_name = "database.sqlite3" if name == "sqlite" else "database.json"
+        with tempfile.TemporaryDirectory() as tmp:
+            passed = run_conformance(
+                lambda d: create_database(name, d / file_name),
+                Path(tmp),
+                durable=name != "memory"
+            )
+        print(f"✓ {name}: {', '.join(passed)}")
+    
+    print("\n✅ All storage backend tests passed!\n")
+
+
+def test_concurrent_access():
+    """Test parallel mutations neither lose updates nor reuse issue IDs."""
+    print("\n" + "="*60)
+    print("Testing Concurrent Access")
+    print("="*60)
+    
+    with tempfile.TemporaryDirectory() as tmp:
+        data_file = Path(tmp) / "database.json"
+        concurrent_db = MockDatabase(data_file=data_file)
+        
+        with ThreadPoolExecutor(max_workers=8) as pool:
+            issue_ids = list(pool.map(
+                lambda n: concurrent_db.report_issue(f"user_00{n % 2 + 1}", f"Issue {n}"), range(40)
+            ))
+        assert len(set(issue_ids)) == 40, "Issue IDs should be unique"
+        assert len(concurrent_db.issues) == 40, "No issue should be lost"
+        print("✓ 40 parallel issues got unique IDs")
+        
+        snapshot = concurrent_db.get_user("user_001")
+        with ThreadPoolExecutor(max_workers=8) as pool:
+            list(pool.map(
+                lambda n: concurrent_db.update_address(f"user_00{n % 2 + 1}", f"{n} Thread Rd"), range(40)
+            ))
+        assert snapshot["address"] == "123 Main St, Springfield, IL 62701", "Published records are immutable"
+        print("✓ Readers keep a consistent snapshot during updates")
+        
+        reloaded = MockDatabase(data_file=data_file)
+        assert len(reloaded.issues) == 40, "Every issue should be persisted"
+        for user_id in ("user_001", "user_002"):
+            assert reloaded.get_user(user_id)["address"] == concurrent_db.get_user(user_id)["address"]
+        print("✓ Persisted state matches memory")
+    
+    print("\n✅ All concurrency tests passed!\n")
+
+
+def test_optimistic_concurrency():
+    """Test expected_version updates: one writer per version wins, the rest get a conflict."""
+    print("\n" + "="*60)
+    print("Testing Optimistic Concurrency")
+    print("="*60)
+    
+    with tempfile.TemporaryDirectory() as tmp:
+        for name, cas_db in (
+            ("memory", MockDatabase(data_file=Path(tmp) / "database.json", persistence="memory")),
+            ("sqlite", SQLiteDatabase(db_file=Path(tmp) / "database.sqlite3"))
+        ):
+            version = cas_db.get_account_details("user_001")["version"]
+            
+            def attempt(n):
+                try:
+                    return cas_db.update_address("user_001", f"{n} Race Road", expected_version=version)
+                except VersionConflict as e:
+                    assert e.current_version == version + 1, "The conflict should report the winner's version"
+                    return False
+            
+            with ThreadPoolExecutor(max_workers=8) as pool:
+                won = [n for n, ok in enumerate(pool.map(attempt, range(16))) if ok]
+            assert len(won) == 1, f"Exactly one writer should win, got {len(won)}"
+            details = cas_db.get_account_details("user_001")
+            assert details["address"] == f"{won[0]} Race Road" and details["version"] == version + 1
+            
+            # Retrying with a fresh read is how a loser catches up
+            assert cas_db.deactivate_card("user_001", expected_version=details["version"])
+            cas_db.add_transaction("user_001", "Bumps the version", 1.0)
+            assert cas_db.get_account_details("user_001")["version"] == version + 3
+            cas_db.close()
+            print(f"✓ {name}: 1 of 16 racing writers won, the rest got VersionConflict")
+        
+        legacy_file = Path(tmp) / "legacy.sqlite3"
+        SQLiteDatabase(db_file=legacy_file).close()
+        with sqlite3.connect(legacy_file) as conn:
+            conn.execute("ALTER TABLE users DROP COLUMN version")
+        conn.close()
+        migrated = SQLiteDatabase(db_file=legacy_file)
+        assert migrated.get_account_details("user_002")["version"] == 0, "Existing rows start at version 0"
+        assert migrated.update_address("user_002", "1 Migrated Mews", expected_version=0)
+        migrated.close()
+        print("✓ SQLite files without a version column are migrated on open")
+    
+    print("\n✅ All optimistic concurrency tests passed!\n")
+
+
+def test_write_batches():
+    """Test batch() commits several mutations with one write and rolls back on error."""
+    print("\n" + "="*60)
+    print("Testing Write Batches")
+    print("="*60)
+    
+    with tempfile.TemporaryDirectory() as tmp:
+        batch_db = MockDatabase(data_file=Path(tmp) / "database.json", persistence="snapshot")
+        writes = []
+        write_pending = batch_db.store.write_pending
+        batch_db.store.write_pending = lambda d: (writes.append(1), write_pending(d))
+        batch_db.update_address("user_001", "1 Single Street")
+        batch_db.report_issue("user_001", "Unbatched", "low")
+        assert len(writes) == 2, "Each unbatched write saves"
+        with batch_db.batch():
+            batch_db.update_address("user_001", "2 Batch Street")
+            batch_db.add_transaction("user_001", "Batched", 5.0)
+            batch_db.report_issue("user_001", "Batched", "low")
+        assert len(writes) == 3, "A batch of three mutations should save once"
+        reloaded = MockDatabase(data_file=Path(tmp) / "database.json")
+        assert reloaded.get_user("user_001")["address"] == "2 Batch Street" and len(reloaded.issues) == 2
+        print("✓ Three batched mutations cost one save")
+        
+        wal_db = MockDatabase(data_file=Path(tmp) / "wal.json", persistence="wal")
+        version = wal_db.get_account_details("user_002")["version"]
+        balance = wal_db.get_account_balance("user_002")
+        try:
+            with wal_db.batch():
+                wal_db.add_transaction("user_002", "Refund", 10.0)
+                wal_db.report_issue("user_002", "Refund issued", "medium")
+                # Stale: the transaction above already bumped the version
+                wal_db.update_address("user_002", "Stale Street", expected_version=version)
+            raise AssertionError("The stale update should abort the batch")
+        except VersionConflict:
+            pass
+        assert wal_db.get_account_balance("user_002") == balance and not wal_db.issues, "Rolled back in memory"
+        assert wal_db.get_account_details("user_002")["version"] == version
+        wal_db.close()
+        reloaded = MockDatabase(data_file=Path(tmp) / "wal.json", persistence="wal")
+        assert reloaded.get_account_balance("user_002") == balance and not reloaded.issues, "Nothing logged"
+        reloaded.close()
+        print("✓ A failed batch leaves no trace in memory or in the log")
+        
+        # Neither the batch's thread nor other threads may cache what they read during it
+        lazy_db = MockDatabase(data_file=Path(tmp) / "lazy.json", persistence="lazy")
+        address = lazy_db.get_account_details("user_001")["address"]
+        seen = []
+        with lazy_db.batch():
+            lazy_db.update_address("user_001", "4 Cached Court")
+            assert lazy_db.get_account_details("user_001")["address"] == "4 Cached Court"
+            reader = threading.Thread(target=lambda: seen.append(lazy_db.get_account_details("user_001")))
+            reader.start()
+            reader.join()
+            assert seen[0]["address"] == address, "Other threads read the address from before the batch"
+            lazy_db.update_address("user_001", "5 Cached Court")
+        assert lazy_db.get_account_details("user_001")["address"] == "5 Cached Court"
+        lazy_db.close()
+        print("✓ Reads during a batch are neither dirty nor cached")
+
+        stop = threading.Event()
+        
+        def write():
+            while not stop.is_set():
+                with batch_db.batch():
+                    batch_db.add_transaction("user_001", "Hold", -100.0)
+                    batch_db.add_transaction("user_001", "Release", 100.0)
+        
+        writer = threading.Thread(target=write)
+        balance = batch_db.get_account_balance("user_001")
+        writer.start()
+        try:
+            for _ in range(300):
+                with batch_db.snapshot() as snapshot:
+                    assert snapshot.get_account_balance("user_001") == balance, "Snapshots see whole batches"
+        finally:
+            stop.set()
+            writer.join()
+        print("✓ Snapshot readers never see half a batch")
+        
+        def write_and_roll_back():
+            while not stop.is_set():
+                try:
+                    with batch_db.batch():
+                        batch_db.update_address("user_002", "Rolled Back Road")
+                        batch_db.add_transaction("user_002", "Rolled back", 1.0)
+                        batch_db.report_issue("user_002", "Rolled back", "low")
+                        raise RuntimeError("roll back")
+                except RuntimeError:
+                    pass
+        
+        def read():
+            for _ in range(2000):
+                assert batch_db.get_user("user_002")["address"] != "Rolled Back Road", "Plain reads see only commits"
+                assert batch_db.get_recent_transactions("user_002", 1)[0]["description"] != "Rolled back"
+                assert all(issue.description != "Rolled back" for issue in batch_db.get_user_issues("user_002"))
+        
+        stop.clear()
+        # Switch threads often, so reads land between a batch's check and its writes
+        switch_interval = sys.getswitchinterval()
+        sys.setswitchinterval(1e-6)
+        writer = threading.Thread(target=write_and_roll_back)
+        writer.start()
+        try:
+            with ThreadPoolExecutor(max_workers=4) as pool:
+                for future in [pool.submit(read) for _ in range(4)]:
+                    future.result()
+        finally:
+            stop.set()
+            writer.join()
+            sys.setswitchinterval(switch_interval)
+        print("✓ Plain readers never see a batch that rolls back")
+        
+        # Forced: the batch begins after a read has checked for one, before it reads
+        reads = {
+            "user": lambda: batch_db.get_user("user_002")["address"],
+            "transactions": lambda: batch_db.get_recent_transactions("user_002", 1)[0]["description"],
+            "issues": lambda: [issue.description for issue in batch_db.get_user_issues("user_002")]
+        }
+        batches = []
+        for name, read in reads.items():
+            written = threading.Event()
+            
+            def roll_back():
+                try:
+                    with batch_db.batch():
+                        batch_db.update_address("user_002", "Rolled Back Road")
+                        batch_db.add_transaction("user_002", "Rolled back", 1.0)
+                        batch_db.report_issue("user_002", "Rolled back", "low")
+                        written.set()
+                        time.sleep(0.2)
+                        raise RuntimeError("roll back")
+                except RuntimeError:
+                    pass
+            
+            def begin_batch_after_check():
+                foreign = MockDatabase._foreign_batch(batch_db)
+                if not written.is_set():
+                    batches.append(threading.Thread(target=roll_back))
+                    batches[-1].start()
+                    written.wait()
+                return foreign
+            
+            batch_db._foreign_batch = begin_batch_after_check
+            try:
+                value = read()
+            finally:
+                del batch_db._foreign_batch
+            assert "Rolled Back Road" != value and "Rolled back" not in value, f"{name}: read a rolled back batch"
+        for thread in batches:
+            thread.join()
+        print("✓ Reads that a batch began under see only commits")
+        
+        result = asyncio.run(batch_db.abatch(lambda: (
+            batch_db.update_address("user_001", "3 Async Batch Street"),
+            batch_db.report_issue("user_001", "Async batch", "high")
+        )))
+        assert result[0] and batch_db.get_issue(result[1])["priority"] == "high"
+        batch_db.close()
+        print("✓ abatch runs a batch on the writer thread")
+    
+    print("\n✅ All write batch tests passed!\n")
+
+
+def test_snapshot_reads():
+    """Test MVCC snapshots stay consistent under concurrent writes and release old versions."""
+    print("\n" + "="*60)
+    print("Testing Snapshot Reads")
+    print("="*60)
+    
+    columns = TransactionColumns.from_dicts([
+        {"id": f"t{n}", "date": f"2024-01-0{n + 1}T00:00:00", "description": "x", "amount": 1.0, "balance": n + 1.0}
+        for n in range(3)
+    ])
+    frozen = columns.snapshot()
+    before = as_dict(frozen[:])
+    columns.append({"id": "t3", "date": "2024-01-09T00:00:00", "description": "x", "amount": 1.0, "balance": 4.0})
+    columns.append({"id": "old", "date": "2023-12-01T00:00:00", "description": "x", "amount": 1.0, "balance": 0.0})
+    columns.set_running_balances(0)
+    assert len(columns) == 5 and as_dict(frozen[:]) == before, "A column snapshot should not change"
+    assert frozen.version != columns.version
+    print("✓ Column snapshots survive appends, inserts and rebalancing")
+    
+    with tempfile.TemporaryDirectory() as tmp:
+        snapshot_db = MockDatabase(data_file=Path(tmp) / "database.json", persistence="memory")
+        stop = threading.Event()
+        
+        def write():
+            n = 0
+            while not stop.is_set():
+                snapshot_db.add_transaction("user_001", "Burst", 1.0)
+                snapshot_db.update_address("user_001", f"{n} Burst Blvd")
+                n += 1
+        
+        def read(_):
+            checked = 0
+            for _ in range(300):
+                with snapshot_db.snapshot() as snapshot:
+                    balance = snapshot.get_account_balance("user_001")
+                    newest = snapshot.get_recent_transactions("user_001", 1)[0]
+                    assert newest["balance"] == balance, "Balance and history should be from one commit"
+                    assert snapshot.get_account_balance("user_001") == balance
+                    checked += 1
+            return checked
+        
+        writer = threading.Thread(target=write)
+        writer.start()
+        try:
+            with ThreadPoolExecutor(max_workers=4) as pool:
+                checked = sum(pool.map(read, range(4)))
+        finally:
+            stop.set()
+            writer.join()
+        print(f"✓ {checked} snapshot reads consistent during a write burst")
+        
+        with snapshot_db.snapshot() as snapshot:
+            address = snapshot.get_account_details("user_001")["address"]
+            for n in range(5):
+                snapshot_db.update_address("user_001", f"{n} Later Lane")
+            assert snapshot.get_account_details("user_001")["address"] == address
+            assert snapshot_db.snapshot_stats()["retained_versions"] == 5, "Replaced versions kept for the reader"
+        stats = snapshot_db.snapshot_stats()
+        assert stats["open_snapshots"] == 0 and stats["retained_versions"] == 0, "Versions collected after release"
+        print(f"✓ Old versions collected once released ({stats['collected_versions']} so far)")
+    
+    print("\n✅ All snapshot tests passed!\n")
+
+
+async def test_async_database():
+    """Test the async interface persists writes and serves reads while a write is blocked."""
+    print("\n" + "="*60)
+    print("Testing Async Database Interface")
+    print("="*60)
+    
+    with tempfile.TemporaryDirectory() as tmp:
+        data_file = Path(tmp) / "database.json"
+        async_db = MockDatabase(data_file=data_file)
+        assert await async_db.aupdate_address("user_001", "5 Await Ave"), "Async update should succeed"
+        assert (await async_db.aget_user("user_001"))["address"] == "5 Await Ave"
+        issue_id = await async_db.areport_issue("user_002", "Async issue")
+        assert (await async_db.aget_issue(issue_id))["description"] == "Async issue"
+        print("✓ Async writes and reads round-trip")
+        
+        write_pending = async_db.store.write_pending
+        async_db.store.write_pending = lambda db: (time.sleep(0.5), write_pending(db))
+        write = asyncio.create_task(async_db.adeactivate_card("user_001"))
+        await asyncio.sleep(0.05)
+        started = time.perf_counter()
+        details = await async_db.aget_account_details("user_002")
+        assert details is not None and time.perf_counter() - started < 0.1, "Reads should not wait for a write"
+        assert not write.done(), "The write should still be saving"
+        assert await write, "The blocked write should complete"
+        print("✓ Reads are served while a save is in progress")
+        
+        def slow_batch():
+            async_db.report_issue("user_003", "Batched issue")
+            time.sleep(0.5)
+        batch = asyncio.create_task(async_db.abatch(slow_batch))
+        await asyncio.sleep(0.05)
+        ticks = 0
+        async def tick():
+            nonlocal ticks
+            while True:
+                await asyncio.sleep(0.01)
+                ticks += 1
+        ticker = asyncio.create_task(tick())
+        issue = await async_db.aget_issue(issue_id)
+        ticker.cancel()
+        assert issue["description"] == "Async issue"
+        assert ticks > 10, "The event loop should keep running while an issue read waits out a batch"
+        await batch
+        print("✓ Issue reads wait out a batch off the event loop")
+        async_db.close()
+        
+        reloaded = MockDatabase(data_file=data_file)
+        assert reloaded.get_user("user_001")["card_status"] == "deactivated", "Async write should persist"
+        print("✓ Async writes are persisted")
+    
+    print("\n✅ All async database tests passed!\n")
+
+
 async def test_mcp_tools():
     """Test MCP tool execution."""
     print("\n" + "="*60)
@@ -115,6 +1461,16 @@ async def test_mcp_tools():
     assert "transactions" in result_data, "Should return transactions"
     print(f"✓ get_recent_transactions tool works: {result_data['count']} transactions")
     
+    first_page = json.loads((await execute_tool("get_recent_transactions", {"user_id": "user_001", "limit": 2}))[0].text)
+    assert first_page["next_cursor"], "A longer history should return a cursor"
+    second_page = json.loads((await execute_tool("get_recent_transactions", {
+        "user_id": "user_001", "limit": 2, "cursor": first_page["next_cursor"]
+    }))[0].text)
+    assert second_page["transactions"][0]["date"] < first_page["transactions"][-1]["date"], "Next page is older"
+    everything = json.loads((await execute_tool("get_recent_transactions", {"user_id": "user_001", "limit": 200}))[0].text)
+    assert everything["success"] and everything["next_cursor"] is None, "Large limits are still accepted"
+    print("✓ get_recent_transactions pages with next_cursor")
+    
     # Test deactivate_card tool
     result = await execute_tool("deactivate_card", {
         "user_id": "user_001"
@@ -123,6 +1479,18 @@ async def test_mcp_tools():
     assert result_data["success"], "Tool should succeed"
     print("✓ deactivate_card tool works")
     
+    version = json.loads((await execute_tool("get_account_details", {"user_id": "user_001"}))[0].text)["details"]["version"]
+    result_data = json.loads((await execute_tool("update_address", {
+        "user_id": "user_001", "new_address": "1 Versioned Way", "expected_version": version
+    }))[0].text)
+    assert result_data["success"] and result_data["version"] == version + 1, "A matching version should apply"
+    result_data = json.loads((await execute_tool("change_password", {
+        "user_id": "user_001", "new_password": "stale", "expected_version": version
+    }))[0].text)
+    assert not result_data["success"] and result_data["conflict"], "A stale version should be a conflict"
+    assert result_data["current_version"] == version + 1
+    print("✓ expected_version conflicts are reported, not applied")
+    
     # Test report_issue tool
     result = await execute_tool("report_issue", {
         "user_id": "user_001",
@@ -133,6 +1501,20 @@ async def test_mcp_tools():
     assert "issue_id" in result_data, "Should return issue ID"
     print(f"✓ report_issue tool works: {result_data['issue_id']}")
     
+    # Test triage tools
+    result_data = json.loads((await execute_tool("get_next_issue", {}))[0].text)
+    assert result_data["success"] and result_data["issue"]["status"] == "open", "Should return an open ticket"
+    next_id = result_data["issue"]["issue_id"]
+    result_data = json.loads((await execute_tool("update_issue", {"issue_id": next_id, "status": "in_progress"}))[0].text)
+    assert result_data["issue"]["status"] == "in_progress", "Status should change"
+    result_data = json.loads((await execute_tool("close_issue", {"issue_id": next_id}))[0].text)
+    assert result_data["issue"]["status"] == "closed", "Ticket should close"
+    result_data = json.loads((await execute_tool("update_issue", {"issue_id": next_id, "status": "in_progress"}))[0].text)
+    assert not result_data["success"], "Closed tickets can only be reopened"
+    result_data = json.loads((await execute_tool("list_user_issues", {"user_id": "user_001", "limit": 1}))[0].text)
+    assert result_data["count"] == 1 and "open_count" in result_data, "Should page the user's tickets"
+    print("✓ get_next_issue, update_issue, close_issue and list_user_issues tools work")
+    
     # Test get_account_details tool
     result = await execute_tool("get_account_details", {
         "user_id": "user_001"
@@ -193,6 +1575,31 @@ def run_all_tests():
         
         # Test mock database
         test_mock_database()
+        test_records()
+        test_transaction_columns()
+        test_codecs()
+        test_wal_persistence()
+        test_wal_compaction()
+        test_background_save()
+        test_incremental_snapshots()
+        test_sharded_persistence()
+        test_lazy_persistence()
+        test_read_cache()
+        test_group_commit_flusher()
+        test_sqlite_backend()
+        test_secondary_indexes()
+        test_issue_triage()
+        test_concurrent_access()
+        test_optimistic_concurrency()
+        test_write_batches()
+        test_snapshot_reads()
+        test_bulk_import()
+        test_data_generator()
+        test_transaction_paging()
+        test_balances()
+        test_storage_backends()
+        
+        asyncio.run(test_async_database())
         
         # Test MCP tools
         asyncio.run(test_mcp_tools())